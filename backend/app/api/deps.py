@@ -1,9 +1,21 @@
-from fastapi import Depends, HTTPException, status
+import hashlib
+import orjson
+from functools import lru_cache
+from fastapi import Depends, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from typing import Any, Awaitable, Callable, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError
 from fastapi.security import OAuth2PasswordBearer
-from ..db.session import SessionLocal
+from ..db.session import SessionLocal, AsyncSessionLocal
 from ..core import security
+from ..core.cache import response_cache, user_cache
+from ..core.config import PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX
+from ..crud.crud_data_version import get_data_version, get_data_version_async
+from ..crud.pagination import Page, created_at_key, decode_cursor, split_page
 from ..models.user import User, UserRole
 from ..schemas.token import TokenData
 from sqlalchemy.orm.exc import NoResultFound
@@ -11,6 +23,9 @@ from sqlalchemy.orm.exc import NoResultFound
 # OAuth2 scheme for token extraction
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Columns kept in the user cache; enough to authorize and to serve /api/users/me
+CACHED_USER_FIELDS = ("id", "name", "email", "role", "manager_id", "email_digest")
+
 def get_db():
     db = SessionLocal()
     try:
@@ -18,23 +33,60 @@ def get_db():
     finally:
         db.close()
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
-    credentials_exception = HTTPException(
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _user_id_from_token(token: str) -> int:
     payload = security.decode_access_token(token)
     if payload is None:
-        raise credentials_exception
+        raise _credentials_exception()
     user_id: int = payload.get("user_id")
     if user_id is None:
-        raise credentials_exception
-    try:
-        user = db.query(User).filter(User.id == user_id).one()
-    except NoResultFound:
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+    return user_id
+
+def websocket_user_id(websocket: WebSocket) -> Optional[int]:
+    """User id from a bearer token in the Authorization header or, for browsers, the ``token`` query param"""
+    scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer":
+        token = websocket.query_params.get("token")
+    payload = security.decode_access_token(token) if token else None
+    return payload.get("user_id") if payload else None
+
+def _cache_user(user: User) -> dict:
+    snapshot = {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+    user_cache.set(user.id, snapshot)
+    return snapshot
+
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+    user_id = _user_id_from_token(token)
+    snapshot = user_cache.get(user_id)
+    if snapshot is None:
+        try:
+            user = db.query(User).filter(User.id == user_id).one()
+        except NoResultFound:
+            raise _credentials_exception()
+        snapshot = _cache_user(user)
+    # Detached instance built from the snapshot; routes only read its columns
+    return User(**snapshot)
+
+async def get_current_user_async(db: AsyncSession = Depends(get_async_db), token: str = Depends(oauth2_scheme)) -> User:
+    user_id = _user_id_from_token(token)
+    snapshot = user_cache.get(user_id)
+    if snapshot is None:
+        user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+        if user is None:
+            raise _credentials_exception()
+        snapshot = _cache_user(user)
+    return User(**snapshot)
 
 def require_role(role: UserRole):
     def role_checker(user: User = Depends(get_current_user)):
@@ -42,3 +94,116 @@ def require_role(role: UserRole):
             raise HTTPException(status_code=403, detail="Insufficient permissions")
         return user
     return role_checker
+
+def require_role_async(role: UserRole):
+    async def role_checker(user: User = Depends(get_current_user_async)):
+        if user.role != role:
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
+        return user
+    return role_checker
+
+def get_page(
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's X-Next-Cursor header"),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+) -> Page:
+    return Page(limit=limit, after=decode_cursor(cursor) if cursor else None)
+
+def get_fields(schema, *always: str):
+    """Dependency reading a sparse fieldset (``?fields=id,sentiment``) of ``schema``: the chosen fields in schema order.
+
+    ``always`` fields, such as the ones the page cursor is built from, are included whether chosen or not; without
+    the parameter, every field is returned.
+    """
+    names = tuple(schema.model_fields)
+
+    def field_selector(
+        fields: Optional[str] = Query(None, description=f"Comma-separated fields to return, from: {', '.join(names)}"),
+    ) -> tuple:
+        if not fields:
+            return names
+        chosen = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = chosen.difference(names)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        chosen.update(always)
+        return tuple(name for name in names if name in chosen)
+    return field_selector
+
+def paginate(response: Response, rows: list, page: Page, key=created_at_key) -> list:
+    """Trim a keyset page and expose the following page's cursor in X-Next-Cursor"""
+    items, next_cursor = split_page(rows, page, key)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+# Browsers keep versioned responses but revalidate them with If-None-Match on every use
+VERSIONED_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+def _version_key(request: Request, user_id: int, version: Optional[int]) -> tuple:
+    return (request.url.path, request.url.query, user_id, version)
+
+def _etag(key: tuple) -> str:
+    return '"%s"' % hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    return bool(header) and any(tag.strip().removeprefix("W/") in ("*", etag) for tag in header.split(","))
+
+@lru_cache(maxsize=None)
+def _adapter(model) -> TypeAdapter:
+    return TypeAdapter(model)
+
+def _cached_response(request: Request, key: tuple) -> Optional[Response]:
+    """304 if the client already holds this version, the cached body if we do, else None"""
+    headers = {"ETag": _etag(key), **VERSIONED_HEADERS}
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    cached = response_cache.get(key)
+    if cached is None:
+        return None
+    body, extra_headers = cached
+    return Response(body, media_type="application/json", headers={**extra_headers, **headers})
+
+def dump_json(content: Any) -> bytes:
+    """JSON for plain dicts, lists, datetimes and enums via orjson; anything else goes through jsonable_encoder first"""
+    return orjson.dumps(content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS)
+
+def _forwarded_headers(response: Response) -> dict:
+    # Headers the route set on the injected response, e.g. X-Next-Cursor
+    return {name: value for name, value in response.headers.items() if name != "content-length"}
+
+def json_response(response: Response, items: Any) -> Response:
+    """Serve response-ready ``items`` (rows shaped like the response model) without validating them again"""
+    return Response(dump_json(items), media_type="application/json", headers=_forwarded_headers(response))
+
+def _cache_response(key: tuple, response: Response, content: Any, model) -> Response:
+    """Serialize ``content`` with ``model``, or as it is when ``model`` is None, and cache it under ``key``"""
+    if model is not None:
+        content = jsonable_encoder(_adapter(model).validate_python(content, from_attributes=True))
+    body = dump_json(content)
+    extra_headers = _forwarded_headers(response)
+    response_cache.set(key, (body, extra_headers))
+    return Response(body, media_type="application/json", headers={**extra_headers, "ETag": _etag(key), **VERSIONED_HEADERS})
+
+def versioned_get(request: Request, response: Response, db: Session, user_id: int, model,
+                  build: Callable[[], Any]) -> Response:
+    """Serve a GET whose body depends only on ``user_id``'s data version.
+
+    Answers 304 to a matching If-None-Match and otherwise serves the body from
+    response_cache; ``build`` runs only on a miss, and its result is serialized
+    with ``model`` (the route's response model, or None for items already
+    shaped like it, which are encoded as they are).
+    """
+    key = _version_key(request, user_id, get_data_version(db, user_id))
+    cached = _cached_response(request, key)
+    if cached is not None:
+        return cached
+    return _cache_response(key, response, build(), model)
+
+async def versioned_get_async(request: Request, response: Response, db: AsyncSession, user_id: int, model,
+                              build: Callable[[], Awaitable[Any]]) -> Response:
+    key = _version_key(request, user_id, await get_data_version_async(db, user_id))
+    cached = _cached_response(request, key)
+    if cached is not None:
+        return cached
+    return _cache_response(key, response, await build(), model)
@@ -1,4 +1,7 @@
 from .auth import router as auth_router
 from .users import router as users_router
 from .feedback import router as feedback_router
-from .dashboard import router as dashboard_router 
\ No newline at end of file
+from .dashboard import router as dashboard_router 
+from .internal import router as internal_router
+from .feedback_async import router as feedback_async_router
+from .dashboard_async import router as dashboard_async_router
\ No newline at end of file
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.concurrency import run_in_threadpool
 from ...db.session import SessionLocal
 from ...crud import crud_user
 from ...schemas.user import UserCreate, UserRead
@@ -10,18 +11,32 @@ from ...api.deps import get_db
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
+def _hash_pool_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent sign-ins, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud_user.authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    try:
+        user = await crud_user.authenticate_user_async(db, form_data.username, form_data.password)
+    except security.PasswordHashPoolBusy:
+        raise _hash_pool_busy()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
     access_token = security.create_access_token(data={"user_id": user.id, "role": user.role.value})
     return {"access_token": access_token, "token_type": "bearer", "role": user.role.value}
 
 @router.post("/register", response_model=UserRead)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
-    db_user = crud_user.get_user_by_email(db, user_in.email)
+async def register(user_in: UserCreate, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(crud_user.get_user_by_email_detached, db, user_in.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    user = crud_user.create_user(db, user_in)
+    try:
+        hashed_password = await security.get_password_hash_async(user_in.password)
+    except security.PasswordHashPoolBusy:
+        raise _hash_pool_busy()
+    user = await run_in_threadpool(crud_user.create_user, db, user_in, hashed_password)
     return user
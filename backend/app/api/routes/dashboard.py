@@ -1,68 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from ...api.deps import get_db, get_current_user, require_role
+from ...api.deps import get_db, get_current_user, require_role, get_page, paginate, versioned_get
 from ...models.user import User, UserRole
-from ...models.feedback import Feedback, SentimentEnum
-from ...schemas.feedback import FeedbackRead
-from ...crud import crud_feedback
-from typing import List, Dict, Any
-from datetime import datetime
+from ...schemas.feedback import FeedbackRead, TrendGranularity
+from ...crud import crud_analytics, crud_dashboard, crud_feedback, crud_sentiment_rollup
+from typing import List, Optional, Tuple
+from ...crud.pagination import Page
+from datetime import date, datetime
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
 @router.get("/manager/overview")
 def get_manager_overview(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.manager))
 ):
     """Get overview statistics for manager dashboard"""
-    # Get total feedback count
-    total_feedback = db.query(func.count(Feedback.id)).filter(
-        Feedback.manager_id == current_user.id
-    ).scalar()
-    
-    # Get sentiment distribution
-    sentiment_counts = db.query(
-        Feedback.sentiment,
-        func.count(Feedback.id)
-    ).filter(
-        Feedback.manager_id == current_user.id
-    ).group_by(Feedback.sentiment).all()
-    
-    # Calculate percentages
-    positive_count = next((count for sentiment, count in sentiment_counts if sentiment == SentimentEnum.positive), 0)
-    neutral_count = next((count for sentiment, count in sentiment_counts if sentiment == SentimentEnum.neutral), 0)
-    negative_count = next((count for sentiment, count in sentiment_counts if sentiment == SentimentEnum.negative), 0)
-    
-    positive_percentage = round((positive_count / total_feedback * 100) if total_feedback > 0 else 0, 1)
-    neutral_percentage = round((neutral_count / total_feedback * 100) if total_feedback > 0 else 0, 1)
-    negative_percentage = round((negative_count / total_feedback * 100) if total_feedback > 0 else 0, 1)
-    
-    return {
-        "total_feedback": total_feedback,
-        "positive_percentage": positive_percentage,
-        "neutral_percentage": neutral_percentage,
-        "negative_percentage": negative_percentage,
-        "positive_count": positive_count,
-        "neutral_count": neutral_count,
-        "negative_count": negative_count
-    }
+    return versioned_get(
+        request, response, db, current_user.id, None,
+        lambda: crud_dashboard.get_manager_overview(db, current_user.id),
+    )
+
+def trend_range(granularity: str, start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+    """Resolve the requested range; defaults to the twelve buckets ending today"""
+    end = end or datetime.utcnow().date()
+    if start is None:
+        start = crud_sentiment_rollup.bucket_start(end, granularity)
+        for _ in range(11):
+            start = crud_sentiment_rollup.previous_bucket(start, granularity)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if crud_sentiment_rollup.count_buckets(granularity, start, end) > crud_sentiment_rollup.MAX_TREND_BUCKETS:
+        raise HTTPException(status_code=400, detail="Date range has too many buckets for this granularity")
+    return start, end
 
 @router.get("/manager/sentiment_trends")
 def get_manager_sentiment_trends(
+    granularity: TrendGranularity = TrendGranularity.month,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    employee_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.manager))
 ):
     """Get sentiment trends over time for manager dashboard"""
-    # This would typically group by month/period
-    # For now, return sample data
-    return [
-        {"month": "Jan", "positive": 25, "neutral": 8, "negative": 5},
-        {"month": "Feb", "positive": 32, "neutral": 10, "negative": 4},
-        {"month": "Mar", "positive": 35, "neutral": 6, "negative": 3},
-        {"month": "Apr", "positive": 38, "neutral": 8, "negative": 2},
-    ]
+    start, end = trend_range(granularity.value, start, end)
+    return crud_sentiment_rollup.get_sentiment_trends(
+        db, current_user.id, granularity.value, start, end, employee_id=employee_id
+    )
+
+@router.get("/manager/org/overview")
+def get_org_overview(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.manager))
+):
+    """Get feedback statistics rolled up over the manager's whole reporting tree, per team and in total"""
+    return crud_dashboard.get_org_overview(db, current_user.id)
+
+@router.get("/manager/org/sentiment_trends")
+def get_org_sentiment_trends(
+    granularity: TrendGranularity = TrendGranularity.month,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.manager))
+):
+    """Get sentiment trends over the manager's whole reporting tree"""
+    start, end = trend_range(granularity.value, start, end)
+    return crud_sentiment_rollup.get_sentiment_trends(db, current_user.id, granularity.value, start, end, org=True)
+
+@router.get("/analytics")
+def get_feedback_analytics(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    org: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.manager))
+):
+    """Get sentiment ratios, acknowledgement latency percentiles and tag usage for the team, or with org the whole reporting tree"""
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return crud_analytics.get_feedback_analytics(db, current_user.id, start, end, org)
+
+@router.get("/manager/team-stats")
+def get_team_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.manager))
+):
+    """Get feedback statistics for every member of the manager's team"""
+    return crud_dashboard.get_team_stats(db, current_user.id)
 
 @router.get("/manager/team-member-stats/{employee_id}")
 def get_team_member_stats(
@@ -71,68 +99,21 @@ def get_team_member_stats(
     current_user: User = Depends(require_role(UserRole.manager))
 ):
     """Get feedback statistics for a specific team member"""
-    # Verify the employee is in the manager's team
-    employee = db.query(User).filter(
-        User.id == employee_id,
-        User.manager_id == current_user.id
-    ).first()
-    
-    if not employee:
+    stats = crud_dashboard.get_team_member_stats(db, current_user.id, employee_id)
+    if not stats:
         raise HTTPException(status_code=404, detail="Employee not found in your team")
-    
-    # Get feedback statistics for this employee
-    total_feedback = db.query(func.count(Feedback.id)).filter(
-        Feedback.employee_id == employee_id,
-        Feedback.manager_id == current_user.id
-    ).scalar()
-    
-    # Get sentiment distribution
-    sentiment_counts = db.query(
-        Feedback.sentiment,
-        func.count(Feedback.id)
-    ).filter(
-        Feedback.employee_id == employee_id,
-        Feedback.manager_id == current_user.id
-    ).group_by(Feedback.sentiment).all()
-    
-    # Calculate percentages
-    positive_count = next((count for sentiment, count in sentiment_counts if sentiment == SentimentEnum.positive), 0)
-    neutral_count = next((count for sentiment, count in sentiment_counts if sentiment == SentimentEnum.neutral), 0)
-    negative_count = next((count for sentiment, count in sentiment_counts if sentiment == SentimentEnum.negative), 0)
-    
-    # Get acknowledgment count
-    acknowledged_count = db.query(func.count(Feedback.id)).filter(
-        Feedback.employee_id == employee_id,
-        Feedback.manager_id == current_user.id,
-        Feedback.acknowledged == True
-    ).scalar()
-    
-    # Calculate satisfaction score (positive percentage)
-    satisfaction_score = round((positive_count / total_feedback * 100) if total_feedback > 0 else 0, 1)
-    
-    return {
-        "employee_id": employee_id,
-        "employee_name": employee.name,
-        "employee_email": employee.email,
-        "total_feedback": total_feedback,
-        "acknowledged_feedback": acknowledged_count,
-        "positive_feedback": positive_count,
-        "neutral_feedback": neutral_count,
-        "negative_feedback": negative_count,
-        "satisfaction_score": satisfaction_score,
-        "positive_percentage": round((positive_count / total_feedback * 100) if total_feedback > 0 else 0, 1),
-        "neutral_percentage": round((neutral_count / total_feedback * 100) if total_feedback > 0 else 0, 1),
-        "negative_percentage": round((negative_count / total_feedback * 100) if total_feedback > 0 else 0, 1)
-    }
+    return stats
 
 @router.get("/employee/timeline", response_model=List[FeedbackRead])
 def get_employee_timeline(
+    request: Request,
+    response: Response,
+    page: Page = Depends(get_page),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.employee))
 ):
     """Get feedback timeline for employee dashboard"""
-    feedbacks = db.query(Feedback).filter(
-        Feedback.employee_id == current_user.id
-    ).order_by(Feedback.created_at.desc()).all()
-    
-    return feedbacks
+    return versioned_get(
+        request, response, db, current_user.id, None,
+        lambda: paginate(response, crud_feedback.get_feedback_for_employee(db, employee_id=current_user.id, page=page), page),
+    )
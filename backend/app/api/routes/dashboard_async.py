@@ -0,0 +1,111 @@
+"""Async variants of the dashboard endpoints, used instead of the sync
+``dashboard`` router when ASYNC_DB_ENABLED is set."""
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...api.deps import get_async_db, require_role_async, get_page, paginate, versioned_get_async
+from ...models.user import User, UserRole
+from ...schemas.feedback import FeedbackRead, TrendGranularity
+from ...crud import crud_analytics, crud_dashboard, crud_feedback_async, crud_sentiment_rollup
+from typing import List, Optional
+from datetime import date
+from ...crud.pagination import Page
+from .dashboard import trend_range
+
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+
+@router.get("/manager/overview")
+async def get_manager_overview(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.manager))
+):
+    """Get overview statistics for manager dashboard"""
+    return await versioned_get_async(
+        request, response, db, current_user.id, None,
+        lambda: crud_dashboard.get_manager_overview_async(db, current_user.id),
+    )
+
+@router.get("/manager/sentiment_trends")
+async def get_manager_sentiment_trends(
+    granularity: TrendGranularity = TrendGranularity.month,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    employee_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.manager))
+):
+    """Get sentiment trends over time for manager dashboard"""
+    start, end = trend_range(granularity.value, start, end)
+    return await crud_sentiment_rollup.get_sentiment_trends_async(
+        db, current_user.id, granularity.value, start, end, employee_id=employee_id
+    )
+
+@router.get("/manager/org/overview")
+async def get_org_overview(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.manager))
+):
+    """Get feedback statistics rolled up over the manager's whole reporting tree, per team and in total"""
+    return await crud_dashboard.get_org_overview_async(db, current_user.id)
+
+@router.get("/manager/org/sentiment_trends")
+async def get_org_sentiment_trends(
+    granularity: TrendGranularity = TrendGranularity.month,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.manager))
+):
+    """Get sentiment trends over the manager's whole reporting tree"""
+    start, end = trend_range(granularity.value, start, end)
+    return await crud_sentiment_rollup.get_sentiment_trends_async(
+        db, current_user.id, granularity.value, start, end, org=True
+    )
+
+@router.get("/analytics")
+async def get_feedback_analytics(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    org: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.manager))
+):
+    """Get sentiment ratios, acknowledgement latency percentiles and tag usage for the team, or with org the whole reporting tree"""
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return await crud_analytics.get_feedback_analytics_async(db, current_user.id, start, end, org)
+
+@router.get("/manager/team-stats")
+async def get_team_stats(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.manager))
+):
+    """Get feedback statistics for every member of the manager's team"""
+    return await crud_dashboard.get_team_stats_async(db, current_user.id)
+
+@router.get("/manager/team-member-stats/{employee_id}")
+async def get_team_member_stats(
+    employee_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.manager))
+):
+    """Get feedback statistics for a specific team member"""
+    stats = await crud_dashboard.get_team_member_stats_async(db, current_user.id, employee_id)
+    if not stats:
+        raise HTTPException(status_code=404, detail="Employee not found in your team")
+    return stats
+
+@router.get("/employee/timeline", response_model=List[FeedbackRead])
+async def get_employee_timeline(
+    request: Request,
+    response: Response,
+    page: Page = Depends(get_page),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.employee))
+):
+    """Get feedback timeline for employee dashboard"""
+    async def build():
+        rows = await crud_feedback_async.get_feedback_for_employee(db, employee_id=current_user.id, page=page)
+        return paginate(response, rows, page)
+    return await versioned_get_async(request, response, db, current_user.id, None, build)
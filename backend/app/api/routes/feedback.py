@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, BackgroundTasks
 from sqlalchemy.orm import Session
-from ...api.deps import get_db, get_current_user, require_role
+from ...api.deps import get_db, get_current_user, require_role, get_fields, get_page, json_response, paginate, versioned_get
 from ...models.user import User, UserRole
-from ...models.feedback import Feedback, Notification
-from ...schemas.feedback import FeedbackCreate, FeedbackRead, FeedbackReadWithEmployee, FeedbackUpdate, FeedbackRequestCreate, FeedbackRequestRead, FeedbackRequestStatus, PeerFeedbackCreate, PeerFeedbackRead, FeedbackCommentCreate, FeedbackCommentRead, TagCreate, TagRead, NotificationRead, NotificationCreate
-from ...crud import crud_feedback
+from ...models.feedback import Feedback, Notification, Tag
+from ...schemas.feedback import ExportFormat, FeedbackCreate, FeedbackBulkCreate, FeedbackBulkResult, FeedbackRead, FeedbackReadWithEmployee, FeedbackUpdate, FeedbackRequestCreate, FeedbackRequestRead, FeedbackRequestStatus, PeerFeedbackCreate, PeerFeedbackRead, FeedbackCommentCreate, FeedbackCommentRead, TagCreate, TagRead, FeedbackTagsAssign, FeedbackTagsRead, NotificationRead, NotificationCreate, NotificationsMarkRead
+from ...crud import crud_feedback, crud_notification_push, crud_notification_retention, crud_export, crud_outbox, crud_report
+from ...crud.crud_feedback import FEEDBACK_EMAIL_BODY, FEEDBACK_EMAIL_SUBJECT, FEEDBACK_NOTIFICATION_MESSAGE, feedback_email_dedupe_key
 from ...crud.crud_feedback import (
     create_feedback_request,
     get_feedback_requests_made,
@@ -25,53 +26,91 @@ from ...crud.crud_feedback import (
     create_notification,
     delete_all_notifications_for_user
 )
-from typing import List
-from ...core.config import send_email_background
+from typing import List, Optional
+from datetime import datetime
+from ...crud.pagination import Page
+from ...core.config import NOTIFICATION_CLEAR_BATCH_THRESHOLD
+from ...db.session import SessionLocal
+from ...core.exports import iter_csv, iter_ndjson, iter_report_zip
+from ...core.reports import ReportRendererBusy, iter_report, report_renderer
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
-from fpdf import FPDF
-import io
+import os
 
 router = APIRouter(prefix="/api/feedback", tags=["feedback"])
 
+# Feedback lists page by (created_at, id), so a sparse fieldset always keeps both
+FEEDBACK_KEY_FIELDS = ("id", "created_at")
+
 @router.post("/", response_model=FeedbackRead)
 def create_feedback(
     feedback_in: FeedbackCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.manager)),
 ):
-    feedback = crud_feedback.create_feedback(db, manager_id=current_user.id, feedback_in=feedback_in)
-    # Notify employee (in-app)
+    # Feedback, its in-app notification and the employee's email (via the outbox) are committed together;
+    # employees in digest mode get the email in their next digest instead
+    feedback = crud_feedback.create_feedback(db, manager_id=current_user.id, feedback_in=feedback_in, commit=False)
     notification = NotificationCreate(
         user_id=feedback.employee_id,
-        message=f"You have received new feedback from your manager.",
+        message=FEEDBACK_NOTIFICATION_MESSAGE,
         type="feedback"
     )
-    create_notification(db, notification)
-    # Send email to employee
+    create_notification(db, notification, commit=False)
     employee = db.query(User).filter(User.id == feedback.employee_id).first()
-    if employee:
-        send_email_background(
-            background_tasks,
+    if employee and not employee.email_digest:
+        db.flush()  # assigns feedback.id for the dedupe key
+        crud_outbox.enqueue_email(
+            db,
             to_email=employee.email,
-            subject="New Feedback Received",
-            body=f"<p>You have received new feedback from your manager.</p>"
+            subject=FEEDBACK_EMAIL_SUBJECT,
+            body=FEEDBACK_EMAIL_BODY,
+            dedupe_key=feedback_email_dedupe_key(feedback.id),
         )
+    db.commit()
     return feedback
 
+def bulk_feedback_response(results: List[dict]) -> dict:
+    created = sum(1 for result in results if result["error"] is None)
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+@router.post("/bulk", response_model=FeedbackBulkResult)
+def create_feedback_bulk(
+    bulk_in: FeedbackBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.manager)),
+):
+    """Create feedback for several team members at once; each item succeeds or fails on its own"""
+    results = crud_feedback.create_feedback_bulk(db, manager_id=current_user.id, items=bulk_in.items)
+    return bulk_feedback_response(results)
+
 @router.get("/employee", response_model=List[FeedbackRead])
 def get_my_feedback(
+    request: Request,
+    response: Response,
+    page: Page = Depends(get_page),
+    fields: tuple = Depends(get_fields(FeedbackRead, *FEEDBACK_KEY_FIELDS)),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.employee))
 ):
-    return crud_feedback.get_feedback_for_employee(db, employee_id=current_user.id)
+    return versioned_get(
+        request, response, db, current_user.id, None,
+        lambda: paginate(response, crud_feedback.get_feedback_for_employee(db, employee_id=current_user.id, page=page, fields=fields), page),
+    )
 
 @router.get("/manager", response_model=List[FeedbackReadWithEmployee])
 def get_team_feedback(
+    request: Request,
+    response: Response,
+    page: Page = Depends(get_page),
+    fields: tuple = Depends(get_fields(FeedbackReadWithEmployee, *FEEDBACK_KEY_FIELDS)),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.manager))
 ):
-    return crud_feedback.get_feedback_for_manager(db, manager_id=current_user.id)
+    return versioned_get(
+        request, response, db, current_user.id, None,
+        lambda: paginate(response, crud_feedback.get_feedback_for_manager(db, manager_id=current_user.id, page=page, fields=fields), page),
+    )
 
 @router.patch("/{feedback_id}", response_model=FeedbackRead)
 def update_feedback(
@@ -80,10 +119,10 @@ def update_feedback(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.manager))
 ):
-    feedback = crud_feedback.get_feedback_by_id(db, feedback_id)
-    if not feedback or feedback.manager_id != current_user.id:
+    feedback = crud_feedback.update_feedback(db, feedback_id, current_user.id, feedback_in)
+    if not feedback:
         raise HTTPException(status_code=404, detail="Feedback not found or not permitted")
-    return crud_feedback.update_feedback(db, feedback, feedback_in)
+    return feedback
 
 @router.post("/{feedback_id}/acknowledge", response_model=FeedbackRead)
 def acknowledge_feedback(
@@ -91,10 +130,10 @@ def acknowledge_feedback(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.employee))
 ):
-    feedback = crud_feedback.get_feedback_by_id(db, feedback_id)
-    if not feedback or feedback.employee_id != current_user.id:
+    feedback = crud_feedback.acknowledge_feedback(db, feedback_id, current_user.id)
+    if not feedback:
         raise HTTPException(status_code=404, detail="Feedback not found or not permitted")
-    return crud_feedback.acknowledge_feedback(db, feedback)
+    return feedback
 
 # Feedback Request Endpoints
 @router.post("/request", response_model=FeedbackRequestRead)
@@ -107,17 +146,21 @@ def request_feedback(
 
 @router.get("/requests/made", response_model=List[FeedbackRequestRead])
 def list_feedback_requests_made(
+    response: Response,
+    page: Page = Depends(get_page),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.employee))
 ):
-    return get_feedback_requests_made(db, user_id=current_user.id)
+    return paginate(response, get_feedback_requests_made(db, user_id=current_user.id, page=page), page)
 
 @router.get("/requests/received", response_model=List[FeedbackRequestRead])
 def list_feedback_requests_received(
+    response: Response,
+    page: Page = Depends(get_page),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.manager))
 ):
-    return get_feedback_requests_received(db, user_id=current_user.id)
+    return paginate(response, get_feedback_requests_received(db, user_id=current_user.id, page=page), page)
 
 @router.patch("/request/{request_id}/status", response_model=FeedbackRequestRead)
 def update_feedback_request_status_endpoint(
@@ -126,10 +169,10 @@ def update_feedback_request_status_endpoint(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.manager))
 ):
-    request = get_feedback_request_by_id(db, request_id)
-    if not request or request.target_id != current_user.id:
+    request = update_feedback_request_status(db, request_id, current_user.id, status)
+    if not request:
         raise HTTPException(status_code=404, detail="Request not found or not permitted")
-    return update_feedback_request_status(db, request, status)
+    return request
 
 # Peer Feedback Endpoints
 @router.post("/peer", response_model=PeerFeedbackRead)
@@ -142,22 +185,22 @@ def create_peer_feedback_endpoint(
 
 @router.get("/peer/given", response_model=List[PeerFeedbackRead])
 def list_peer_feedback_given(
+    response: Response,
+    page: Page = Depends(get_page),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.employee))
 ):
-    return get_peer_feedback_given(db, user_id=current_user.id)
+    return json_response(response, paginate(response, get_peer_feedback_given(db, user_id=current_user.id, page=page), page))
 
 @router.get("/peer/received", response_model=List[PeerFeedbackRead])
 def list_peer_feedback_received(
+    response: Response,
+    page: Page = Depends(get_page),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.employee))
 ):
-    feedbacks = get_peer_feedback_received(db, user_id=current_user.id)
-    # Hide from_user_id if is_anonymous
-    for fb in feedbacks:
-        if fb.is_anonymous:
-            fb.from_user_id = None
-    return feedbacks
+    # from_user_id is withheld from anonymous feedback by the query
+    return json_response(response, paginate(response, get_peer_feedback_received(db, user_id=current_user.id, page=page), page))
 
 # Feedback Comment Endpoints
 @router.post("/{feedback_id}/comments", response_model=FeedbackCommentRead)
@@ -172,10 +215,12 @@ def add_feedback_comment(
 @router.get("/{feedback_id}/comments", response_model=List[FeedbackCommentRead])
 def list_feedback_comments(
     feedback_id: int,
+    response: Response,
+    page: Page = Depends(get_page),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return get_feedback_comments(db, feedback_id=feedback_id)
+    return paginate(response, get_feedback_comments(db, feedback_id=feedback_id, page=page), page)
 
 # Tag Endpoints
 @router.post("/tags", response_model=TagRead)
@@ -193,6 +238,26 @@ def list_tags_endpoint(
 ):
     return get_all_tags(db)
 
+@router.post("/tags/assign", response_model=list[FeedbackTagsRead])
+def assign_tags_endpoint(
+    assign_in: FeedbackTagsAssign,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.manager))
+):
+    """Add tags to (or, with replace, set the tags of) several of your feedback items at once"""
+    feedback_ids, tag_ids = set(assign_in.feedback_ids), set(assign_in.tag_ids)
+    missing = feedback_ids - crud_feedback.get_owned_feedback_ids(db, current_user.id, feedback_ids)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Feedback not found or not permitted: {sorted(missing)}")
+    missing = tag_ids - crud_feedback.get_existing_tag_ids(db, tag_ids)
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Tags not found: {sorted(missing)}")
+    tags_by_feedback = crud_feedback.set_feedback_tags(db, feedback_ids, tag_ids, replace=assign_in.replace)
+    return [
+        {"feedback_id": feedback_id, "tags": tags_by_feedback[feedback_id]}
+        for feedback_id in dict.fromkeys(assign_in.feedback_ids)
+    ]
+
 @router.post("/{feedback_id}/tags/{tag_id}", response_model=TagRead)
 def add_tag_to_feedback_endpoint(
     feedback_id: int,
@@ -201,10 +266,10 @@ def add_tag_to_feedback_endpoint(
     current_user: User = Depends(require_role(UserRole.manager))
 ):
     feedback = crud_feedback.get_feedback_by_id(db, feedback_id)
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
-    if not feedback or not tag:
+    tag = crud_feedback.get_tag_by_id(db, tag_id)
+    if not feedback or not tag or feedback.manager_id != current_user.id:
         raise HTTPException(status_code=404, detail="Feedback or tag not found")
-    add_tag_to_feedback(db, feedback, tag)
+    add_tag_to_feedback(db, feedback, tag_id)
     return tag
 
 @router.delete("/{feedback_id}/tags/{tag_id}", response_model=TagRead)
@@ -215,19 +280,50 @@ def remove_tag_from_feedback_endpoint(
     current_user: User = Depends(require_role(UserRole.manager))
 ):
     feedback = crud_feedback.get_feedback_by_id(db, feedback_id)
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
-    if not feedback or not tag:
+    tag = crud_feedback.get_tag_by_id(db, tag_id)
+    if not feedback or not tag or feedback.manager_id != current_user.id:
         raise HTTPException(status_code=404, detail="Feedback or tag not found")
-    remove_tag_from_feedback(db, feedback, tag)
+    remove_tag_from_feedback(db, feedback, tag_id)
     return tag
 
 # Notification Endpoints
 @router.get("/notifications", response_model=list[NotificationRead])
 def list_notifications(
+    response: Response,
+    page: Page = Depends(get_page),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return get_notifications_for_user(db, user_id=current_user.id)
+    return json_response(response, paginate(response, get_notifications_for_user(db, user_id=current_user.id, page=page), page))
+
+@router.get("/notifications/unread-count")
+def get_unread_notification_count(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Number of unread notifications, for the unread badge; revalidate with If-None-Match"""
+    return versioned_get(
+        request, response, db, current_user.id, None,
+        lambda: {"unread": crud_feedback.count_unread_notifications(db, current_user.id)},
+    )
+
+@router.post("/notifications/read-all")
+def mark_all_notifications_read(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    return {"updated": crud_feedback.mark_notifications_as_read(db, current_user.id)}
+
+@router.post("/notifications/read")
+def mark_notifications_read(
+    body: NotificationsMarkRead,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Mark the given notifications read; ids that are not the caller's or already read are skipped"""
+    return {"updated": crud_feedback.mark_notifications_as_read(db, current_user.id, set(body.notification_ids))}
 
 @router.post("/notifications/{notification_id}/read", response_model=NotificationRead)
 def mark_notification_read(
@@ -235,34 +331,86 @@ def mark_notification_read(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    notification = db.query(Notification).filter(Notification.id == notification_id, Notification.user_id == current_user.id).first()
+    notification = mark_notification_as_read(db, notification_id, current_user.id)
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
-    return mark_notification_as_read(db, notification)
+    return notification
+
+def clear_notifications_task(user_id: int, up_to_id: int):
+    """Background clear-all, in its own session, for users with too many notifications to delete in one go"""
+    with SessionLocal() as db:
+        crud_notification_retention.clear_notifications_in_batches(db, user_id, up_to_id)
 
 @router.delete("/notifications/clear-all", status_code=status.HTTP_200_OK)
 def clear_all_notifications(
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    threshold = NOTIFICATION_CLEAR_BATCH_THRESHOLD
+    if crud_notification_retention.count_notifications(db, current_user.id, threshold + 1) > threshold:
+        up_to_id = crud_notification_push.get_latest_notification_id(db, current_user.id)
+        background_tasks.add_task(clear_notifications_task, current_user.id, up_to_id)
+        return {"message": "Deleting your notifications in the background."}
     num_deleted = delete_all_notifications_for_user(db, user_id=current_user.id)
     return {"message": f"Successfully deleted {num_deleted} notifications."}
 
+@router.delete("/notifications", status_code=status.HTTP_200_OK)
+def delete_old_notifications(
+    before: datetime,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Delete the caller's notifications created before ``before``"""
+    return {"deleted": crud_feedback.delete_notifications_for_user(db, current_user.id, before)}
+
+def report_renderer_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many reports being prepared, please retry shortly",
+        headers={"Retry-After": "5"},
+    )
+
+async def feedback_report_response(employee: User, version: tuple) -> StreamingResponse:
+    """The employee's PDF report, from the report cache or rendered into it off the event loop"""
+    try:
+        handle = await report_renderer.report(employee.id, employee.name, version)
+    except ReportRendererBusy:
+        raise report_renderer_busy()
+    return StreamingResponse(iter_report(handle), media_type="application/pdf", headers={
+        "Content-Disposition": f"attachment; filename=feedback_{employee.id}.pdf",
+        "Content-Length": str(os.fstat(handle.fileno()).st_size),
+    })
+
 @router.get("/employee/pdf")
-def export_feedback_pdf(
+async def export_feedback_pdf(
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role(UserRole.employee))
 ):
-    feedbacks = crud_feedback.get_feedback_for_employee(db, employee_id=current_user.id)
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"Feedback Report for {current_user.name}", ln=True, align="C")
-    pdf.ln(10)
-    for fb in feedbacks:
-        pdf.multi_cell(0, 10, txt=f"Date: {fb.created_at.strftime('%Y-%m-%d %H:%M')}\nStrengths: {fb.strengths}\nAreas to Improve: {fb.areas_to_improve}\nSentiment: {fb.sentiment.value}\nAcknowledged: {fb.acknowledged}\n---", align="L")
-        pdf.ln(2)
-    pdf_output = io.BytesIO()
-    pdf.output(pdf_output)
-    pdf_output.seek(0)
-    return StreamingResponse(pdf_output, media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename=feedback_{current_user.id}.pdf"})
+    version = await run_in_threadpool(crud_report.get_report_version, db, current_user.id)
+    return await feedback_report_response(current_user, version)
+
+EXPORT_MEDIA_TYPES = {ExportFormat.csv: "text/csv", ExportFormat.ndjson: "application/x-ndjson", ExportFormat.zip: "application/zip"}
+
+def team_export_response(manager_id: int, export_format: ExportFormat, org: bool, members: Optional[list] = None) -> StreamingResponse:
+    """Stream the team export; ``members`` (from crud_export.get_export_members) is needed for the ZIP of reports"""
+    if export_format == ExportFormat.zip:
+        body = iter_report_zip(members)
+    elif export_format == ExportFormat.ndjson:
+        body = iter_ndjson(manager_id, org)
+    else:
+        body = iter_csv(manager_id, org)
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[export_format], headers={
+        "Content-Disposition": f"attachment; filename={'org' if org else 'team'}_feedback_{manager_id}.{export_format.value}",
+    })
+
+@router.get("/manager/export")
+def export_team_feedback(
+    format: ExportFormat = ExportFormat.csv,
+    org: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role(UserRole.manager))
+):
+    """Stream the feedback, peer feedback and comments the team received (with org, the whole reporting tree), or a ZIP of their PDF reports"""
+    members = crud_export.get_export_members(db, current_user.id, org) if format == ExportFormat.zip else None
+    return team_export_response(current_user.id, format, org, members)
@@ -0,0 +1,197 @@
+"""Async variants of the core feedback and notification endpoints.
+
+Included ahead of the sync ``feedback`` router when ASYNC_DB_ENABLED is set;
+the remaining feedback endpoints keep their sync implementations.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, BackgroundTasks
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...api.deps import get_async_db, get_current_user_async, require_role_async, get_fields, get_page, json_response, paginate, versioned_get_async
+from ...models.user import User, UserRole
+from ...schemas.feedback import ExportFormat, FeedbackCreate, FeedbackBulkCreate, FeedbackBulkResult, FeedbackRead, FeedbackReadWithEmployee, FeedbackUpdate, NotificationRead, NotificationCreate, NotificationsMarkRead
+from ...crud import crud_feedback_async, crud_notification_push, crud_notification_retention, crud_export, crud_outbox, crud_report, crud_user_async
+from ...crud.crud_feedback import FEEDBACK_EMAIL_BODY, FEEDBACK_EMAIL_SUBJECT, FEEDBACK_NOTIFICATION_MESSAGE, feedback_email_dedupe_key
+from .feedback import FEEDBACK_KEY_FIELDS, bulk_feedback_response, clear_notifications_task, feedback_report_response, team_export_response
+from typing import List
+from datetime import datetime
+from ...crud.pagination import Page
+from ...core.config import NOTIFICATION_CLEAR_BATCH_THRESHOLD
+
+router = APIRouter(prefix="/api/feedback", tags=["feedback"])
+
+@router.post("/", response_model=FeedbackRead)
+async def create_feedback(
+    feedback_in: FeedbackCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.manager)),
+):
+    # Feedback, its in-app notification and the employee's email (via the outbox) are committed together;
+    # employees in digest mode get the email in their next digest instead
+    feedback = await crud_feedback_async.create_feedback(db, manager_id=current_user.id, feedback_in=feedback_in, commit=False)
+    notification = NotificationCreate(
+        user_id=feedback.employee_id,
+        message=FEEDBACK_NOTIFICATION_MESSAGE,
+        type="feedback"
+    )
+    await crud_feedback_async.create_notification(db, notification, commit=False)
+    employee = await crud_user_async.get_user_by_id(db, feedback.employee_id)
+    if employee and not employee.email_digest:
+        await db.flush()  # assigns feedback.id for the dedupe key
+        crud_outbox.enqueue_email(
+            db,
+            to_email=employee.email,
+            subject=FEEDBACK_EMAIL_SUBJECT,
+            body=FEEDBACK_EMAIL_BODY,
+            dedupe_key=feedback_email_dedupe_key(feedback.id),
+        )
+    await db.commit()
+    return feedback
+
+@router.post("/bulk", response_model=FeedbackBulkResult)
+async def create_feedback_bulk(
+    bulk_in: FeedbackBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.manager)),
+):
+    """Create feedback for several team members at once; each item succeeds or fails on its own"""
+    results = await crud_feedback_async.create_feedback_bulk(db, manager_id=current_user.id, items=bulk_in.items)
+    return bulk_feedback_response(results)
+
+@router.get("/employee", response_model=List[FeedbackRead])
+async def get_my_feedback(
+    request: Request,
+    response: Response,
+    page: Page = Depends(get_page),
+    fields: tuple = Depends(get_fields(FeedbackRead, *FEEDBACK_KEY_FIELDS)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.employee))
+):
+    async def build():
+        rows = await crud_feedback_async.get_feedback_for_employee(db, employee_id=current_user.id, page=page, fields=fields)
+        return paginate(response, rows, page)
+    return await versioned_get_async(request, response, db, current_user.id, None, build)
+
+@router.get("/manager", response_model=List[FeedbackReadWithEmployee])
+async def get_team_feedback(
+    request: Request,
+    response: Response,
+    page: Page = Depends(get_page),
+    fields: tuple = Depends(get_fields(FeedbackReadWithEmployee, *FEEDBACK_KEY_FIELDS)),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.manager))
+):
+    async def build():
+        rows = await crud_feedback_async.get_feedback_for_manager(db, manager_id=current_user.id, page=page, fields=fields)
+        return paginate(response, rows, page)
+    return await versioned_get_async(request, response, db, current_user.id, None, build)
+
+@router.patch("/{feedback_id}", response_model=FeedbackRead)
+async def update_feedback(
+    feedback_id: int,
+    feedback_in: FeedbackUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.manager))
+):
+    feedback = await crud_feedback_async.update_feedback(db, feedback_id, current_user.id, feedback_in)
+    if not feedback:
+        raise HTTPException(status_code=404, detail="Feedback not found or not permitted")
+    return feedback
+
+@router.post("/{feedback_id}/acknowledge", response_model=FeedbackRead)
+async def acknowledge_feedback(
+    feedback_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.employee))
+):
+    feedback = await crud_feedback_async.acknowledge_feedback(db, feedback_id, current_user.id)
+    if not feedback:
+        raise HTTPException(status_code=404, detail="Feedback not found or not permitted")
+    return feedback
+
+# Notification Endpoints
+@router.get("/notifications", response_model=list[NotificationRead])
+async def list_notifications(
+    response: Response,
+    page: Page = Depends(get_page),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    rows = await crud_feedback_async.get_notifications_for_user(db, user_id=current_user.id, page=page)
+    return json_response(response, paginate(response, rows, page))
+
+@router.get("/notifications/unread-count")
+async def get_unread_notification_count(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    async def build():
+        return {"unread": await crud_feedback_async.count_unread_notifications(db, current_user.id)}
+
+    return await versioned_get_async(request, response, db, current_user.id, None, build)
+
+@router.post("/notifications/read-all")
+async def mark_all_notifications_read(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return {"updated": await crud_feedback_async.mark_notifications_as_read(db, current_user.id)}
+
+@router.post("/notifications/read")
+async def mark_notifications_read(
+    body: NotificationsMarkRead,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return {"updated": await crud_feedback_async.mark_notifications_as_read(db, current_user.id, set(body.notification_ids))}
+
+@router.post("/notifications/{notification_id}/read", response_model=NotificationRead)
+async def mark_notification_read(
+    notification_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    notification = await crud_feedback_async.mark_notification_as_read(db, notification_id, current_user.id)
+    if not notification:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    return notification
+
+@router.delete("/notifications/clear-all", status_code=status.HTTP_200_OK)
+async def clear_all_notifications(
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    threshold = NOTIFICATION_CLEAR_BATCH_THRESHOLD
+    if await crud_notification_retention.count_notifications_async(db, current_user.id, threshold + 1) > threshold:
+        up_to_id = await crud_notification_push.get_latest_notification_id_async(db, current_user.id)
+        background_tasks.add_task(clear_notifications_task, current_user.id, up_to_id)
+        return {"message": "Deleting your notifications in the background."}
+    num_deleted = await crud_feedback_async.delete_all_notifications_for_user(db, user_id=current_user.id)
+    return {"message": f"Successfully deleted {num_deleted} notifications."}
+
+@router.delete("/notifications", status_code=status.HTTP_200_OK)
+async def delete_old_notifications(
+    before: datetime,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    return {"deleted": await crud_feedback_async.delete_notifications_for_user(db, current_user.id, before)}
+
+@router.get("/employee/pdf")
+async def export_feedback_pdf(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.employee))
+):
+    version = await crud_report.get_report_version_async(db, current_user.id)
+    return await feedback_report_response(current_user, version)
+
+@router.get("/manager/export")
+async def export_team_feedback(
+    format: ExportFormat = ExportFormat.csv,
+    org: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(require_role_async(UserRole.manager))
+):
+    members = await crud_export.get_export_members_async(db, current_user.id, org) if format == ExportFormat.zip else None
+    return team_export_response(current_user.id, format, org, members)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends
+from ...api.deps import require_role
+from ...core.cache import response_cache, tag_cache, user_cache
+from ...core.mail import mail_worker
+from ...core.notification_bus import notification_bus
+from ...core.outbox import outbox_dispatcher
+from ...core.reports import report_renderer
+from ...core.security import password_hash_pool
+from ...db import session
+from ...models.user import User, UserRole
+
+router = APIRouter(prefix="/api/internal", tags=["internal"])
+
+@router.get("/metrics")
+def get_metrics(current_user: User = Depends(require_role(UserRole.manager))):
+    """Process-local runtime counters for load testing and capacity planning (managers only)"""
+    metrics = {
+        "user_cache": user_cache.stats(),
+        "tag_cache": tag_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "password_hash_pool": password_hash_pool.stats(),
+        "notification_bus": notification_bus.stats(),
+        "mail": mail_worker.stats(),
+        "outbox": outbox_dispatcher.stats(),
+        "reports": report_renderer.stats(),
+        "db_pool": session.pool_metrics.snapshot(session.engine.pool),
+    }
+    if session.async_engine is not None:
+        metrics["async_db_pool"] = session.async_pool_metrics.snapshot(session.async_engine.sync_engine.pool)
+    return metrics
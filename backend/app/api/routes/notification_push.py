@@ -0,0 +1,88 @@
+"""Notification push over WebSocket, replacing polling of /api/feedback/notifications.
+
+A connection holds no database session while idle: it waits on the
+notification bus and, when woken, reads the new rows in a short-lived session.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi import APIRouter, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
+
+from ...api.deps import websocket_user_id
+from ...core.config import NOTIFICATION_PUSH_RESEND_WINDOW_SECONDS, PAGE_SIZE_MAX
+from ...core.notification_bus import notification_bus
+from ...crud import crud_notification_push
+from ...db.session import AsyncSessionLocal, SessionLocal
+from ...models.feedback import Notification
+from ...schemas.feedback import NotificationRead
+
+router = APIRouter(prefix="/api/feedback/notifications", tags=["feedback"])
+
+
+def _fetch_sync(user_id: int, after_id: Optional[int], since: datetime, limit: int):
+    with SessionLocal() as db:
+        if after_id is None:
+            return crud_notification_push.get_latest_notification_id(db, user_id), []
+        return after_id, crud_notification_push.get_notifications_after(db, user_id, after_id, since, limit)
+
+
+async def fetch_notifications(user_id: int, after_id: Optional[int], since: datetime,
+                              limit: int) -> tuple[int, List[Notification]]:
+    """Notifications after ``after_id`` or created from ``since`` on; with no ``after_id``, none, starting from the latest id"""
+    if AsyncSessionLocal is None:
+        return await run_in_threadpool(_fetch_sync, user_id, after_id, since, limit)
+    async with AsyncSessionLocal() as db:
+        if after_id is None:
+            return await crud_notification_push.get_latest_notification_id_async(db, user_id), []
+        return after_id, await crud_notification_push.get_notifications_after_async(db, user_id, after_id, since, limit)
+
+
+@router.websocket("/ws")
+async def notification_stream(websocket: WebSocket, last_id: Optional[int] = None):
+    """Send each new notification as a NotificationRead JSON message.
+
+    Authenticate with an Authorization header or ``?token=``. Pass the id of
+    the last notification received as ``last_id`` to resume after a
+    disconnect; without it only notifications created from now on are sent.
+    """
+    user_id = websocket_user_id(websocket)
+    await websocket.accept()
+    if user_id is None:
+        # Closed after the handshake: a rejected handshake reaches browsers as 1006, which they would retry
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    # Without last_id, the resend window starts now: earlier notifications are not this connection's to send
+    connected_at = datetime.utcnow() if last_id is None else datetime.min
+    # Ids and creation times of the notifications sent within the resend window, which every read covers again
+    sent = {}
+    # Subscribed before the first read, so nothing committed in between is missed
+    with notification_bus.subscribe(user_id) as wake:
+        receiving = asyncio.ensure_future(websocket.receive())
+        try:
+            while True:
+                wake.clear()
+                since = max(connected_at, datetime.utcnow() - timedelta(seconds=NOTIFICATION_PUSH_RESEND_WINDOW_SECONDS))
+                sent = {row_id: created_at for row_id, created_at in sent.items() if created_at >= since}
+                # Room for every resent row plus a full page of new ones
+                limit = PAGE_SIZE_MAX + len(sent)
+                last_id, rows = await fetch_notifications(user_id, last_id, since, limit)
+                for row in rows:
+                    if row.id in sent:
+                        continue
+                    await websocket.send_json(NotificationRead.model_validate(row).model_dump(mode="json"))
+                    sent[row.id] = row.created_at or datetime.min
+                    last_id = max(last_id, row.id)
+                if len(rows) == limit:
+                    continue
+                # Sleep until woken or until the client goes away; client messages are ignored
+                waking = asyncio.ensure_future(wake.wait())
+                done, _ = await asyncio.wait({receiving, waking}, return_when=asyncio.FIRST_COMPLETED)
+                if receiving in done:
+                    waking.cancel()
+                    if receiving.result()["type"] == "websocket.disconnect":
+                        return
+                    receiving = asyncio.ensure_future(websocket.receive())
+        finally:
+            receiving.cancel()
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 from ...db.session import SessionLocal
 from ...crud import crud_user
-from ...schemas.user import UserRead, UserCreate, TeamMemberAdd, TeamMemberRemove
-from ...api.deps import get_db, get_current_user
+from ...schemas.user import UserRead, UserCreate, TeamMemberAdd, TeamMemberRemove, EmailDigestUpdate
+from ...api.deps import get_db, get_current_user, get_fields, get_page, json_response, paginate
 from ...models.user import User
+from ...crud.pagination import Page, id_key
 
 router = APIRouter(prefix="/api/users", tags=["users"])
 
@@ -13,6 +14,18 @@ router = APIRouter(prefix="/api/users", tags=["users"])
 def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
+@router.put("/me/email-digest", response_model=UserRead)
+def set_email_digest(
+    digest_in: EmailDigestUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get notification emails as one digest per EMAIL_DIGEST_WINDOW_MINUTES instead of one per notification"""
+    user = crud_user.set_email_digest(db, current_user.id, digest_in.enabled)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
 @router.get("/managers", response_model=List[UserRead])
 def get_managers(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     """Get all managers that can be requested for feedback"""
@@ -20,13 +33,18 @@ def get_managers(current_user: User = Depends(get_current_user), db: Session = D
     return managers
 
 @router.get("/team", response_model=List[UserRead])
-def get_team_members(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_team_members(
+    response: Response,
+    fields: tuple = Depends(get_fields(UserRead, "id")),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """Get all team members for the current manager"""
     if current_user.role.value != "manager":
         raise HTTPException(status_code=403, detail="Only managers can view team members")
     
-    team_members = crud_user.get_team_members(db, manager_id=current_user.id)
-    return team_members
+    team_members = crud_user.get_team_members(db, manager_id=current_user.id, fields=fields)
+    return json_response(response, team_members)
 
 @router.get("/available-employees", response_model=List[UserRead])
 def get_available_employees(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -52,6 +70,7 @@ def add_team_member(
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     
+    # Only employees can be added, and only managers add them, so no one ends up under their own report
     if employee.role.value != "employee":
         raise HTTPException(status_code=400, detail="Can only add employees to team")
     
@@ -85,7 +104,13 @@ def remove_team_member(
     return {"message": "Employee removed from team successfully"}
 
 @router.get("/all", response_model=List[UserRead])
-def get_all_users(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_all_users(
+    response: Response,
+    page: Page = Depends(get_page),
+    fields: tuple = Depends(get_fields(UserRead, "id")),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
     """Get all users (for peer feedback selection)"""
-    users = crud_user.get_users(db)
-    return users
+    users = crud_user.get_users(db, page=page, fields=fields)
+    return json_response(response, paginate(response, users, page, key=id_key))
@@ -1,8 +1,6 @@
 import os
+import tempfile
 from dotenv import load_dotenv
-import smtplib
-from email.mime.text import MIMEText
-from fastapi import BackgroundTasks
 
 load_dotenv()
 
@@ -12,16 +10,91 @@ SMTP_USER = os.getenv("SMTP_USER")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
 
 FROM_EMAIL = SMTP_USER
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes")
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", 30))
 
-def send_email_background(background_tasks: BackgroundTasks, to_email: str, subject: str, body: str):
-    background_tasks.add_task(send_email, to_email, subject, body)
-
-def send_email(to_email: str, subject: str, body: str):
-    msg = MIMEText(body, "html")
-    msg["Subject"] = subject
-    msg["From"] = FROM_EMAIL
-    msg["To"] = to_email
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASSWORD)
-        server.sendmail(FROM_EMAIL, [to_email], msg.as_string())
+# Mail delivery worker (see core/mail.py): MAIL_WORKERS threads, each keeping one SMTP connection
+# open (closed after MAIL_CONNECTION_IDLE_SECONDS unused) and sending up to MAIL_BATCH_SIZE queued
+# emails per wake-up; transient failures are retried MAIL_MAX_RETRIES times with exponential backoff
+MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", 2))
+MAIL_QUEUE_MAX_SIZE = int(os.getenv("MAIL_QUEUE_MAX_SIZE", 10000))
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", 50))
+MAIL_MAX_RETRIES = int(os.getenv("MAIL_MAX_RETRIES", 3))
+MAIL_RETRY_BACKOFF_SECONDS = float(os.getenv("MAIL_RETRY_BACKOFF_SECONDS", 1))
+MAIL_CONNECTION_IDLE_SECONDS = float(os.getenv("MAIL_CONNECTION_IDLE_SECONDS", 30))
+MAIL_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("MAIL_SHUTDOWN_TIMEOUT_SECONDS", 30))
+
+# Authenticated-user cache (see core/cache.py)
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 10000))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+
+# Password hashing executor (see core/security.py); "thread" or "process"
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 32))
+
+# Keyset pagination of list endpoints (see crud/pagination.py)
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", 100))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", 500))
+
+# Tag catalogue cache (see core/cache.py)
+TAG_CACHE_TTL_SECONDS = float(os.getenv("TAG_CACHE_TTL_SECONDS", 300))
+
+# Conditional-GET response cache (see api/deps.py), keyed by route, user and data version
+RESPONSE_CACHE_MAX_SIZE = int(os.getenv("RESPONSE_CACHE_MAX_SIZE", 1000))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 300))
+
+# Rows fetched per round trip while streaming the analytics export (see crud/crud_analytics.py)
+ANALYTICS_CHUNK_SIZE = int(os.getenv("ANALYTICS_CHUNK_SIZE", 10000))
+
+# Notification push fan-out (see core/notification_bus.py): "memory" wakes only this process's
+# connections, "postgres" relays through LISTEN/NOTIFY so every worker sees every commit
+NOTIFICATION_BUS = os.getenv("NOTIFICATION_BUS", "memory")
+NOTIFICATION_BUS_CHANNEL = os.getenv("NOTIFICATION_BUS_CHANNEL", "feedback_notifications")
+NOTIFICATION_BUS_RECONNECT_SECONDS = float(os.getenv("NOTIFICATION_BUS_RECONNECT_SECONDS", 5))
+# Ids can commit out of order, so each push read also re-reads notifications created this recently
+NOTIFICATION_PUSH_RESEND_WINDOW_SECONDS = float(os.getenv("NOTIFICATION_PUSH_RESEND_WINDOW_SECONDS", 30))
+
+# Notification retention (see crud/crud_notification_retention.py): read notifications older than
+# NOTIFICATION_RETENTION_DAYS are purged by `python -m app.db.purge_notifications`, in batches of
+# NOTIFICATION_PURGE_BATCH_SIZE rows with a pause between them; clear-all switches to the same
+# batched deleter, in the background, above NOTIFICATION_CLEAR_BATCH_THRESHOLD rows
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", 90))
+NOTIFICATION_PURGE_BATCH_SIZE = int(os.getenv("NOTIFICATION_PURGE_BATCH_SIZE", 500))
+NOTIFICATION_PURGE_PAUSE_SECONDS = float(os.getenv("NOTIFICATION_PURGE_PAUSE_SECONDS", 0.1))
+NOTIFICATION_CLEAR_BATCH_THRESHOLD = int(os.getenv("NOTIFICATION_CLEAR_BATCH_THRESHOLD", 1000))
+
+# Transactional outbox (see core/outbox.py): emails are written to the outbox table in the
+# transaction that causes them; each app process runs a dispatcher that claims up to
+# OUTBOX_BATCH_SIZE due messages for OUTBOX_LEASE_SECONDS, hands them to the mail worker, retries
+# failures with exponential backoff from OUTBOX_RETRY_BACKOFF_SECONDS and dead-letters a message
+# after OUTBOX_MAX_ATTEMPTS. Commits in this process wake it; otherwise it polls every
+# OUTBOX_POLL_SECONDS. Sent messages are deleted after OUTBOX_SENT_RETENTION_HOURS
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", 300))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", 2))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))
+OUTBOX_RETRY_BACKOFF_SECONDS = float(os.getenv("OUTBOX_RETRY_BACKOFF_SECONDS", 30))
+OUTBOX_SENT_RETENTION_HOURS = float(os.getenv("OUTBOX_SENT_RETENTION_HOURS", 72))
+
+# Email digests (see crud/crud_email_digest.py): users who opt in get one email per window of
+# EMAIL_DIGEST_WINDOW_MINUTES listing that window's notifications, sent EMAIL_DIGEST_GRACE_SECONDS
+# after the window closes so that transactions still committing into it make the same email
+EMAIL_DIGEST_WINDOW_MINUTES = int(os.getenv("EMAIL_DIGEST_WINDOW_MINUTES", 60))
+EMAIL_DIGEST_GRACE_SECONDS = float(os.getenv("EMAIL_DIGEST_GRACE_SECONDS", 60))
+
+# PDF feedback reports (see core/reports.py): rendered by REPORT_RENDER_WORKERS processes (with at
+# most REPORT_RENDER_MAX_QUEUE more waiting; beyond that, 503) reading REPORT_CHUNK_SIZE rows at a
+# time, and kept in an on-disk LRU under REPORT_CACHE_DIR (made private to the app's user, and
+# refused if another user owns it) of at most REPORT_CACHE_MAX_MB
+REPORT_RENDER_WORKERS = int(os.getenv("REPORT_RENDER_WORKERS", 2))
+REPORT_RENDER_MAX_QUEUE = int(os.getenv("REPORT_RENDER_MAX_QUEUE", 8))
+REPORT_CHUNK_SIZE = int(os.getenv("REPORT_CHUNK_SIZE", 500))
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "feedback-reports")
+REPORT_CACHE_MAX_MB = float(os.getenv("REPORT_CACHE_MAX_MB", 256))
+
+# Rows fetched per round trip while streaming a team export (see core/exports.py)
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 2000))
+
+# Largest batch accepted by POST /api/feedback/bulk and POST /api/feedback/tags/assign
+FEEDBACK_BULK_MAX_ITEMS = int(os.getenv("FEEDBACK_BULK_MAX_ITEMS", 200))
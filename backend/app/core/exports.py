@@ -0,0 +1,167 @@
+"""Streaming team exports: CSV and NDJSON dumps, and a ZIP of the members' PDF reports.
+
+Every format is written as the response goes out, so the first bytes leave at
+once and memory stays flat whatever the size of the team. The CSV and NDJSON
+writers are plain generators that Starlette runs on its thread pool. Each
+opens its own session, since the request's session is closed before the body
+is sent, and reads rows ``EXPORT_CHUNK_SIZE`` at a time
+(crud/crud_export.py). The ZIP writer takes each member's report from the
+report cache, or has the report pool render it (core/reports.py), while up to
+``report_renderer.workers`` later reports are prepared ahead. The entries are
+stored uncompressed, as the PDFs already are compressed, and are written
+through a sink the response drains after every chunk. A member whose report
+cannot be rendered gets a ``feedback_<id>.error.txt`` entry in its place, so
+the archive still covers everyone else and says who is missing.
+"""
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import zipfile
+from collections import deque
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, BinaryIO, Iterator, List
+
+from ..crud.crud_export import EXPORT_COLUMNS, iter_export_records
+from ..db.session import SessionLocal
+from .config import EXPORT_CHUNK_SIZE
+from .reports import READ_CHUNK_SIZE, ReportRendererBusy, ReportWorkerLost, report_renderer
+
+logger = logging.getLogger(__name__)
+
+# Bytes of CSV or NDJSON gathered before they are sent
+FLUSH_BYTES = 64 * 1024
+
+# How long the ZIP writer waits before asking a busy report pool again
+BUSY_RETRY_SECONDS = 1
+
+
+def export_value(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def buffered(lines: Iterator[str]) -> Iterator[bytes]:
+    """Join ``lines`` into chunks of about ``FLUSH_BYTES``"""
+    buffer, size = [], 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= FLUSH_BYTES:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def csv_lines(manager_id: int, org: bool, chunk_size: int) -> Iterator[str]:
+    line = io.StringIO()
+    writer = csv.DictWriter(line, EXPORT_COLUMNS, restval="")
+    writer.writeheader()
+    with SessionLocal() as db:
+        for record in iter_export_records(db, manager_id, org, chunk_size):
+            writer.writerow({key: export_value(value) for key, value in record.items()})
+            yield line.getvalue()
+            line.seek(0)
+            line.truncate()
+    yield line.getvalue()
+
+
+def ndjson_lines(manager_id: int, org: bool, chunk_size: int) -> Iterator[str]:
+    with SessionLocal() as db:
+        for record in iter_export_records(db, manager_id, org, chunk_size):
+            yield json.dumps(record, default=export_value) + "\n"
+
+
+def iter_csv(manager_id: int, org: bool = False, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    return buffered(csv_lines(manager_id, org, chunk_size))
+
+
+def iter_ndjson(manager_id: int, org: bool = False, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    return buffered(ndjson_lines(manager_id, org, chunk_size))
+
+
+class ZipSink:
+    """Write-only file ZipFile streams into; without seek or tell, ZipFile writes data descriptors instead"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+async def report_when_free(employee_id: int, employee_name: str, version: tuple) -> BinaryIO:
+    """The member's report; an export waits for a busy pool rather than failing halfway through.
+
+    Render failures are raised, including a dead worker: retrying a report that kills its worker would loop.
+    """
+    while True:
+        try:
+            return await report_renderer.report(employee_id, employee_name, version)
+        except ReportWorkerLost:
+            raise
+        except ReportRendererBusy:
+            await asyncio.sleep(BUSY_RETRY_SECONDS)
+
+
+def zip_info(name: str) -> zipfile.ZipInfo:
+    return zipfile.ZipInfo(name, datetime.utcnow().timetuple()[:6])
+
+
+async def iter_report_zip(members: List[tuple]) -> AsyncIterator[bytes]:
+    """A ZIP of the PDF report of each ``(id, name, report version)`` member, streamed as it is written"""
+    pending = deque()
+    upcoming = iter(members)
+
+    def prepare_next():
+        for member_id, name, version in upcoming:
+            pending.append((member_id, name, asyncio.ensure_future(report_when_free(member_id, name, version))))
+            return
+
+    for _ in range(max(1, report_renderer.workers)):
+        prepare_next()
+    sink = ZipSink()
+    try:
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as archive:
+            while pending:
+                member_id, name, report = pending.popleft()
+                try:
+                    handle = await report
+                except Exception:
+                    logger.exception("Report of member %s failed; the export lists it as an error", member_id)
+                    handle = None
+                prepare_next()
+                if handle is None:
+                    archive.writestr(zip_info(f"feedback_{member_id}.error.txt"),
+                                     f"The feedback report for {name} could not be generated.\n")
+                    continue
+                with handle:
+                    info = zip_info(f"feedback_{member_id}.pdf")
+                    info.file_size = os.fstat(handle.fileno()).st_size
+                    with archive.open(info, "w") as entry:
+                        while chunk := handle.read(READ_CHUNK_SIZE):
+                            entry.write(chunk)
+                            if data := sink.drain():
+                                yield data
+        yield sink.drain()
+    finally:
+        # The client went away: stop preparing reports and close the ones already open
+        for _, _, report in pending:
+            report.cancel()
+            if report.done() and not report.cancelled() and report.exception() is None:
+                report.result().close()
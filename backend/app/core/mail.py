@@ -0,0 +1,313 @@
+"""Email delivery through a small pool of persistent SMTP connections.
+
+``mail_worker.submit`` only enqueues, so callers never wait on the mail
+server. ``MAIL_WORKERS`` threads drain the bounded queue, each over its
+own SMTP connection that stays open between messages (one STARTTLS and login
+per connection, not per email) and sending everything queued, up to
+``MAIL_BATCH_SIZE``, per wake-up. Transient failures (dropped connections, 4xx
+replies) are retried with exponential backoff; permanent ones are logged and
+counted. ``mail_worker.shutdown()`` flushes the queue before the process exits.
+
+Application emails reach the worker through the transactional outbox
+(core/outbox.py), which uses ``deliver`` to wait for each email's outcome.
+"""
+import logging
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from .config import (
+    FROM_EMAIL, MAIL_BATCH_SIZE, MAIL_CONNECTION_IDLE_SECONDS, MAIL_MAX_RETRIES, MAIL_QUEUE_MAX_SIZE,
+    MAIL_RETRY_BACKOFF_SECONDS, MAIL_SHUTDOWN_TIMEOUT_SECONDS, MAIL_WORKERS, SMTP_HOST, SMTP_PASSWORD, SMTP_PORT,
+    SMTP_STARTTLS, SMTP_TIMEOUT_SECONDS, SMTP_USER,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Email(NamedTuple):
+    to_email: str
+    subject: str
+    body: str
+    # Stable across redeliveries of the same message, so receivers can drop duplicates
+    message_id: Optional[str] = None
+
+
+# Called from a worker thread with each email and the error it failed with (None once delivered)
+OnDone = Callable[[Email, Optional[Exception]], None]
+
+
+class NotSent(Exception):
+    """The worker never attempted the email: mail is disabled, the queue was full, or a wait timed out"""
+
+
+def build_message(email: Email, from_email: Optional[str] = FROM_EMAIL) -> MIMEText:
+    msg = MIMEText(email.body, "html")
+    msg["Subject"] = email.subject
+    msg["From"] = from_email
+    msg["To"] = email.to_email
+    if email.message_id:
+        msg["Message-ID"] = email.message_id
+    return msg
+
+
+def is_transient(exc: Exception) -> bool:
+    """Whether retrying ``exc`` later may succeed: connection trouble, a 4xx reply or an unattempted email"""
+    if isinstance(exc, NotSent):
+        return True
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    # smtplib's other errors are OSErrors too, but only socket-level ones are worth retrying
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+class SMTPSender:
+    """One SMTP connection, opened on first use and reused until closed"""
+
+    def __init__(self, host: Optional[str] = SMTP_HOST, port: int = SMTP_PORT, user: Optional[str] = SMTP_USER,
+                 password: Optional[str] = SMTP_PASSWORD, starttls: bool = SMTP_STARTTLS,
+                 timeout: float = SMTP_TIMEOUT_SECONDS, from_email: Optional[str] = FROM_EMAIL):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.from_email = from_email or user
+        self.connections_opened = 0
+        self._server: Optional[smtplib.SMTP] = None
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._server is None:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.starttls:
+                    server.starttls()
+                if self.user:
+                    server.login(self.user, self.password)
+            except BaseException:
+                server.close()
+                raise
+            self._server = server
+            self.connections_opened += 1
+        return self._server
+
+    def _send(self, email: Email):
+        message = build_message(email, self.from_email).as_string()
+        self._connection().sendmail(self.from_email, [email.to_email], message)
+
+    def send(self, email: Email):
+        reused = self._server is not None
+        try:
+            self._send(email)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            if not reused:
+                raise
+            # The server dropped the kept-alive connection; that is no reason to back off
+            self._send(email)
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            # The server answered: the connection is still good for the next email
+            raise
+        except OSError:
+            self.close()
+            raise
+
+    def close(self):
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+
+
+# Queue sentinel asking one worker thread to exit
+_STOP = object()
+
+
+class MailWorker:
+    """Bounded email queue drained by threads that each own a persistent SMTP connection"""
+
+    def __init__(self, workers: int = MAIL_WORKERS, max_queue: int = MAIL_QUEUE_MAX_SIZE,
+                 batch_size: int = MAIL_BATCH_SIZE, max_retries: int = MAIL_MAX_RETRIES,
+                 backoff: float = MAIL_RETRY_BACKOFF_SECONDS, idle_seconds: float = MAIL_CONNECTION_IDLE_SECONDS,
+                 sender_factory: Callable[[], SMTPSender] = SMTPSender, enabled: bool = SMTP_HOST is not None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.idle_seconds = idle_seconds
+        self.sender_factory = sender_factory
+        # Without an SMTP server configured, emails are dropped on submission
+        self.enabled = enabled
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.connections_opened = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def _start(self):
+        # Threads start on first use so importing this module never spawns any
+        with self._lock:
+            if not self._threads:
+                self._threads = [
+                    threading.Thread(target=self._run, name=f"mail-{i}", daemon=True) for i in range(self.workers)
+                ]
+                for thread in self._threads:
+                    thread.start()
+
+    def submit(self, emails: Iterable[Email], on_done: Optional[OnDone] = None) -> int:
+        """Queue ``emails`` without blocking; returns how many were accepted (the rest are counted as dropped)
+
+        ``on_done`` is called once per accepted email, after its last attempt.
+        """
+        emails = list(emails)
+        if not self.enabled or not emails:
+            return 0
+        self._start()
+        accepted = 0
+        for email in emails:
+            try:
+                self._queue.put_nowait((email, on_done))
+                accepted += 1
+            except queue.Full:
+                with self._lock:
+                    self.dropped += 1
+        if accepted < len(emails):
+            logger.warning("Mail queue full; dropped %d emails", len(emails) - accepted)
+        return accepted
+
+    def deliver(self, emails: List[Email], timeout: Optional[float] = None) -> List[Optional[Exception]]:
+        """Send ``emails`` and wait for them; per email, None once delivered or the error it failed with
+
+        Emails the worker did not get to (disabled, queue full, ``timeout`` ran out) fail with ``NotSent``.
+        """
+        outcomes: Dict[int, Optional[Exception]] = {}
+        finished = threading.Condition()
+
+        def record(email: Email, error: Optional[Exception]):
+            with finished:
+                outcomes[id(email)] = error
+                finished.notify()
+
+        # Distinct objects, so outcomes can be told apart; when the queue fills only a prefix is accepted
+        emails = [Email(*email) for email in emails]
+        accepted = emails[:self.submit(emails, on_done=record)]
+        with finished:
+            finished.wait_for(lambda: len(outcomes) == len(accepted), timeout)
+            return [outcomes.get(id(email), NotSent(email.to_email)) for email in emails]
+
+    def _next_batch(self) -> tuple[List[tuple], bool]:
+        """Block for one email, then take whatever else is queued up to batch_size; True if a stop was taken"""
+        try:
+            first = self._queue.get(timeout=self.idle_seconds)
+        except queue.Empty:
+            return [], False
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                email = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if email is _STOP:
+                return batch, True
+            batch.append(email)
+        return batch, False
+
+    def _deliver(self, sender: SMTPSender, email: Email) -> Optional[Exception]:
+        """Send ``email``, retrying transient failures; None once delivered, else the last error"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                sender.send(email)
+                return None
+            except Exception as exc:
+                if attempt == self.max_retries or not is_transient(exc):
+                    logger.error("Could not send email to %s: %s", email.to_email, exc)
+                    return exc
+                with self._lock:
+                    self.retried += 1
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def _run(self):
+        sender = self.sender_factory()
+        opened = 0
+        try:
+            while True:
+                batch, stop = self._next_batch()
+                if not batch and not stop:
+                    # Idle: release the connection rather than wait for the server to time it out
+                    sender.close()
+                    continue
+                errors = [self._deliver(sender, email) for email, _ in batch]
+                with self._lock:
+                    self.failed += sum(error is not None for error in errors)
+                    self.sent += sum(error is None for error in errors)
+                    self.connections_opened += sender.connections_opened - opened
+                    opened = sender.connections_opened
+                for (email, on_done), error in zip(batch, errors):
+                    if on_done is not None:
+                        on_done(email, error)
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            sender.close()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued email has been handled; False if ``timeout`` ran out first"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float = MAIL_SHUTDOWN_TIMEOUT_SECONDS):
+        """Deliver what is queued (for at most ``timeout`` seconds), then stop the threads"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        if not threads:
+            return
+        if not self.flush(timeout):
+            logger.warning("Mail shutdown timed out with %d emails undelivered", self._queue.qsize())
+        for _ in threads:
+            try:
+                self._queue.put(_STOP, timeout=1)
+            except queue.Full:
+                break
+        for thread in threads:
+            thread.join(timeout=1)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "connections_opened": self.connections_opened,
+        }
+
+
+mail_worker = MailWorker()
+
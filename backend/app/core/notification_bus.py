@@ -0,0 +1,155 @@
+"""Fan-out of "user X has new notifications" signals to open push connections.
+
+The bus carries user ids only, never notification rows: a woken connection
+reads its user's notifications past the last id it sent, so a missed or
+duplicated signal costs at most one extra indexed query, and a client that
+reconnects with its last seen id resumes without gaps.
+
+``NotificationBus`` wakes the connections of the current process and fits a
+single worker. ``PostgresNotificationBus`` sends the signal with
+``pg_notify`` inside the committing transaction (Postgres delivers it only
+if the commit succeeds) and relays what its LISTEN connection receives to the
+local connections, so every worker hears every commit.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, Set
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+
+from ..db.session import DATABASE_URL
+from .config import NOTIFICATION_BUS, NOTIFICATION_BUS_CHANNEL, NOTIFICATION_BUS_RECONNECT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationBus:
+    """In-process bus; ``publish`` may be called from any thread"""
+
+    backend = "memory"
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Event]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        self._loop = None
+
+    @contextmanager
+    def subscribe(self, user_id: int) -> Iterator[asyncio.Event]:
+        """An event set whenever ``user_id`` may have new notifications; call on the event loop"""
+        wake = asyncio.Event()
+        self._subscribers[user_id].add(wake)
+        try:
+            yield wake
+        finally:
+            self._subscribers[user_id].discard(wake)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def before_commit(self, session, user_ids: Set[int]) -> None:
+        """Called inside the transaction that created notifications for ``user_ids``"""
+
+    def after_commit(self, user_ids: Set[int]) -> None:
+        """Called once that transaction has committed"""
+        self.publish(user_ids)
+
+    def publish(self, user_ids: Iterable[int]) -> None:
+        # A no-op outside the app (scripts, benchmarks), where no loop was started
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            self.published += 1
+            loop.call_soon_threadsafe(self._wake, tuple(user_ids))
+
+    def _wake(self, user_ids: Iterable[int]) -> None:
+        for user_id in user_ids:
+            for wake in self._subscribers.get(user_id, ()):
+                wake.set()
+
+    def _wake_all(self) -> None:
+        self._wake(list(self._subscribers))
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "users": len(self._subscribers),
+            "connections": sum(len(events) for events in self._subscribers.values()),
+            "published": self.published,
+        }
+
+
+class PostgresNotificationBus(NotificationBus):
+    """Relays signals between workers through Postgres LISTEN/NOTIFY"""
+
+    backend = "postgres"
+
+    def __init__(self, database_url: str, channel: str = NOTIFICATION_BUS_CHANNEL):
+        super().__init__()
+        # libpq URL for psycopg, whatever SQLAlchemy driver DATABASE_URL names
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.channel = channel
+        self.received = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        await super().start()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await super().stop()
+
+    def before_commit(self, session, user_ids: Set[int]) -> None:
+        self.published += 1
+        session.execute(select(func.pg_notify(self.channel, ",".join(map(str, sorted(user_ids))))))
+
+    def after_commit(self, user_ids: Set[int]) -> None:
+        # Delivered back to this worker by the listener, like to every other one
+        pass
+
+    async def _listen(self) -> None:
+        import psycopg
+
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.dsn, autocommit=True) as conn:
+                    await conn.execute(f'LISTEN "{self.channel}"')
+                    # Signals sent while we were not listening are lost: let every connection re-check
+                    self._wake_all()
+                    async for notify in conn.notifies():
+                        self.received += 1
+                        self._wake(int(user_id) for user_id in notify.payload.split(",") if user_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Notification listener lost its connection; reconnecting")
+                await asyncio.sleep(NOTIFICATION_BUS_RECONNECT_SECONDS)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "received": self.received}
+
+
+def create_notification_bus(kind: str, database_url: str) -> NotificationBus:
+    if kind == "memory":
+        return NotificationBus()
+    if kind == "postgres":
+        if make_url(database_url).get_backend_name() != "postgresql":
+            raise ValueError("NOTIFICATION_BUS=postgres requires a PostgreSQL DATABASE_URL")
+        return PostgresNotificationBus(database_url)
+    raise ValueError(f"Unknown NOTIFICATION_BUS: {kind}")
+
+
+notification_bus = create_notification_bus(NOTIFICATION_BUS, DATABASE_URL)
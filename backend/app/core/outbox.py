@@ -0,0 +1,164 @@
+"""Outbox dispatcher: delivers the emails written to the outbox table (see crud/crud_outbox.py).
+
+One daemon thread per app process claims due messages in batches, hands them
+to the mail worker, whose MAIL_WORKERS connections bound delivery concurrency,
+waits for the outcomes and records them. A commit that wrote outbox rows wakes
+this process's dispatcher straight away; other processes find the rows on
+their next poll. Delivery is at least once: a message whose outcome was never
+recorded (the process died mid-batch) is claimed again after
+OUTBOX_LEASE_SECONDS, with the same Message-ID so receivers can drop the copy.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from ..crud import crud_email_digest, crud_outbox
+from ..db.session import SessionLocal
+from .config import (
+    MAIL_SHUTDOWN_TIMEOUT_SECONDS, OUTBOX_BATCH_SIZE, OUTBOX_LEASE_SECONDS, OUTBOX_MAX_ATTEMPTS, OUTBOX_POLL_SECONDS,
+    OUTBOX_RETRY_BACKOFF_SECONDS, OUTBOX_SENT_RETENTION_HOURS,
+)
+from .mail import MailWorker, mail_worker
+
+logger = logging.getLogger(__name__)
+
+# How often the dispatcher deletes sent messages past OUTBOX_SENT_RETENTION_HOURS
+PURGE_INTERVAL_SECONDS = 600
+
+
+class OutboxDispatcher:
+    """Background thread moving due outbox messages to the mail worker and recording what happened"""
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, mail: MailWorker = mail_worker,
+                 batch_size: int = OUTBOX_BATCH_SIZE, lease: float = OUTBOX_LEASE_SECONDS,
+                 poll: float = OUTBOX_POLL_SECONDS, max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 backoff: float = OUTBOX_RETRY_BACKOFF_SECONDS, sent_retention_hours: float = OUTBOX_SENT_RETENTION_HOURS):
+        self.session_factory = session_factory
+        self.mail = mail
+        self.batch_size = batch_size
+        self.lease = lease
+        self.poll = poll
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.sent_retention_hours = sent_retention_hours
+        self.claimed = 0
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self.errors = 0
+        self.digests_sent = 0
+        self.digest_notifications = 0
+        self.digest_replaced_emails = 0
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mail.enabled
+
+    def start(self):
+        """Start the dispatcher thread; without mail configured there is nothing to dispatch"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="outbox-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = MAIL_SHUTDOWN_TIMEOUT_SECONDS):
+        """Finish the batch in flight (for at most ``timeout`` seconds) and stop; unsent messages stay in the outbox"""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        thread.join(timeout)
+
+    def wake(self):
+        self._wake.set()
+
+    def dispatch_once(self) -> int:
+        """Claim one batch of due messages, deliver it and record the outcomes; returns how many were claimed"""
+        # Never more than the mail queue has room for, so none is turned away
+        limit = min(self.batch_size, self.mail.max_queue)
+        with self.session_factory() as db:
+            rows = crud_outbox.claim_messages(db, limit, self.lease)
+            if not rows:
+                return 0
+            emails, covered = crud_email_digest.emails_for(db, rows)
+        to_send = [email for email in emails if email is not None]
+        errors = iter(self.mail.deliver(to_send, timeout=self.lease))
+        # A row with no email (an emptied digest) is done as it stands
+        outcomes = [(row, None if email is None else next(errors)) for row, email in zip(rows, emails)]
+        with self.session_factory() as db:
+            counts = crud_outbox.record_outcomes(db, outcomes, self.max_attempts, self.backoff)
+        digests = [covered[row.id] for row, error in outcomes if error is None and covered.get(row.id, (0, 0))[0]]
+        with self._lock:
+            self.claimed += len(rows)
+            self.sent += counts[crud_outbox.SENT]
+            self.retried += counts["retried"]
+            self.dead += counts[crud_outbox.DEAD]
+            self.digests_sent += len(digests)
+            self.digest_notifications += sum(notifications for notifications, _ in digests)
+            self.digest_replaced_emails += sum(replaced for _, replaced in digests)
+        if counts[crud_outbox.DEAD]:
+            logger.error("Dead-lettered %d outbox messages", counts[crud_outbox.DEAD])
+        return len(rows)
+
+    def purge_sent(self) -> int:
+        older_than = datetime.utcnow() - timedelta(hours=self.sent_retention_hours)
+        with self.session_factory() as db:
+            return crud_outbox.purge_sent_messages(db, older_than, self.batch_size)
+
+    def _run(self):
+        next_purge = time.monotonic()
+        while not self._stopping.is_set():
+            claimed = 0
+            try:
+                claimed = self.dispatch_once()
+                if time.monotonic() >= next_purge:
+                    self.purge_sent()
+                    next_purge = time.monotonic() + PURGE_INTERVAL_SECONDS
+            except Exception:
+                # A database hiccup must not kill the thread; the batch is claimed again after its lease
+                logger.exception("Outbox dispatch failed")
+                with self._lock:
+                    self.errors += 1
+            if claimed < self.batch_size:
+                self._wake.wait(self.poll)
+                self._wake.clear()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self._thread is not None,
+            "claimed": self.claimed,
+            "sent": self.sent,
+            "retried": self.retried,
+            "dead": self.dead,
+            "errors": self.errors,
+            "digests_sent": self.digests_sent,
+            "digest_notifications": self.digest_notifications,
+            # Each digest stands in for the emails its notifications' transactions would have sent
+            "emails_saved_by_digests": self.digest_replaced_emails - self.digests_sent,
+        }
+
+
+outbox_dispatcher = OutboxDispatcher()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_dispatcher(session):
+    if session.info.pop(crud_outbox.OUTBOX_ENQUEUED_KEY, False):
+        outbox_dispatcher.wake()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_enqueued(session):
+    session.info.pop(crud_outbox.OUTBOX_ENQUEUED_KEY, None)
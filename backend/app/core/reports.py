@@ -0,0 +1,280 @@
+"""Feedback PDF reports, rendered in a process pool and cached on disk.
+
+A report is cached under its employee and version (the latest feedback
+``updated_at`` and the row count, see crud/crud_report.py), so a download is
+a file read until the employee's feedback changes. Misses are rendered by a
+small process pool, keeping FPDF's CPU time off the request threads and the
+GIL; the worker streams rows ``REPORT_CHUNK_SIZE`` at a time rather than
+loading the whole history, and writes the PDF straight into the cache. The
+cache is an LRU over file modification times, trimmed to
+``REPORT_CACHE_MAX_MB`` after every render; that trim spares the report just
+rendered, so even one larger than the whole cache is served once. The cache
+directory is private to the app's user, as reports hold employees' feedback.
+"""
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import BinaryIO, Dict, Iterator, Optional
+
+from fpdf import FPDF
+
+from .config import (
+    REPORT_CACHE_DIR, REPORT_CACHE_MAX_MB, REPORT_CHUNK_SIZE, REPORT_RENDER_MAX_QUEUE, REPORT_RENDER_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout changes, so reports cached by an older release are not served
+REPORT_LAYOUT_VERSION = 1
+
+# Bytes per read when streaming a cached report to the client
+READ_CHUNK_SIZE = 64 * 1024
+
+# Renders of one report a request may wait for when other renders' trims keep evicting it
+RENDER_ATTEMPTS = 3
+
+
+def report_key(employee_id: int, employee_name: str, version: tuple) -> str:
+    raw = repr((REPORT_LAYOUT_VERSION, employee_id, employee_name, *version))
+    return f"{employee_id}-{hashlib.sha256(raw.encode()).hexdigest()[:32]}"
+
+
+class ReportRenderFailed(Exception):
+    """A render's error as it crosses back from the worker; some errors (FPDF's among them) cannot be unpickled,
+    and one that fails to unpickle breaks the whole pool"""
+
+
+def render_feedback_report(employee_id: int, employee_name: str, path: str, chunk_size: int = REPORT_CHUNK_SIZE) -> int:
+    """Write the employee's feedback report to ``path``; returns its size. Runs in a report worker process."""
+    try:
+        return write_feedback_report(employee_id, employee_name, path, chunk_size)
+    except Exception as error:
+        raise ReportRenderFailed(f"{type(error).__name__}: {error}") from None
+
+
+def write_feedback_report(employee_id: int, employee_name: str, path: str, chunk_size: int) -> int:
+    from ..crud.crud_report import iter_report_chunks
+    from ..db.session import SessionLocal
+    from ..models import user  # noqa: F401  (registers User for the Feedback relationships)
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("helvetica", size=12)
+    pdf.cell(200, 10, text=f"Feedback Report for {employee_name}", new_x="LMARGIN", new_y="NEXT", align="C")
+    pdf.ln(10)
+    with SessionLocal() as db:
+        for chunk in iter_report_chunks(db, employee_id, chunk_size):
+            for created_at, strengths, areas_to_improve, sentiment, acknowledged in chunk:
+                pdf.multi_cell(0, 10, text=f"Date: {created_at.strftime('%Y-%m-%d %H:%M')}\nStrengths: {strengths}\nAreas to Improve: {areas_to_improve}\nSentiment: {sentiment.value}\nAcknowledged: {acknowledged}\n---", align="L")
+                pdf.ln(2)
+    # Written beside the target and renamed into place, so readers never see a partial file
+    partial = f"{path}.{os.getpid()}.partial"
+    pdf.output(partial)
+    os.replace(partial, path)
+    return os.path.getsize(path)
+
+
+class ReportCache:
+    """Reports on disk, least recently downloaded evicted first once they exceed ``max_bytes``"""
+
+    def __init__(self, directory: str = REPORT_CACHE_DIR, max_bytes: int = int(REPORT_CACHE_MAX_MB * 1024 * 1024)):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def open(self, key: str) -> Optional[BinaryIO]:
+        """The cached report, opened for reading, or None. An open report stays readable even if evicted."""
+        path = self.path(key)
+        try:
+            handle = open(path, "rb")
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return handle
+
+    def prepare(self):
+        """Create the cache directory readable by this user only; refuse one that another user owns"""
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        info = os.stat(self.directory)
+        # The default lives in the shared temp dir, where anyone could have created it first
+        if hasattr(os, "getuid") and info.st_uid != os.getuid():
+            raise PermissionError(f"Report cache directory {self.directory} belongs to another user; set REPORT_CACHE_DIR")
+        if info.st_mode & 0o077:
+            os.chmod(self.directory, 0o700)
+
+    def trim(self, keep: Optional[str] = None) -> int:
+        """Evict least recently used reports until the cache fits in ``max_bytes``; returns how many went.
+
+        The report under ``keep`` is neither evicted nor counted, so one just rendered survives to be served.
+        """
+        kept = f"{keep}.pdf" if keep is not None else None
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(".pdf") and entry.name != kept:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                evicted += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self.evictions += evicted
+        return evicted
+
+    def stats(self) -> dict:
+        return {
+            "directory": self.directory,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class ReportRendererBusy(Exception):
+    """Raised when every report worker is busy and the queue is full, a worker died mid-render, or the cache keeps
+    evicting a fresh report"""
+
+
+class ReportWorkerLost(ReportRendererBusy):
+    """Raised when the render's worker died; a retry goes to a new pool, but the same report may kill it again"""
+
+
+class ReportRenderer:
+    """Process pool rendering reports into the cache; concurrent requests for one report share its render.
+
+    At most ``workers`` renders run at once and at most ``max_queue`` more may
+    wait; further renders fail fast with ``ReportRendererBusy``. A worker that
+    dies breaks the whole pool, failing every render in it; the pool is then
+    dropped and the next render starts a new one.
+    """
+
+    def __init__(self, cache: ReportCache, workers: int = REPORT_RENDER_WORKERS, max_queue: int = REPORT_RENDER_MAX_QUEUE):
+        self.cache = cache
+        self.workers = workers
+        self.max_queue = max_queue
+        self.renders = 0
+        self.rejected = 0
+        self.broken_pools = 0
+        self._in_flight: Dict[str, Future] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily, so only a process that serves reports starts workers. Spawned rather than forked:
+        # the app process runs mail, outbox and thread pool threads whose locks a fork could copy mid-use
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _discard(self, executor: ProcessPoolExecutor):
+        # Called with the lock held. The broken pool has already stopped its workers; only the reference goes
+        if self._executor is executor:
+            self._executor = None
+            self.broken_pools += 1
+            logger.error("A report worker died; the next render starts a new pool")
+
+    def _finish(self, key: str, executor: ProcessPoolExecutor, future: Future):
+        error = None if future.cancelled() else future.exception()
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if isinstance(error, BrokenProcessPool):
+                self._discard(executor)
+        if not future.cancelled() and error is None:
+            self.cache.trim(keep=key)
+
+    def _submit(self, key: str, employee_id: int, employee_name: str) -> Future:
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                return future
+            if len(self._in_flight) >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise ReportRendererBusy()
+            self.cache.prepare()
+            executor = self._get_executor()
+            try:
+                future = executor.submit(render_feedback_report, employee_id, employee_name, self.cache.path(key))
+            except BrokenProcessPool:
+                self._discard(executor)
+                raise ReportWorkerLost()
+            self._in_flight[key] = future
+            self.renders += 1
+        future.add_done_callback(lambda done: self._finish(key, executor, done))
+        return future
+
+    async def report(self, employee_id: int, employee_name: str, version: tuple) -> BinaryIO:
+        """The employee's report at ``version``, opened for reading: from the cache, or rendered into it first"""
+        key = report_key(employee_id, employee_name, version)
+        handle = self.cache.open(key)
+        for _ in range(RENDER_ATTEMPTS):
+            if handle is not None:
+                return handle
+            try:
+                await asyncio.wrap_future(self._submit(key, employee_id, employee_name))
+            except BrokenProcessPool:
+                raise ReportWorkerLost()
+            # Its own trim spares the new report, but another render's trim may still evict it before it is opened
+            handle = self.cache.open(key)
+        if handle is None:
+            raise ReportRendererBusy()
+        return handle
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": len(self._in_flight),
+            "renders": self.renders,
+            "rejected": self.rejected,
+            "broken_pools": self.broken_pools,
+            "cache": self.cache.stats(),
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+def iter_report(handle: BinaryIO) -> Iterator[bytes]:
+    """Stream an opened report, closing it at the end"""
+    with handle:
+        while True:
+            chunk = handle.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+report_renderer = ReportRenderer(ReportCache())
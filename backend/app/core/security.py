@@ -2,8 +2,12 @@ from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from typing import Optional
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
 import os
+import threading
 from dotenv import load_dotenv
+from .config import PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE
 
 load_dotenv()
 
@@ -19,6 +23,78 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+class PasswordHashPoolBusy(Exception):
+    """Raised when the password hashing pool has no free worker or queue slot"""
+
+class PasswordHashPool:
+    """Dedicated bcrypt executor, so hashing can't starve the request threadpool.
+
+    At most ``workers`` hashes run at once and at most ``max_queue`` more may
+    wait; further submissions fail fast with ``PasswordHashPoolBusy``.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 4, max_queue: int = 32):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash executor: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        # Created lazily so importing this module never forks worker processes
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+            return self._executor
+
+    def _release(self, _future=None):
+        with self._lock:
+            self.in_flight -= 1
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PasswordHashPoolBusy()
+            self.in_flight += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+password_hash_pool = PasswordHashPool(PASSWORD_HASH_EXECUTOR, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_QUEUE)
+
+async def verify_password_async(plain_password, hashed_password):
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await password_hash_pool.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,146 @@
+"""Manager dashboard statistics, each computed in a single aggregate pass.
+
+Every figure is a conditional count over the same feedback rows
+(``COUNT(CASE WHEN ... THEN id END)``, the portable spelling of
+``COUNT(*) FILTER (WHERE ...)``), so a dashboard costs one scan however many
+figures it shows. The org-wide overview adds the user_hierarchy closure table
+to reach a whole reporting subtree in the same single query.
+"""
+from types import SimpleNamespace
+from typing import List, Optional
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.feedback import Feedback, SentimentEnum
+from ..models.user import User, UserHierarchy
+
+
+def percentage(count: int, total: int) -> float:
+    return round((count / total * 100) if total > 0 else 0, 1)
+
+
+def feedback_stats_columns():
+    """Total, per-sentiment and acknowledged counts of the selected feedback rows"""
+    return [
+        func.count(Feedback.id).label("total"),
+        *(
+            func.count(case((Feedback.sentiment == sentiment, Feedback.id))).label(sentiment.value)
+            for sentiment in SentimentEnum
+        ),
+        func.count(case((Feedback.acknowledged == True, Feedback.id))).label("acknowledged"),  # noqa: E712
+    ]
+
+
+def manager_overview_query(manager_id: int):
+    return select(*feedback_stats_columns()).where(Feedback.manager_id == manager_id)
+
+
+def shape_overview(row) -> dict:
+    return {
+        "total_feedback": row.total,
+        "positive_percentage": percentage(row.positive, row.total),
+        "neutral_percentage": percentage(row.neutral, row.total),
+        "negative_percentage": percentage(row.negative, row.total),
+        "positive_count": row.positive,
+        "neutral_count": row.neutral,
+        "negative_count": row.negative,
+    }
+
+
+def team_stats_query(manager_id: int, employee_id: Optional[int] = None):
+    """One row per team member, members without feedback included"""
+    query = (
+        select(User.id, User.name, User.email, *feedback_stats_columns())
+        .outerjoin(Feedback, and_(Feedback.employee_id == User.id, Feedback.manager_id == manager_id))
+        .where(User.manager_id == manager_id)
+        .group_by(User.id, User.name, User.email)
+        .order_by(User.id)
+    )
+    if employee_id is not None:
+        query = query.where(User.id == employee_id)
+    return query
+
+
+def shape_member_stats(row) -> dict:
+    return {
+        "employee_id": row.id,
+        "employee_name": row.name,
+        "employee_email": row.email,
+        "total_feedback": row.total,
+        "acknowledged_feedback": row.acknowledged,
+        "positive_feedback": row.positive,
+        "neutral_feedback": row.neutral,
+        "negative_feedback": row.negative,
+        "satisfaction_score": percentage(row.positive, row.total),
+        "positive_percentage": percentage(row.positive, row.total),
+        "neutral_percentage": percentage(row.neutral, row.total),
+        "negative_percentage": percentage(row.negative, row.total),
+    }
+
+
+def org_teams_query(user_id: int):
+    """Stats per manager in ``user_id``'s subtree, themselves included, who has given feedback"""
+    return (
+        select(UserHierarchy.descendant_id.label("manager_id"), User.name, UserHierarchy.depth, *feedback_stats_columns())
+        .select_from(UserHierarchy)
+        .join(Feedback, Feedback.manager_id == UserHierarchy.descendant_id)
+        .join(User, User.id == UserHierarchy.descendant_id)
+        .where(UserHierarchy.ancestor_id == user_id)
+        .group_by(UserHierarchy.descendant_id, User.name, UserHierarchy.depth)
+        .order_by(UserHierarchy.depth, UserHierarchy.descendant_id)
+    )
+
+
+def shape_org_overview(rows) -> dict:
+    """Org totals (summed from the per-team rows, so still one query) plus the teams themselves"""
+    fields = ("total", *(sentiment.value for sentiment in SentimentEnum), "acknowledged")
+    totals = dict.fromkeys(fields, 0)
+    teams = []
+    for row in rows:
+        teams.append({
+            "manager_id": row.manager_id,
+            "manager_name": row.name,
+            "depth": row.depth,
+            **shape_overview(row),
+            "acknowledged_count": row.acknowledged,
+        })
+        for field in fields:
+            totals[field] += getattr(row, field)
+    return {**shape_overview(SimpleNamespace(**totals)), "acknowledged_count": totals["acknowledged"], "teams": teams}
+
+
+def get_manager_overview(db: Session, manager_id: int) -> dict:
+    return shape_overview(db.execute(manager_overview_query(manager_id)).one())
+
+
+def get_team_member_stats(db: Session, manager_id: int, employee_id: int) -> Optional[dict]:
+    """Stats for one team member; None if the employee is not in the manager's team"""
+    row = db.execute(team_stats_query(manager_id, employee_id)).first()
+    return shape_member_stats(row) if row else None
+
+
+def get_team_stats(db: Session, manager_id: int) -> List[dict]:
+    return [shape_member_stats(row) for row in db.execute(team_stats_query(manager_id))]
+
+
+def get_org_overview(db: Session, user_id: int) -> dict:
+    return shape_org_overview(db.execute(org_teams_query(user_id)))
+
+
+async def get_manager_overview_async(db: AsyncSession, manager_id: int) -> dict:
+    return shape_overview((await db.execute(manager_overview_query(manager_id))).one())
+
+
+async def get_team_member_stats_async(db: AsyncSession, manager_id: int, employee_id: int) -> Optional[dict]:
+    row = (await db.execute(team_stats_query(manager_id, employee_id))).first()
+    return shape_member_stats(row) if row else None
+
+
+async def get_team_stats_async(db: AsyncSession, manager_id: int) -> List[dict]:
+    return [shape_member_stats(row) for row in await db.execute(team_stats_query(manager_id))]
+
+
+async def get_org_overview_async(db: AsyncSession, user_id: int) -> dict:
+    return shape_org_overview(await db.execute(org_teams_query(user_id)))
@@ -0,0 +1,52 @@
+"""Per-user data versions behind the conditional GETs of dashboards and feedback lists.
+
+Writes that change a user's feedback, tags or notifications call
+``touch_users``; the affected ``users.data_version`` counters are bumped by one
+UPDATE when that transaction commits, so a version never runs ahead of (or
+behind) the data it stands for.
+"""
+from typing import Iterable, Optional
+
+from sqlalchemy import event, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.user import User
+
+# Session.info key collecting the users whose data the pending transaction changes
+TOUCHED_USERS_KEY = "touched_user_ids"
+
+
+def touch_users(db, user_ids: Iterable[Optional[int]]):
+    """Bump the data version of ``user_ids`` when ``db`` (sync or async) next commits"""
+    db.info.setdefault(TOUCHED_USERS_KEY, set()).update(user_id for user_id in user_ids if user_id is not None)
+
+
+def bump_data_versions_statement(user_ids: Iterable[int]):
+    # Sorted so concurrent writers lock the user rows in the same order
+    return (
+        update(User)
+        .where(User.id.in_(sorted(user_ids)))
+        .values(data_version=User.data_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_touched_users(session):
+    user_ids = session.info.pop(TOUCHED_USERS_KEY, None)
+    if user_ids:
+        session.execute(bump_data_versions_statement(user_ids))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_touched_users(session):
+    session.info.pop(TOUCHED_USERS_KEY, None)
+
+
+def get_data_version(db: Session, user_id: int) -> Optional[int]:
+    return db.execute(select(User.data_version).where(User.id == user_id)).scalar()
+
+
+async def get_data_version_async(db: AsyncSession, user_id: int) -> Optional[int]:
+    return (await db.execute(select(User.data_version).where(User.id == user_id))).scalar()
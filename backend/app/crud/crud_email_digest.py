@@ -0,0 +1,224 @@
+"""Per-user email digests: one email per EMAIL_DIGEST_WINDOW_MINUTES instead of one per notification.
+
+Writes that create notifications call ``schedule_digests``. When the
+transaction commits, every recipient in digest mode (``users.email_digest``)
+gets one outbox message for the fixed window the notification falls in, due
+EMAIL_DIGEST_GRACE_SECONDS after the end of that window. The first notification
+of a window schedules the digest and the rest join it (``insert_digests``); a
+transaction that commits after its window's digest was claimed schedules a
+follow-up for its own notifications instead. The outbox dispatcher renders each due digest from the user's notifications in
+that window (``emails_for``), so the digest always reflects what is still there
+when it goes out.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from html import escape
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, event, select, true, update
+from sqlalchemy.orm import Session
+
+from ..core.config import EMAIL_DIGEST_GRACE_SECONDS, EMAIL_DIGEST_WINDOW_MINUTES
+from ..core.mail import Email
+from ..models.feedback import Notification
+from ..models.outbox import OutboxMessage
+from ..models.user import User
+from .crud_outbox import EMAIL, PENDING, as_email, message_id
+from .statements import upsert_insert
+
+DIGEST = "digest"
+DIGEST_SUBJECT = "Your feedback notifications"
+# Notifications listed in one digest; the rest are summarised as "and N more"
+DIGEST_MAX_ITEMS = 20
+
+# Session.info keys collecting the (user, notification time) pairs the pending transaction notifies:
+# users whose digest mode is still to be looked up, and users known to be in digest mode
+DIGEST_WINDOWS_KEY = "digest_windows"
+DIGEST_USER_WINDOWS_KEY = "digest_user_windows"
+
+
+def digest_window(moment: datetime, minutes: int = EMAIL_DIGEST_WINDOW_MINUTES) -> Tuple[datetime, datetime]:
+    """Start and end of the fixed window containing ``moment``"""
+    size = timedelta(minutes=minutes)
+    start = datetime.min + (moment - datetime.min) // size * size
+    return start, start + size
+
+
+def schedule_digests(db, user_ids: Iterable[Optional[int]], created_at: datetime,
+                     digest_users: Optional[Set[int]] = None):
+    """Queue a digest for those of ``user_ids`` in digest mode once ``db`` (sync or async) commits.
+
+    Callers that already read the users' ``email_digest`` pass the ones in digest mode as ``digest_users``,
+    which spares the lookup at commit.
+    """
+    if digest_users is None:
+        db.info.setdefault(DIGEST_WINDOWS_KEY, set()).update(
+            (user_id, created_at) for user_id in user_ids if user_id is not None
+        )
+    else:
+        db.info.setdefault(DIGEST_USER_WINDOWS_KEY, set()).update(
+            (user_id, created_at) for user_id in user_ids if user_id in digest_users
+        )
+
+
+def digest_dedupe_key(user_id: int, start: datetime, since: Optional[datetime] = None) -> str:
+    key = f"digest:{user_id}:{start:%Y%m%dT%H%M}"
+    return key if since is None else f"{key}:{since:%H%M%S%f}"
+
+
+def digest_windows(user_moments: Iterable[Tuple[int, datetime]]) -> Dict[Tuple[int, datetime], datetime]:
+    """Each (user, window start) the ``(user_id, created_at)`` pairs fall in, with its earliest notification time"""
+    windows = {}
+    for user_id, created_at in user_moments:
+        start, _ = digest_window(created_at)
+        since = windows.get((user_id, start))
+        windows[(user_id, start)] = created_at if since is None else min(since, created_at)
+    return windows
+
+
+def digest_row(user_id: int, start: datetime, now: datetime, since: Optional[datetime] = None,
+               minutes: int = EMAIL_DIGEST_WINDOW_MINUTES, grace: float = EMAIL_DIGEST_GRACE_SECONDS) -> dict:
+    """The digest of ``user_id``'s notifications in the window from ``start``, or only those from ``since`` on"""
+    end = start + timedelta(minutes=minutes)
+    return {
+        "kind": DIGEST,
+        "dedupe_key": digest_dedupe_key(user_id, start, since),
+        "payload": {"user_id": user_id, "start": (since or start).isoformat(), "end": end.isoformat()},
+        "status": PENDING,
+        "attempts": 0,
+        # Held back until the window closes, so every notification in it makes the one email, and for a grace
+        # period after that for the transactions still committing into it
+        "available_at": max(end, now) + timedelta(seconds=grace),
+        "created_at": now,
+    }
+
+
+def insert_digests(session: Session, windows: Dict[Tuple[int, datetime], datetime],
+                   grace: float = EMAIL_DIGEST_GRACE_SECONDS):
+    """Join the digest of each (user, window start) in ``windows``, or schedule one.
+
+    A digest the dispatcher has not claimed yet is joined: its row stays locked until this transaction commits,
+    so it cannot be rendered without these notifications, and when its window is over it is held back for
+    another grace period. A digest that is already claimed or sent gets a follow-up covering the notifications
+    from the earliest one of this transaction to the end of the window.
+    """
+    now = datetime.utcnow()
+    keys = {digest_dedupe_key(user_id, start): (user_id, start) for user_id, start in windows}
+    joinable = and_(OutboxMessage.status == PENDING, OutboxMessage.attempts == 0)
+    existing = dict(session.execute(
+        select(OutboxMessage.dedupe_key, joinable).where(OutboxMessage.dedupe_key.in_(keys)).with_for_update()
+    ).all())
+    later = now + timedelta(seconds=grace)
+    overdue = [key for key, (_, start) in keys.items() if existing.get(key) and digest_window(start)[1] < now]
+    if overdue:
+        session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.dedupe_key.in_(overdue), joinable, OutboxMessage.available_at < later)
+            .values(available_at=later)
+            .execution_options(synchronize_session=False)
+        )
+    rows = [
+        digest_row(user_id, start, now, None if key not in existing else windows[(user_id, start)])
+        for key, (user_id, start) in keys.items() if not existing.get(key)
+    ]
+    if not rows:
+        return
+    insert = upsert_insert(session.get_bind().dialect.name, OutboxMessage.__table__)
+    if insert is not None:
+        session.execute(insert.values(rows).on_conflict_do_nothing(index_elements=[OutboxMessage.dedupe_key]))
+        return
+    taken = set(session.scalars(
+        select(OutboxMessage.dedupe_key).where(OutboxMessage.dedupe_key.in_([row["dedupe_key"] for row in rows]))
+    ))
+    fresh = [row for row in rows if row["dedupe_key"] not in taken]
+    if fresh:
+        session.add_all(OutboxMessage(**row) for row in fresh)
+
+
+@event.listens_for(Session, "before_commit")
+def _schedule_digests(session):
+    user_moments = session.info.pop(DIGEST_WINDOWS_KEY, set())
+    digest_user_moments = session.info.pop(DIGEST_USER_WINDOWS_KEY, set())
+    if user_moments:
+        digest_users = set(session.scalars(
+            select(User.id).where(User.id.in_({user_id for user_id, _ in user_moments}), User.email_digest == true())
+        ))
+        digest_user_moments |= {(user_id, created_at) for user_id, created_at in user_moments if user_id in digest_users}
+    if digest_user_moments:
+        # Not due until the window closes, so there is no dispatcher to wake
+        insert_digests(session, digest_windows(digest_user_moments))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_digests(session):
+    session.info.pop(DIGEST_WINDOWS_KEY, None)
+    session.info.pop(DIGEST_USER_WINDOWS_KEY, None)
+
+
+def render_digest(notifications: List[Notification]) -> str:
+    items = "".join(
+        f"<li>{escape(notification.message)} <small>({notification.created_at:%Y-%m-%d %H:%M} UTC)</small></li>"
+        for notification in notifications[:DIGEST_MAX_ITEMS]
+    )
+    more = len(notifications) - DIGEST_MAX_ITEMS
+    return (
+        f"<p>You have {len(notifications)} new notification{'s' if len(notifications) != 1 else ''}:</p>"
+        f"<ul>{items}</ul>" + (f"<p>...and {more} more.</p>" if more > 0 else "")
+    )
+
+
+def digest_notifications(db: Session, digests: list) -> Dict[int, List[Notification]]:
+    """Each digest row's notifications, oldest first, by one query over all of the rows' users and windows"""
+    windows = {row.id: (row.payload["user_id"], datetime.fromisoformat(row.payload["start"]),
+                        datetime.fromisoformat(row.payload["end"])) for row in digests}
+    by_user = defaultdict(list)
+    for notification in db.scalars(
+        select(Notification)
+        .where(
+            Notification.user_id.in_({user_id for user_id, _, _ in windows.values()}),
+            Notification.created_at >= min(start for _, start, _ in windows.values()),
+            Notification.created_at < max(end for _, _, end in windows.values()),
+        )
+        .order_by(Notification.created_at, Notification.id)
+    ):
+        by_user[notification.user_id].append(notification)
+    return {
+        row_id: [n for n in by_user[user_id] if start <= n.created_at < end]
+        for row_id, (user_id, start, end) in windows.items()
+    }
+
+
+def replaced_emails(notifications: List[Notification]) -> int:
+    """Emails ``notifications`` would have made outside digest mode: one per transaction that wrote them.
+
+    A transaction's notifications share its ``created_at``, and it emails each recipient once however many
+    feedback items they got (see ``feedback_email_rows``).
+    """
+    return len({notification.created_at for notification in notifications})
+
+
+def emails_for(db: Session, rows: list) -> Tuple[List[Optional[Email]], Dict[int, Tuple[int, int]]]:
+    """Each claimed row's email (None for a digest with nothing left to say), and for each digest the number of
+    notifications it lists and of emails it replaces"""
+    digests = [row for row in rows if row.kind == DIGEST]
+    covered: Dict[int, List[Notification]] = {}
+    recipients: Dict[int, str] = {}
+    if digests:
+        covered = digest_notifications(db, digests)
+        recipients = dict(db.execute(
+            select(User.id, User.email).where(User.id.in_({row.payload["user_id"] for row in digests}))
+        ).all())
+    emails = []
+    for row in rows:
+        if row.kind == EMAIL:
+            emails.append(as_email(row))
+            continue
+        notifications = covered[row.id]
+        to_email = recipients.get(row.payload["user_id"])
+        emails.append(
+            Email(to_email, DIGEST_SUBJECT, render_digest(notifications), message_id(row))
+            if notifications and to_email else None
+        )
+    return emails, {
+        row_id: (len(notifications), replaced_emails(notifications)) for row_id, notifications in covered.items()
+    }
@@ -0,0 +1,100 @@
+"""Queries behind the manager team export: the members, and every record about them, streamed in chunks.
+
+The feedback, peer feedback and comments received by a manager's direct
+reports (with ``org``, everyone below them) are read through ``yield_per``,
+which also asks the driver for a server-side cursor where it has one, so
+the rows arrive a chunk at a time however large the team is. The names of
+both sides are joined in SQL. The author of anonymous peer feedback is
+withheld there too, as it is from the employee.
+"""
+from typing import Iterator, List
+
+from sqlalchemy import case, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased
+
+from ..models.feedback import Feedback, FeedbackComment, PeerFeedback
+from ..models.user import User
+from .crud_hierarchy import report_ids
+
+FEEDBACK, PEER_FEEDBACK, COMMENT = "feedback", "peer_feedback", "comment"
+
+# Every column an export record may have, in CSV order; each record type fills its own subset
+EXPORT_COLUMNS = (
+    "record_type", "id", "created_at", "employee_id", "employee_name", "author_id", "author_name", "sentiment",
+    "strengths", "areas_to_improve", "acknowledged", "is_anonymous", "feedback_id", "content",
+)
+
+
+def export_members_query(manager_id: int, org: bool):
+    """Each member's id and name with the version of their PDF report (see crud/crud_report.py)"""
+    return (
+        select(User.id, User.name, func.max(Feedback.updated_at), func.count(Feedback.id))
+        .outerjoin(Feedback, Feedback.employee_id == User.id)
+        .where(User.id.in_(report_ids(manager_id, org)))
+        .group_by(User.id, User.name)
+        .order_by(User.id)
+    )
+
+
+def get_export_members(db: Session, manager_id: int, org: bool = False) -> List[tuple]:
+    rows = db.execute(export_members_query(manager_id, org))
+    return [(user_id, name, (updated_at, count)) for user_id, name, updated_at, count in rows]
+
+
+async def get_export_members_async(db: AsyncSession, manager_id: int, org: bool = False) -> List[tuple]:
+    rows = await db.execute(export_members_query(manager_id, org))
+    return [(user_id, name, (updated_at, count)) for user_id, name, updated_at, count in rows]
+
+
+def export_queries(manager_id: int, org: bool) -> List[tuple]:
+    """``(record type, query)`` pairs covering everything the team received"""
+    members = report_ids(manager_id, org)
+    employee, author = aliased(User), aliased(User)
+    feedback = (
+        select(
+            Feedback.id, Feedback.created_at, Feedback.employee_id, employee.name.label("employee_name"),
+            Feedback.manager_id.label("author_id"), author.name.label("author_name"), Feedback.sentiment,
+            Feedback.strengths, Feedback.areas_to_improve, Feedback.acknowledged,
+        )
+        .join(employee, employee.id == Feedback.employee_id)
+        .join(author, author.id == Feedback.manager_id)
+        .where(Feedback.employee_id.in_(members))
+        .order_by(Feedback.employee_id, Feedback.created_at, Feedback.id)
+    )
+    anonymous = PeerFeedback.is_anonymous == true()
+    peer_feedback = (
+        select(
+            PeerFeedback.id, PeerFeedback.created_at, PeerFeedback.to_user_id.label("employee_id"),
+            employee.name.label("employee_name"),
+            case((anonymous, None), else_=PeerFeedback.from_user_id).label("author_id"),
+            case((anonymous, None), else_=author.name).label("author_name"),
+            PeerFeedback.sentiment, PeerFeedback.strengths, PeerFeedback.areas_to_improve, PeerFeedback.is_anonymous,
+        )
+        .join(employee, employee.id == PeerFeedback.to_user_id)
+        .join(author, author.id == PeerFeedback.from_user_id)
+        .where(PeerFeedback.to_user_id.in_(members))
+        .order_by(PeerFeedback.to_user_id, PeerFeedback.created_at, PeerFeedback.id)
+    )
+    comments = (
+        select(
+            FeedbackComment.id, FeedbackComment.created_at, Feedback.employee_id, employee.name.label("employee_name"),
+            FeedbackComment.user_id.label("author_id"), author.name.label("author_name"),
+            FeedbackComment.feedback_id, FeedbackComment.content,
+        )
+        .join(Feedback, Feedback.id == FeedbackComment.feedback_id)
+        .join(employee, employee.id == Feedback.employee_id)
+        .join(author, author.id == FeedbackComment.user_id)
+        .where(Feedback.employee_id.in_(members))
+        .order_by(FeedbackComment.feedback_id, FeedbackComment.created_at, FeedbackComment.id)
+    )
+    return [(FEEDBACK, feedback), (PEER_FEEDBACK, peer_feedback), (COMMENT, comments)]
+
+
+def iter_export_records(db: Session, manager_id: int, org: bool, chunk_size: int) -> Iterator[dict]:
+    """Every record the team received as a dict keyed by export column, ``chunk_size`` rows per round trip"""
+    for record_type, query in export_queries(manager_id, org):
+        result = db.execute(query.execution_options(yield_per=chunk_size))
+        for partition in result.mappings().partitions():
+            for row in partition:
+                yield {"record_type": record_type, **row}
@@ -1,66 +1,234 @@
-from sqlalchemy.orm import Session, joinedload
-from ..models.feedback import Feedback, SentimentEnum, FeedbackRequest, FeedbackRequestStatus, PeerFeedback, FeedbackComment, Tag, Notification
+from sqlalchemy import case, delete, false, func, insert, select, true, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+from ..models.feedback import Feedback, SentimentEnum, FeedbackRequest, FeedbackRequestStatus, PeerFeedback, FeedbackComment, Tag, Notification, feedback_tag
 from ..models.user import User
-from ..schemas.feedback import FeedbackCreate, FeedbackUpdate, FeedbackRequestCreate, PeerFeedbackCreate, FeedbackCommentCreate, TagCreate, NotificationCreate
-from typing import List, Optional
+from ..schemas.feedback import FeedbackCreate, FeedbackUpdate, FeedbackRequestCreate, PeerFeedbackCreate, FeedbackCommentCreate, TagCreate, NotificationCreate, FeedbackRead, FeedbackReadWithEmployee, NotificationRead, PeerFeedbackRead, TagRead
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+from collections import defaultdict
+from datetime import datetime
+from .pagination import Page, apply_keyset
+from .statements import schema_columns, update_returning, upsert_insert
+from .crud_sentiment_rollup import record_sentiment_changes
+from .crud_data_version import touch_users
+from .crud_notification_push import announce_notifications
+from .crud_outbox import email_rows, mark_enqueued
+from .crud_email_digest import schedule_digests
+from ..models.outbox import OutboxMessage
+from ..core.cache import TAG_CATALOGUE_KEY, tag_cache
 
-def create_feedback(db: Session, manager_id: int, feedback_in: FeedbackCreate) -> Feedback:
+def create_feedback(db: Session, manager_id: int, feedback_in: FeedbackCreate, commit: bool = True) -> Feedback:
+    now = datetime.utcnow()
     feedback = Feedback(
         manager_id=manager_id,
         employee_id=feedback_in.employee_id,
         strengths=feedback_in.strengths,
         areas_to_improve=feedback_in.areas_to_improve,
         sentiment=feedback_in.sentiment,
+        created_at=now,
+        updated_at=now,
+        tags=[],
     )
     db.add(feedback)
-    db.commit()
-    db.refresh(feedback)
+    record_sentiment_changes(db, [(manager_id, feedback_in.employee_id, now, feedback_in.sentiment, 1)])
+    touch_users(db, [manager_id, feedback_in.employee_id])
+    if commit:
+        db.commit()
     return feedback
 
+FEEDBACK_NOTIFICATION_MESSAGE = "You have received new feedback from your manager."
+FEEDBACK_EMAIL_SUBJECT = "New Feedback Received"
+FEEDBACK_EMAIL_BODY = f"<p>{FEEDBACK_NOTIFICATION_MESSAGE}</p>"
+
+def feedback_email_dedupe_key(feedback_id: int) -> str:
+    return f"feedback:{feedback_id}:email"
+
+def feedback_email_rows(created_rows, team: Dict[int, str], digest_users: Set[int]) -> List[dict]:
+    """Outbox rows emailing each employee who received feedback, once per employee however many items they got.
+
+    Employees in ``digest_users`` get theirs in their next digest instead.
+    """
+    first_feedback = {}
+    for row in sorted(created_rows, key=lambda row: row.id):
+        if row.employee_id not in digest_users:
+            first_feedback.setdefault(row.employee_id, row.id)
+    return email_rows(
+        (team[employee_id], FEEDBACK_EMAIL_SUBJECT, FEEDBACK_EMAIL_BODY, feedback_email_dedupe_key(feedback_id))
+        for employee_id, feedback_id in first_feedback.items()
+    )
+
+# Columns handed back by the bulk INSERT ... RETURNING, in FeedbackRead order
+FEEDBACK_RETURNING = (
+    Feedback.id, Feedback.manager_id, Feedback.employee_id, Feedback.strengths, Feedback.areas_to_improve,
+    Feedback.sentiment, Feedback.created_at, Feedback.updated_at, Feedback.acknowledged,
+)
+
+def plan_feedback_bulk(manager_id: int, items: List[FeedbackCreate], team: Dict[int, str]) -> Tuple[List[dict], List[dict], List[dict]]:
+    """Split a batch into per-item results plus the feedback and notification rows to insert"""
+    results, feedback_rows, notification_rows = [], [], []
+    now = datetime.utcnow()
+    for index, item in enumerate(items):
+        result = {"index": index, "employee_id": item.employee_id, "feedback": None, "error": None}
+        results.append(result)
+        if item.employee_id not in team:
+            result["error"] = "Employee not found in your team"
+            continue
+        feedback_rows.append({
+            "manager_id": manager_id,
+            "employee_id": item.employee_id,
+            "strengths": item.strengths,
+            "areas_to_improve": item.areas_to_improve,
+            "sentiment": item.sentiment,
+            "created_at": now,
+            "updated_at": now,
+        })
+        notification_rows.append({
+            "user_id": item.employee_id, "message": FEEDBACK_NOTIFICATION_MESSAGE, "type": "feedback", "read": False,
+            "created_at": now,
+        })
+    return results, feedback_rows, notification_rows
+
+def sentiment_rollup_changes(feedback_rows: List[dict]) -> list:
+    return [(row["manager_id"], row["employee_id"], row["created_at"], row["sentiment"], 1) for row in feedback_rows]
+
+def lock_feedback_sentiment(criteria: tuple):
+    """SELECT ... FOR UPDATE of the fields the sentiment rollup is keyed on"""
+    return (
+        select(Feedback.manager_id, Feedback.employee_id, Feedback.created_at, Feedback.sentiment)
+        .where(*criteria)
+        .with_for_update()
+    )
+
+def sentiment_rollup_moves(row, new_sentiment) -> list:
+    """Rollup changes moving one feedback item from its current sentiment to ``new_sentiment``"""
+    if row is None or row.sentiment.value == getattr(new_sentiment, "value", new_sentiment):
+        return []
+    return [
+        (row.manager_id, row.employee_id, row.created_at, row.sentiment, -1),
+        (row.manager_id, row.employee_id, row.created_at, new_sentiment, 1),
+    ]
+
+def fill_feedback_bulk(results: List[dict], created_rows) -> List[dict]:
+    """Attach the inserted rows to the accepted items"""
+    # A multi-row INSERT assigns ids in VALUES order; RETURNING itself is unordered.
+    # (sort_by_parameter_order would make SQLite fall back to one INSERT per row.)
+    created = iter(sorted(created_rows, key=lambda row: row.id))
+    for result in results:
+        if result["error"] is None:
+            result["feedback"] = {**next(created)._mapping, "tags": []}
+    return results
+
+def create_feedback_bulk(db: Session, manager_id: int, items: List[FeedbackCreate]) -> List[dict]:
+    """Create feedback for many team members in one transaction, with their emails in the outbox.
+
+    Returns a result per item.
+    """
+    members = (
+        db.query(User.id, User.email, User.email_digest)
+        .filter(User.manager_id == manager_id, User.id.in_({item.employee_id for item in items}))
+        .all()
+    )
+    team = {member.id: member.email for member in members}
+    results, feedback_rows, notification_rows = plan_feedback_bulk(manager_id, items, team)
+    if not feedback_rows:
+        return results
+    created_rows = db.execute(
+        insert(Feedback).returning(*FEEDBACK_RETURNING), feedback_rows
+    ).all()
+    db.execute(insert(Notification), notification_rows)
+    digest_users = {member.id for member in members if member.email_digest}
+    outbox_rows = feedback_email_rows(created_rows, team, digest_users)
+    if outbox_rows:
+        db.execute(insert(OutboxMessage), outbox_rows)
+        mark_enqueued(db)
+    record_sentiment_changes(db, sentiment_rollup_changes(feedback_rows))
+    touch_users(db, [manager_id, *team])
+    announce_notifications(db, [row["user_id"] for row in notification_rows])
+    schedule_digests(db, [row["user_id"] for row in notification_rows], notification_rows[0]["created_at"], digest_users)
+    db.commit()
+    return fill_feedback_bulk(results, created_rows)
+
 def get_feedback_by_id(db: Session, feedback_id: int) -> Optional[Feedback]:
     return db.query(Feedback).filter(Feedback.id == feedback_id).first()
 
-def get_feedback_for_employee(db: Session, employee_id: int) -> List[Feedback]:
-    return db.query(Feedback).filter(Feedback.employee_id == employee_id).order_by(Feedback.created_at.desc()).all()
+# Feedback list items are built from plain rows rather than ORM objects: shaped like the response models in SQL
+# (see schema_columns), they need no validation and are encoded as they are (see api/deps.json_response).
+# A sparse fieldset (?fields=) narrows the columns selected, and skips the tag query when tags are not asked for.
+FEEDBACK_FIELDS = tuple(FeedbackRead.model_fields)
+MANAGER_FEEDBACK_FIELDS = tuple(FeedbackReadWithEmployee.model_fields)
+EMPLOYEE_DETAIL_FIELDS = {"employee_name", "employee_email"}
+TAG_FIELDS = tuple(TagRead.model_fields)
+
+def employee_feedback_query(employee_id: int, fields: Sequence[str] = FEEDBACK_FIELDS):
+    """Feedback received by the employee, one FeedbackRead row each (narrowed to ``fields``), tags aside"""
+    return select(*schema_columns(FeedbackRead, Feedback, fields)).where(Feedback.employee_id == employee_id)
+
+def manager_feedback_query(manager_id: int, fields: Sequence[str] = MANAGER_FEEDBACK_FIELDS):
+    """Feedback given by the manager with employee details, one FeedbackReadWithEmployee row each, tags aside"""
+    query = select(*schema_columns(
+        FeedbackReadWithEmployee, Feedback, fields,
+        employee_name=func.coalesce(User.name, "Unknown Employee"),
+        employee_email=func.coalesce(User.email, "unknown@example.com"),
+    ))
+    if not EMPLOYEE_DETAIL_FIELDS.isdisjoint(fields):
+        query = query.outerjoin(User, User.id == Feedback.employee_id)
+    return query.where(Feedback.manager_id == manager_id)
+
+def tag_items_query(feedback_ids: List[int]):
+    return (
+        select(feedback_tag.c.feedback_id, *schema_columns(TagRead, Tag))
+        .join(Tag, Tag.id == feedback_tag.c.tag_id)
+        .where(feedback_tag.c.feedback_id.in_(feedback_ids))
+    )
+
+def wants_tags(rows: list, fields: Sequence[str]) -> bool:
+    return bool(rows) and "tags" in fields
+
+def feedback_items(rows: list, tag_rows: list, fields: Sequence[str]) -> List[dict]:
+    tags_by_feedback = defaultdict(list)
+    for feedback_id, *tag in tag_rows:
+        tags_by_feedback[feedback_id].append(dict(zip(TAG_FIELDS, tag)))
+    return [
+        {name: tags_by_feedback[row.id] if name == "tags" else row._mapping[name] for name in fields}
+        for row in rows
+    ]
+
+def get_feedback_list(db: Session, query, page: Optional[Page], fields: Sequence[str]) -> List[dict]:
+    # Two statements however many rows: the feedback rows, then every tag of those rows
+    rows = db.execute(apply_keyset(query, page, Feedback.created_at, Feedback.id)).all()
+    tag_rows = db.execute(tag_items_query([row.id for row in rows])).all() if wants_tags(rows, fields) else []
+    return feedback_items(rows, tag_rows, fields)
+
+def get_feedback_for_employee(db: Session, employee_id: int, page: Optional[Page] = None,
+                              fields: Sequence[str] = FEEDBACK_FIELDS) -> List[dict]:
+    return get_feedback_list(db, employee_feedback_query(employee_id, fields), page, fields)
 
-def get_feedback_for_manager(db: Session, manager_id: int) -> List[dict]:
+def get_feedback_for_manager(db: Session, manager_id: int, page: Optional[Page] = None,
+                             fields: Sequence[str] = MANAGER_FEEDBACK_FIELDS) -> List[dict]:
     """Get feedback for manager with employee details"""
-    feedbacks = db.query(Feedback).filter(Feedback.manager_id == manager_id).order_by(Feedback.created_at.desc()).all()
-    
-    result = []
-    for feedback in feedbacks:
-        # Get employee details
-        employee = db.query(User).filter(User.id == feedback.employee_id).first()
-        
-        feedback_dict = {
-            "id": feedback.id,
-            "manager_id": feedback.manager_id,
-            "employee_id": feedback.employee_id,
-            "strengths": feedback.strengths,
-            "areas_to_improve": feedback.areas_to_improve,
-            "sentiment": feedback.sentiment,
-            "created_at": feedback.created_at,
-            "updated_at": feedback.updated_at,
-            "acknowledged": feedback.acknowledged,
-            "tags": feedback.tags,
-            "employee_name": employee.name if employee else "Unknown Employee",
-            "employee_email": employee.email if employee else "unknown@example.com"
-        }
-        result.append(feedback_dict)
-    
-    return result
-
-def update_feedback(db: Session, feedback: Feedback, feedback_in: FeedbackUpdate) -> Feedback:
-    for field, value in feedback_in.dict(exclude_unset=True).items():
-        setattr(feedback, field, value)
+    return get_feedback_list(db, manager_feedback_query(manager_id, fields), page, fields)
+
+def update_feedback(db: Session, feedback_id: int, manager_id: int, feedback_in: FeedbackUpdate) -> Optional[Feedback]:
+    """Update a manager's own feedback; None if it does not exist or belongs to someone else"""
+    criteria = (Feedback.id == feedback_id, Feedback.manager_id == manager_id)
+    values = feedback_in.dict(exclude_unset=True)
+    if values.get("sentiment") is not None:
+        current = db.execute(lock_feedback_sentiment(criteria)).first()
+        record_sentiment_changes(db, sentiment_rollup_moves(current, values["sentiment"]))
+    feedback = update_returning(db, Feedback, criteria, values, options=(selectinload(Feedback.tags),))
+    if feedback:
+        touch_users(db, [feedback.manager_id, feedback.employee_id])
     db.commit()
-    db.refresh(feedback)
     return feedback
 
-def acknowledge_feedback(db: Session, feedback: Feedback) -> Feedback:
-    feedback.acknowledged = True
+def acknowledge_feedback(db: Session, feedback_id: int, employee_id: int) -> Optional[Feedback]:
+    """Acknowledge feedback addressed to ``employee_id``; None if there is no such feedback"""
+    feedback = update_returning(
+        db, Feedback, (Feedback.id == feedback_id, Feedback.employee_id == employee_id),
+        {"acknowledged": True}, options=(selectinload(Feedback.tags),),
+    )
+    if feedback:
+        touch_users(db, [feedback.manager_id, feedback.employee_id])
     db.commit()
-    db.refresh(feedback)
     return feedback
 
 # Feedback Request CRUD
@@ -73,22 +241,26 @@ def create_feedback_request(db: Session, requester_id: int, request_in: Feedback
     )
     db.add(request)
     db.commit()
-    db.refresh(request)
     return request
 
 def get_feedback_request_by_id(db: Session, request_id: int) -> Optional[FeedbackRequest]:
     return db.query(FeedbackRequest).filter(FeedbackRequest.id == request_id).first()
 
-def get_feedback_requests_made(db: Session, user_id: int) -> List[FeedbackRequest]:
-    return db.query(FeedbackRequest).filter(FeedbackRequest.requester_id == user_id).order_by(FeedbackRequest.created_at.desc()).all()
+def get_feedback_requests_made(db: Session, user_id: int, page: Optional[Page] = None) -> List[FeedbackRequest]:
+    query = db.query(FeedbackRequest).filter(FeedbackRequest.requester_id == user_id)
+    return apply_keyset(query, page, FeedbackRequest.created_at, FeedbackRequest.id).all()
 
-def get_feedback_requests_received(db: Session, user_id: int) -> List[FeedbackRequest]:
-    return db.query(FeedbackRequest).filter(FeedbackRequest.target_id == user_id).order_by(FeedbackRequest.created_at.desc()).all()
+def get_feedback_requests_received(db: Session, user_id: int, page: Optional[Page] = None) -> List[FeedbackRequest]:
+    query = db.query(FeedbackRequest).filter(FeedbackRequest.target_id == user_id)
+    return apply_keyset(query, page, FeedbackRequest.created_at, FeedbackRequest.id).all()
 
-def update_feedback_request_status(db: Session, request: FeedbackRequest, status: FeedbackRequestStatus) -> FeedbackRequest:
-    request.status = status
+def update_feedback_request_status(db: Session, request_id: int, target_id: int, status: FeedbackRequestStatus) -> Optional[FeedbackRequest]:
+    """Set the status of a request addressed to ``target_id``; None if there is no such request"""
+    request = update_returning(
+        db, FeedbackRequest, (FeedbackRequest.id == request_id, FeedbackRequest.target_id == target_id),
+        {"status": status},
+    )
     db.commit()
-    db.refresh(request)
     return request
 
 # Peer Feedback CRUD
@@ -104,14 +276,19 @@ def create_peer_feedback(db: Session, from_user_id: int, feedback_in: PeerFeedba
     )
     db.add(feedback)
     db.commit()
-    db.refresh(feedback)
     return feedback
 
-def get_peer_feedback_given(db: Session, user_id: int) -> List[PeerFeedback]:
-    return db.query(PeerFeedback).filter(PeerFeedback.from_user_id == user_id).order_by(PeerFeedback.created_at.desc()).all()
+def get_peer_feedback_given(db: Session, user_id: int, page: Optional[Page] = None) -> List[dict]:
+    query = select(*schema_columns(PeerFeedbackRead, PeerFeedback)).where(PeerFeedback.from_user_id == user_id)
+    return [dict(row) for row in db.execute(apply_keyset(query, page, PeerFeedback.created_at, PeerFeedback.id)).mappings()]
 
-def get_peer_feedback_received(db: Session, user_id: int) -> List[PeerFeedback]:
-    return db.query(PeerFeedback).filter(PeerFeedback.to_user_id == user_id).order_by(PeerFeedback.created_at.desc()).all()
+def get_peer_feedback_received(db: Session, user_id: int, page: Optional[Page] = None) -> List[dict]:
+    """Peer feedback received, with the author withheld from anonymous entries"""
+    query = select(*schema_columns(
+        PeerFeedbackRead, PeerFeedback,
+        from_user_id=case((PeerFeedback.is_anonymous == true(), None), else_=PeerFeedback.from_user_id),
+    )).where(PeerFeedback.to_user_id == user_id)
+    return [dict(row) for row in db.execute(apply_keyset(query, page, PeerFeedback.created_at, PeerFeedback.id)).mappings()]
 
 # Feedback Comment CRUD
 
@@ -123,11 +300,11 @@ def create_feedback_comment(db: Session, feedback_id: int, user_id: int, comment
     )
     db.add(comment)
     db.commit()
-    db.refresh(comment)
     return comment
 
-def get_feedback_comments(db: Session, feedback_id: int) -> List[FeedbackComment]:
-    return db.query(FeedbackComment).filter(FeedbackComment.feedback_id == feedback_id).order_by(FeedbackComment.created_at.asc()).all()
+def get_feedback_comments(db: Session, feedback_id: int, page: Optional[Page] = None) -> List[FeedbackComment]:
+    query = db.query(FeedbackComment).filter(FeedbackComment.feedback_id == feedback_id)
+    return apply_keyset(query, page, FeedbackComment.created_at, FeedbackComment.id, descending=False).all()
 
 # Tag CRUD
 
@@ -135,52 +312,155 @@ def create_tag(db: Session, tag_in: TagCreate) -> Tag:
     tag = Tag(name=tag_in.name)
     db.add(tag)
     db.commit()
-    db.refresh(tag)
+    tag_cache.invalidate(TAG_CATALOGUE_KEY)
     return tag
 
-def get_all_tags(db: Session) -> list[Tag]:
-    return db.query(Tag).all()
+def get_all_tags(db: Session) -> list[dict]:
+    """The tag catalogue, served from tag_cache"""
+    tags = tag_cache.get(TAG_CATALOGUE_KEY)
+    if tags is None:
+        tags = [{"id": tag_id, "name": name} for tag_id, name in db.query(Tag.id, Tag.name).all()]
+        tag_cache.set(TAG_CATALOGUE_KEY, tags)
+    return tags
 
-def add_tag_to_feedback(db: Session, feedback: Feedback, tag: Tag):
-    if tag not in feedback.tags:
-        feedback.tags.append(tag)
-        db.commit()
-        db.refresh(feedback)
-    return feedback
+def get_tag_by_id(db: Session, tag_id: int) -> Optional[Tag]:
+    return db.query(Tag).filter(Tag.id == tag_id).first()
 
-def remove_tag_from_feedback(db: Session, feedback: Feedback, tag: Tag):
-    if tag in feedback.tags:
-        feedback.tags.remove(tag)
-        db.commit()
-        db.refresh(feedback)
-    return feedback
+def get_existing_tag_ids(db: Session, tag_ids: Set[int]) -> Set[int]:
+    return {tag_id for (tag_id,) in db.query(Tag.id).filter(Tag.id.in_(tag_ids))} if tag_ids else set()
+
+def get_owned_feedback_ids(db: Session, manager_id: int, feedback_ids: Set[int]) -> Set[int]:
+    query = db.query(Feedback.id).filter(Feedback.id.in_(feedback_ids), Feedback.manager_id == manager_id)
+    return {feedback_id for (feedback_id,) in query}
+
+def get_tags_by_feedback(db: Session, feedback_ids: List[int]) -> Dict[int, List[Tag]]:
+    """Tags of many feedback items in one query"""
+    tags_by_feedback = defaultdict(list)
+    if feedback_ids:
+        tag_rows = (
+            db.query(feedback_tag.c.feedback_id, Tag)
+            .join(Tag, Tag.id == feedback_tag.c.tag_id)
+            .filter(feedback_tag.c.feedback_id.in_(feedback_ids))
+            .all()
+        )
+        for feedback_id, tag in tag_rows:
+            tags_by_feedback[feedback_id].append(tag)
+    return tags_by_feedback
+
+def insert_feedback_tags(db: Session):
+    """INSERT into feedback_tag that skips pairs which are already tagged"""
+    statement = upsert_insert(db.get_bind().dialect.name, feedback_tag)
+    if statement is not None:
+        return statement.on_conflict_do_nothing()
+    return insert(feedback_tag).prefix_with("IGNORE", dialect="mysql")
+
+def add_tag_to_feedback(db: Session, feedback: Feedback, tag_id: int):
+    db.execute(insert_feedback_tags(db).values(feedback_id=feedback.id, tag_id=tag_id))
+    touch_users(db, [feedback.manager_id, feedback.employee_id])
+    db.commit()
+
+def remove_tag_from_feedback(db: Session, feedback: Feedback, tag_id: int):
+    db.execute(delete(feedback_tag).where(feedback_tag.c.feedback_id == feedback.id, feedback_tag.c.tag_id == tag_id))
+    touch_users(db, [feedback.manager_id, feedback.employee_id])
+    db.commit()
+
+def set_feedback_tags(db: Session, feedback_ids: Set[int], tag_ids: Set[int], replace: bool = False) -> Dict[int, List[Tag]]:
+    """Add ``tag_ids`` to every feedback item, or make them its only tags when ``replace`` is set.
+
+    One INSERT covers every (feedback, tag) pair, plus one DELETE when replacing; both commit together.
+    """
+    if replace:
+        stale = delete(feedback_tag).where(feedback_tag.c.feedback_id.in_(feedback_ids))
+        if tag_ids:
+            stale = stale.where(feedback_tag.c.tag_id.not_in(tag_ids))
+        db.execute(stale)
+    if tag_ids:
+        db.execute(insert_feedback_tags(db).values([
+            {"feedback_id": feedback_id, "tag_id": tag_id} for feedback_id in feedback_ids for tag_id in tag_ids
+        ]))
+    touch_users(db, {user_id for row in feedback_owners(db, feedback_ids) for user_id in row})
+    db.commit()
+    return get_tags_by_feedback(db, list(feedback_ids))
+
+def feedback_owners(db: Session, feedback_ids: Set[int]) -> List[Tuple[int, int]]:
+    """(manager_id, employee_id) of each feedback item"""
+    return db.query(Feedback.manager_id, Feedback.employee_id).filter(Feedback.id.in_(feedback_ids)).all()
 
 def get_tags_for_feedback(db: Session, feedback: Feedback) -> list[Tag]:
     return feedback.tags
 
 # Notification CRUD
 
-def create_notification(db: Session, notification_in: NotificationCreate) -> Notification:
+def create_notification(db: Session, notification_in: NotificationCreate, commit: bool = True) -> Notification:
     notification = Notification(
         user_id=notification_in.user_id,
         message=notification_in.message,
-        type=notification_in.type
+        type=notification_in.type,
+        read=False,
+        created_at=datetime.utcnow(),
     )
     db.add(notification)
-    db.commit()
-    db.refresh(notification)
+    touch_users(db, [notification_in.user_id])
+    announce_notifications(db, [notification_in.user_id])
+    schedule_digests(db, [notification_in.user_id], notification.created_at)
+    if commit:
+        db.commit()
     return notification
 
-def get_notifications_for_user(db: Session, user_id: int) -> list[Notification]:
-    return db.query(Notification).filter(Notification.user_id == user_id).order_by(Notification.created_at.desc()).all()
+def notifications_query(user_id: int, page: Optional[Page] = None):
+    query = select(*schema_columns(NotificationRead, Notification)).where(Notification.user_id == user_id)
+    return apply_keyset(query, page, Notification.created_at, Notification.id)
 
-def mark_notification_as_read(db: Session, notification: Notification) -> Notification:
-    notification.read = True
+def get_notifications_for_user(db: Session, user_id: int, page: Optional[Page] = None) -> List[dict]:
+    return [dict(row) for row in db.execute(notifications_query(user_id, page)).mappings()]
+
+def mark_notification_as_read(db: Session, notification_id: int, user_id: int) -> Optional[Notification]:
+    """Mark one of ``user_id``'s notifications read; None if there is no such notification"""
+    notification = update_returning(
+        db, Notification, (Notification.id == notification_id, Notification.user_id == user_id), {"read": True},
+    )
+    if notification:
+        touch_users(db, [user_id])
     db.commit()
-    db.refresh(notification)
     return notification
 
-def delete_all_notifications_for_user(db: Session, user_id: int) -> int:
-    num_deleted = db.query(Notification).filter(Notification.user_id == user_id).delete()
+def unread_notifications_query(user_id: int):
+    """Count of ``user_id``'s unread notifications, answered from the ix_notification_user_id_unread partial index"""
+    return select(func.count()).select_from(Notification).where(
+        Notification.user_id == user_id, Notification.read == false(),
+    )
+
+def mark_notifications_read_statement(user_id: int, notification_ids: Optional[Set[int]] = None):
+    """One UPDATE marking ``user_id``'s unread notifications (or just ``notification_ids``) read"""
+    statement = update(Notification).where(Notification.user_id == user_id, Notification.read == false())
+    if notification_ids is not None:
+        statement = statement.where(Notification.id.in_(notification_ids))
+    return statement.values(read=True).execution_options(synchronize_session=False)
+
+def delete_notifications_statement(user_id: int, before: Optional[datetime] = None):
+    """One DELETE of ``user_id``'s notifications, or only those created before ``before``"""
+    statement = delete(Notification).where(Notification.user_id == user_id)
+    if before is not None:
+        statement = statement.where(Notification.created_at < before)
+    return statement.execution_options(synchronize_session=False)
+
+def count_unread_notifications(db: Session, user_id: int) -> int:
+    return db.execute(unread_notifications_query(user_id)).scalar()
+
+def mark_notifications_as_read(db: Session, user_id: int, notification_ids: Optional[Set[int]] = None) -> int:
+    """Mark all of ``user_id``'s notifications, or those of ``notification_ids`` they own, read; returns how many changed"""
+    num_updated = db.execute(mark_notifications_read_statement(user_id, notification_ids)).rowcount
+    if num_updated:
+        touch_users(db, [user_id])
+    db.commit()
+    return num_updated
+
+def delete_notifications_for_user(db: Session, user_id: int, before: Optional[datetime] = None) -> int:
+    num_deleted = db.execute(delete_notifications_statement(user_id, before)).rowcount
+    if num_deleted:
+        touch_users(db, [user_id])
     db.commit()
     return num_deleted
+
+def delete_all_notifications_for_user(db: Session, user_id: int) -> int:
+    return delete_notifications_for_user(db, user_id)
@@ -0,0 +1,162 @@
+"""Async counterparts of crud_feedback, used by the async route variants"""
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from ..models.feedback import Feedback, Notification
+from ..models.user import User
+from ..schemas.feedback import FeedbackCreate, FeedbackUpdate, NotificationCreate
+from typing import List, Optional, Sequence, Set
+from datetime import datetime
+from .pagination import Page, apply_keyset
+from .statements import update_returning_async
+from .crud_feedback import (
+    FEEDBACK_RETURNING, plan_feedback_bulk, fill_feedback_bulk, sentiment_rollup_changes, lock_feedback_sentiment,
+    sentiment_rollup_moves, unread_notifications_query, mark_notifications_read_statement, delete_notifications_statement,
+    feedback_email_rows, FEEDBACK_FIELDS, MANAGER_FEEDBACK_FIELDS, employee_feedback_query, manager_feedback_query,
+    tag_items_query, wants_tags, feedback_items, notifications_query,
+)
+from .crud_sentiment_rollup import record_sentiment_changes_async
+from .crud_data_version import touch_users
+from .crud_notification_push import announce_notifications
+from .crud_outbox import mark_enqueued
+from .crud_email_digest import schedule_digests
+from ..models.outbox import OutboxMessage
+
+async def create_feedback(db: AsyncSession, manager_id: int, feedback_in: FeedbackCreate, commit: bool = True) -> Feedback:
+    now = datetime.utcnow()
+    feedback = Feedback(
+        manager_id=manager_id,
+        employee_id=feedback_in.employee_id,
+        strengths=feedback_in.strengths,
+        areas_to_improve=feedback_in.areas_to_improve,
+        sentiment=feedback_in.sentiment,
+        created_at=now,
+        updated_at=now,
+        tags=[],
+    )
+    db.add(feedback)
+    await record_sentiment_changes_async(db, [(manager_id, feedback_in.employee_id, now, feedback_in.sentiment, 1)])
+    touch_users(db, [manager_id, feedback_in.employee_id])
+    if commit:
+        await db.commit()
+    return feedback
+
+async def create_feedback_bulk(db: AsyncSession, manager_id: int, items: List[FeedbackCreate]) -> List[dict]:
+    """Create feedback for many team members in one transaction, with their emails in the outbox"""
+    result = await db.execute(
+        select(User.id, User.email, User.email_digest)
+        .where(User.manager_id == manager_id, User.id.in_({item.employee_id for item in items}))
+    )
+    members = result.all()
+    team = {member.id: member.email for member in members}
+    results, feedback_rows, notification_rows = plan_feedback_bulk(manager_id, items, team)
+    if not feedback_rows:
+        return results
+    created = await db.execute(
+        insert(Feedback).returning(*FEEDBACK_RETURNING), feedback_rows
+    )
+    created_rows = created.all()
+    await db.execute(insert(Notification), notification_rows)
+    digest_users = {member.id for member in members if member.email_digest}
+    outbox_rows = feedback_email_rows(created_rows, team, digest_users)
+    if outbox_rows:
+        await db.execute(insert(OutboxMessage), outbox_rows)
+        mark_enqueued(db)
+    await record_sentiment_changes_async(db, sentiment_rollup_changes(feedback_rows))
+    touch_users(db, [manager_id, *team])
+    announce_notifications(db, [row["user_id"] for row in notification_rows])
+    schedule_digests(db, [row["user_id"] for row in notification_rows], notification_rows[0]["created_at"], digest_users)
+    await db.commit()
+    return fill_feedback_bulk(results, created_rows)
+
+async def get_feedback_by_id(db: AsyncSession, feedback_id: int) -> Optional[Feedback]:
+    result = await db.execute(
+        select(Feedback).options(selectinload(Feedback.tags)).where(Feedback.id == feedback_id)
+    )
+    return result.scalar_one_or_none()
+
+async def get_feedback_list(db: AsyncSession, query, page: Optional[Page], fields: Sequence[str]) -> List[dict]:
+    rows = (await db.execute(apply_keyset(query, page, Feedback.created_at, Feedback.id))).all()
+    tag_rows = (await db.execute(tag_items_query([row.id for row in rows]))).all() if wants_tags(rows, fields) else []
+    return feedback_items(rows, tag_rows, fields)
+
+async def get_feedback_for_employee(db: AsyncSession, employee_id: int, page: Optional[Page] = None,
+                                    fields: Sequence[str] = FEEDBACK_FIELDS) -> List[dict]:
+    return await get_feedback_list(db, employee_feedback_query(employee_id, fields), page, fields)
+
+async def get_feedback_for_manager(db: AsyncSession, manager_id: int, page: Optional[Page] = None,
+                                   fields: Sequence[str] = MANAGER_FEEDBACK_FIELDS) -> List[dict]:
+    """Get feedback for manager with employee details"""
+    return await get_feedback_list(db, manager_feedback_query(manager_id, fields), page, fields)
+
+async def update_feedback(db: AsyncSession, feedback_id: int, manager_id: int, feedback_in: FeedbackUpdate) -> Optional[Feedback]:
+    criteria = (Feedback.id == feedback_id, Feedback.manager_id == manager_id)
+    values = feedback_in.dict(exclude_unset=True)
+    if values.get("sentiment") is not None:
+        current = (await db.execute(lock_feedback_sentiment(criteria))).first()
+        await record_sentiment_changes_async(db, sentiment_rollup_moves(current, values["sentiment"]))
+    feedback = await update_returning_async(db, Feedback, criteria, values, options=(selectinload(Feedback.tags),))
+    if feedback:
+        touch_users(db, [feedback.manager_id, feedback.employee_id])
+    await db.commit()
+    return feedback
+
+async def acknowledge_feedback(db: AsyncSession, feedback_id: int, employee_id: int) -> Optional[Feedback]:
+    feedback = await update_returning_async(
+        db, Feedback, (Feedback.id == feedback_id, Feedback.employee_id == employee_id),
+        {"acknowledged": True}, options=(selectinload(Feedback.tags),),
+    )
+    if feedback:
+        touch_users(db, [feedback.manager_id, feedback.employee_id])
+    await db.commit()
+    return feedback
+
+# Notification CRUD
+
+async def create_notification(db: AsyncSession, notification_in: NotificationCreate, commit: bool = True) -> Notification:
+    notification = Notification(
+        user_id=notification_in.user_id,
+        message=notification_in.message,
+        type=notification_in.type,
+        read=False,
+        created_at=datetime.utcnow(),
+    )
+    db.add(notification)
+    touch_users(db, [notification_in.user_id])
+    announce_notifications(db, [notification_in.user_id])
+    schedule_digests(db, [notification_in.user_id], notification.created_at)
+    if commit:
+        await db.commit()
+    return notification
+
+async def get_notifications_for_user(db: AsyncSession, user_id: int, page: Optional[Page] = None) -> List[dict]:
+    return [dict(row) for row in (await db.execute(notifications_query(user_id, page))).mappings()]
+
+async def mark_notification_as_read(db: AsyncSession, notification_id: int, user_id: int) -> Optional[Notification]:
+    notification = await update_returning_async(
+        db, Notification, (Notification.id == notification_id, Notification.user_id == user_id), {"read": True},
+    )
+    if notification:
+        touch_users(db, [user_id])
+    await db.commit()
+    return notification
+
+async def count_unread_notifications(db: AsyncSession, user_id: int) -> int:
+    return (await db.execute(unread_notifications_query(user_id))).scalar()
+
+async def mark_notifications_as_read(db: AsyncSession, user_id: int, notification_ids: Optional[Set[int]] = None) -> int:
+    num_updated = (await db.execute(mark_notifications_read_statement(user_id, notification_ids))).rowcount
+    if num_updated:
+        touch_users(db, [user_id])
+    await db.commit()
+    return num_updated
+
+async def delete_notifications_for_user(db: AsyncSession, user_id: int, before: Optional[datetime] = None) -> int:
+    num_deleted = (await db.execute(delete_notifications_statement(user_id, before))).rowcount
+    if num_deleted:
+        touch_users(db, [user_id])
+    await db.commit()
+    return num_deleted
+
+async def delete_all_notifications_for_user(db: AsyncSession, user_id: int) -> int:
+    return await delete_notifications_for_user(db, user_id)
@@ -0,0 +1,83 @@
+"""The user_hierarchy closure table over ``users.manager_id``.
+
+Every user has a depth-0 row for themselves plus one row per ancestor, so a
+reporting subtree of any depth is one primary-key range scan on ancestor_id.
+create_user, assign_employee_to_manager and remove_employee_from_manager keep
+it in step with ``manager_id`` inside their own transactions;
+``rebuild_user_hierarchy`` recomputes it from ``users``.
+"""
+from typing import List, Optional
+
+from sqlalchemy import delete, func, insert, literal, select, true
+from sqlalchemy.orm import Session, aliased
+
+from ..models.user import User, UserHierarchy
+
+HIERARCHY_COLUMNS = ["ancestor_id", "descendant_id", "depth"]
+
+
+def subtree_ids(user_id: int):
+    """Subquery of ``user_id`` and everyone reporting to them, directly or not"""
+    return select(UserHierarchy.descendant_id).where(UserHierarchy.ancestor_id == user_id)
+
+
+def report_ids(user_id: int, org: bool = False):
+    """Subquery of ``user_id``'s direct reports, or with ``org`` everyone below them"""
+    return select(UserHierarchy.descendant_id).where(
+        UserHierarchy.ancestor_id == user_id, UserHierarchy.depth > 0 if org else UserHierarchy.depth == 1,
+    )
+
+
+def attach_subtree_statement(user_id: int, manager_id: int):
+    """Link ``user_id``'s subtree to ``manager_id`` and each of its ancestors"""
+    above, below = aliased(UserHierarchy), aliased(UserHierarchy)
+    # Every ancestor of the new manager (the manager included) times every member of the subtree
+    pairs = (
+        select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+        .select_from(above)
+        .join(below, true())
+        .where(above.descendant_id == manager_id, below.ancestor_id == user_id)
+    )
+    return insert(UserHierarchy).from_select(HIERARCHY_COLUMNS, pairs)
+
+
+def detach_subtree_statement(user_id: int):
+    """Unlink ``user_id``'s subtree from everyone above ``user_id``"""
+    ancestors = select(UserHierarchy.ancestor_id).where(
+        UserHierarchy.descendant_id == user_id, UserHierarchy.ancestor_id != user_id,
+    )
+    return delete(UserHierarchy).where(
+        UserHierarchy.descendant_id.in_(subtree_ids(user_id)), UserHierarchy.ancestor_id.in_(ancestors),
+    )
+
+
+def add_user_statements(user_id: int, manager_id: Optional[int]) -> List:
+    """Statements adding a new user, placed under ``manager_id`` if given"""
+    statements = [insert(UserHierarchy).values(ancestor_id=user_id, descendant_id=user_id, depth=0)]
+    if manager_id is not None:
+        statements.append(attach_subtree_statement(user_id, manager_id))
+    return statements
+
+
+def move_subtree_statements(user_id: int, manager_id: Optional[int]) -> List:
+    """Statements moving ``user_id`` and their reports under ``manager_id``, or to the top when None"""
+    statements = [detach_subtree_statement(user_id)]
+    if manager_id is not None:
+        statements.append(attach_subtree_statement(user_id, manager_id))
+    return statements
+
+
+def rebuild_user_hierarchy(db: Session) -> int:
+    """Recompute the closure table from users.manager_id; returns the rows written"""
+    tree = select(
+        User.id.label("ancestor_id"), User.id.label("descendant_id"), literal(0).label("depth"),
+    ).cte("tree", recursive=True)
+    tree = tree.union_all(
+        select(tree.c.ancestor_id, User.id, tree.c.depth + 1).join(User, User.manager_id == tree.c.descendant_id)
+    )
+    db.execute(delete(UserHierarchy))
+    db.execute(insert(UserHierarchy).from_select(HIERARCHY_COLUMNS, select(tree)))
+    # Counted afterwards: drivers report no rowcount for a WITH ... INSERT
+    written = db.execute(select(func.count()).select_from(UserHierarchy)).scalar()
+    db.commit()
+    return written
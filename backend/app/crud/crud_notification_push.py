@@ -0,0 +1,77 @@
+"""Session hooks and queries behind the notification push stream.
+
+Writes that create notifications call ``announce_notifications``; the
+configured notification bus is signalled as part of that transaction's commit
+(never for a rollback), and each woken push connection then reads the rows
+past the last id it sent with ``get_notifications_after``. Ids are assigned
+at INSERT but become visible at COMMIT, so a lower id can show up after a
+higher one has been sent; each read therefore also covers the notifications
+created in a trailing window, and the connection skips the ones it already sent.
+"""
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import event, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.notification_bus import notification_bus
+from ..models.feedback import Notification
+
+# Session.info key collecting the users the pending transaction creates notifications for
+ANNOUNCED_USERS_KEY = "announced_user_ids"
+
+
+def announce_notifications(db, user_ids: Iterable[Optional[int]]):
+    """Push ``user_ids``' new notifications once ``db`` (sync or async) commits"""
+    db.info.setdefault(ANNOUNCED_USERS_KEY, set()).update(user_id for user_id in user_ids if user_id is not None)
+
+
+@event.listens_for(Session, "before_commit")
+def _signal_announced_users(session):
+    user_ids = session.info.get(ANNOUNCED_USERS_KEY)
+    if user_ids:
+        notification_bus.before_commit(session, user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_announced_users(session):
+    user_ids = session.info.pop(ANNOUNCED_USERS_KEY, None)
+    if user_ids:
+        notification_bus.after_commit(user_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_announced_users(session):
+    session.info.pop(ANNOUNCED_USERS_KEY, None)
+
+
+def notifications_after_query(user_id: int, after_id: int, since: datetime, limit: int):
+    return (
+        select(Notification)
+        .where(Notification.user_id == user_id, or_(Notification.id > after_id, Notification.created_at >= since))
+        .order_by(Notification.id)
+        .limit(limit)
+    )
+
+
+def latest_notification_id_query(user_id: int):
+    return select(func.coalesce(func.max(Notification.id), 0)).where(Notification.user_id == user_id)
+
+
+def get_notifications_after(db: Session, user_id: int, after_id: int, since: datetime, limit: int) -> List[Notification]:
+    """``user_id``'s notifications with an id above ``after_id`` or created from ``since`` on, lowest id first"""
+    return list(db.scalars(notifications_after_query(user_id, after_id, since, limit)))
+
+
+def get_latest_notification_id(db: Session, user_id: int) -> int:
+    return db.execute(latest_notification_id_query(user_id)).scalar()
+
+
+async def get_notifications_after_async(db: AsyncSession, user_id: int, after_id: int, since: datetime,
+                                        limit: int) -> List[Notification]:
+    return list(await db.scalars(notifications_after_query(user_id, after_id, since, limit)))
+
+
+async def get_latest_notification_id_async(db: AsyncSession, user_id: int) -> int:
+    return (await db.execute(latest_notification_id_query(user_id))).scalar()
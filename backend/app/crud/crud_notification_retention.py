@@ -0,0 +1,90 @@
+"""Batched notification deletes: the retention purge and large clear-alls.
+
+A batch picks at most ``batch_size`` ids in primary-key order (resuming after
+the previous batch), deletes exactly those rows and commits, then pauses. No
+transaction ever holds more than one batch of row locks (or the SQLite write
+lock for longer than one batch), so other writers keep going during a purge
+of any size.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import (
+    NOTIFICATION_PURGE_BATCH_SIZE, NOTIFICATION_PURGE_PAUSE_SECONDS, NOTIFICATION_RETENTION_DAYS,
+)
+from ..models.feedback import Notification
+from .crud_data_version import touch_users
+
+
+def retention_criteria(older_than: datetime) -> tuple:
+    """Read notifications created before ``older_than``"""
+    return Notification.read == true(), Notification.created_at < older_than
+
+
+def user_criteria(user_id: int, up_to_id: int) -> tuple:
+    """``user_id``'s notifications up to ``up_to_id``, so rows arriving mid-clear survive"""
+    return Notification.user_id == user_id, Notification.id <= up_to_id
+
+
+def next_batch_query(criteria: tuple, after_id: int, batch_size: int):
+    return (
+        select(Notification.id, Notification.user_id)
+        .where(*criteria, Notification.id > after_id)
+        .order_by(Notification.id)
+        .limit(batch_size)
+    )
+
+
+def delete_in_batches(db: Session, criteria: tuple, batch_size: int = NOTIFICATION_PURGE_BATCH_SIZE,
+                      pause: float = NOTIFICATION_PURGE_PAUSE_SECONDS) -> int:
+    """Delete the notifications matching ``criteria`` one committed batch at a time; returns the rows deleted"""
+    deleted, after_id = 0, 0
+    while True:
+        rows = db.execute(next_batch_query(criteria, after_id, batch_size)).all()
+        if not rows:
+            return deleted
+        db.execute(
+            delete(Notification)
+            .where(Notification.id.in_([row.id for row in rows]))
+            .execution_options(synchronize_session=False)
+        )
+        touch_users(db, {row.user_id for row in rows})
+        db.commit()
+        deleted += len(rows)
+        after_id = rows[-1].id
+        if len(rows) < batch_size:
+            return deleted
+        time.sleep(pause)
+
+
+def purge_old_notifications(db: Session, retention_days: int = NOTIFICATION_RETENTION_DAYS,
+                            batch_size: int = NOTIFICATION_PURGE_BATCH_SIZE,
+                            pause: float = NOTIFICATION_PURGE_PAUSE_SECONDS, now: Optional[datetime] = None) -> int:
+    """Delete read notifications older than ``retention_days``"""
+    older_than = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    return delete_in_batches(db, retention_criteria(older_than), batch_size, pause)
+
+
+def clear_notifications_in_batches(db: Session, user_id: int, up_to_id: int,
+                                   batch_size: int = NOTIFICATION_PURGE_BATCH_SIZE,
+                                   pause: float = NOTIFICATION_PURGE_PAUSE_SECONDS) -> int:
+    return delete_in_batches(db, user_criteria(user_id, up_to_id), batch_size, pause)
+
+
+def notification_count_query(user_id: int, cap: int):
+    """``user_id``'s notification count, but counting no further than ``cap``"""
+    capped = select(Notification.id).where(Notification.user_id == user_id).limit(cap).subquery()
+    return select(func.count()).select_from(capped)
+
+
+def count_notifications(db: Session, user_id: int, cap: int) -> int:
+    return db.execute(notification_count_query(user_id, cap)).scalar()
+
+
+async def count_notifications_async(db: AsyncSession, user_id: int, cap: int) -> int:
+    return (await db.execute(notification_count_query(user_id, cap))).scalar()
@@ -0,0 +1,184 @@
+"""Transactional outbox: writing side effects with the change that causes them, and claiming them for delivery.
+
+Writers add outbox rows before they commit (``enqueue_email``, or an INSERT of
+``email_rows``), so an email exists exactly when the change behind it does.
+The dispatcher (core/outbox.py) claims due messages with ``claim_messages``,
+which pushes ``available_at`` out by a lease so no other dispatcher takes them
+meanwhile, and records each outcome with ``record_outcomes``: sent, retried
+later with exponential backoff, or dead-lettered. Messages whose outcome was
+never recorded are claimed again once their lease runs out.
+"""
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from ..core.config import FROM_EMAIL
+from ..core.mail import Email, NotSent, is_transient
+from ..models.outbox import OutboxMessage
+
+PENDING, SENT, DEAD = "pending", "sent", "dead"
+EMAIL = "email"
+
+# Session.info flag set by a transaction that wrote outbox rows; its commit wakes the dispatcher
+OUTBOX_ENQUEUED_KEY = "outbox_enqueued"
+
+# Columns the dispatcher needs from a claimed message
+CLAIMED_COLUMNS = (
+    OutboxMessage.id, OutboxMessage.kind, OutboxMessage.payload, OutboxMessage.attempts, OutboxMessage.created_at,
+)
+
+
+def email_rows(emails: Iterable[tuple]) -> List[dict]:
+    """Outbox rows for ``(to_email, subject, body, dedupe_key)`` emails.
+
+    Written whether or not mail is configured: without SMTP the dispatcher does not run, and the
+    messages wait in the outbox until it does.
+    """
+    now = datetime.utcnow()
+    return [
+        {
+            "kind": EMAIL,
+            "dedupe_key": dedupe_key,
+            "payload": {"to_email": to_email, "subject": subject, "body": body},
+            "status": PENDING,
+            "attempts": 0,
+            "available_at": now,
+            "created_at": now,
+        }
+        for to_email, subject, body, dedupe_key in emails
+    ]
+
+
+def mark_enqueued(db):
+    """Wake the dispatcher once ``db`` (sync or async) commits"""
+    db.info[OUTBOX_ENQUEUED_KEY] = True
+
+
+def enqueue_email(db, to_email: str, subject: str, body: str, dedupe_key: Optional[str] = None):
+    """Add an email to ``db``'s (sync or async) transaction; it is sent only if that transaction commits"""
+    for row in email_rows([(to_email, subject, body, dedupe_key)]):
+        db.add(OutboxMessage(**row))
+        mark_enqueued(db)
+
+
+def message_id(row) -> str:
+    """A Message-ID that stays the same for every delivery attempt of one outbox message"""
+    domain = (FROM_EMAIL or "localhost").rpartition("@")[2]
+    return f"<outbox.{row.id}.{row.created_at:%Y%m%d%H%M%S%f}@{domain}>"
+
+
+def as_email(row) -> Email:
+    payload = row.payload
+    return Email(payload["to_email"], payload["subject"], payload["body"], message_id(row))
+
+
+def claim_messages(db: Session, limit: int, lease: float, now: Optional[datetime] = None) -> list:
+    """Take up to ``limit`` due messages for ``lease`` seconds and count an attempt for each; commits"""
+    now = now or datetime.utcnow()
+    due = (OutboxMessage.status == PENDING, OutboxMessage.available_at <= now)
+    ids = db.scalars(
+        select(OutboxMessage.id)
+        .where(*due)
+        .order_by(OutboxMessage.available_at, OutboxMessage.id)
+        .limit(limit)
+        # Concurrent dispatchers on PostgreSQL skip each other's rows instead of waiting for them
+        .with_for_update(skip_locked=True)
+    ).all()
+    if not ids:
+        db.rollback()
+        return []
+    lease_until = now + timedelta(seconds=lease)
+    # Re-checking ``due`` keeps a message another dispatcher claimed in the meantime out of this batch
+    statement = (
+        update(OutboxMessage)
+        .where(OutboxMessage.id.in_(ids), *due)
+        .values(available_at=lease_until, attempts=OutboxMessage.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if db.get_bind().dialect.update_returning:
+        rows = db.execute(statement.returning(*CLAIMED_COLUMNS)).all()
+    else:
+        db.execute(statement)
+        rows = db.execute(
+            select(*CLAIMED_COLUMNS).where(OutboxMessage.id.in_(ids), OutboxMessage.available_at == lease_until)
+        ).all()
+    db.commit()
+    return sorted(rows, key=lambda row: row.id)
+
+
+def describe(error: Exception) -> str:
+    return f"{type(error).__name__}: {error}"[:500]
+
+
+def record_outcomes(db: Session, outcomes: list, max_attempts: int, backoff: float,
+                    now: Optional[datetime] = None) -> dict:
+    """Record ``(claimed row, error or None)`` pairs; returns how many were sent, retried and dead-lettered; commits"""
+    now = now or datetime.utcnow()
+    counts = {SENT: 0, "retried": 0, DEAD: 0}
+    sent = [row.id for row, error in outcomes if error is None]
+    if sent:
+        db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(sent), OutboxMessage.status == PENDING)
+            .values(status=SENT, processed_at=now, last_error=None)
+            .execution_options(synchronize_session=False)
+        )
+        counts[SENT] = len(sent)
+    for row, error in outcomes:
+        if error is None:
+            continue
+        if isinstance(error, NotSent):
+            # Never attempted: due again at once, and it does not use up an attempt
+            values = {"available_at": now, "attempts": OutboxMessage.attempts - 1}
+            counts["retried"] += 1
+        elif is_transient(error) and row.attempts < max_attempts:
+            values = {"available_at": now + timedelta(seconds=backoff * 2 ** (row.attempts - 1)),
+                      "last_error": describe(error)}
+            counts["retried"] += 1
+        else:
+            values = {"status": DEAD, "processed_at": now, "last_error": describe(error)}
+            counts[DEAD] += 1
+        db.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id == row.id, OutboxMessage.status == PENDING)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+    db.commit()
+    return counts
+
+
+def purge_sent_messages(db: Session, older_than: datetime, batch_size: int) -> int:
+    """Delete messages sent before ``older_than``, one committed batch at a time; returns the rows deleted"""
+    deleted = 0
+    while True:
+        ids = db.scalars(
+            select(OutboxMessage.id)
+            .where(OutboxMessage.status == SENT, OutboxMessage.processed_at < older_than)
+            .limit(batch_size)
+        ).all()
+        if ids:
+            db.execute(
+                delete(OutboxMessage).where(OutboxMessage.id.in_(ids)).execution_options(synchronize_session=False)
+            )
+        db.commit()
+        deleted += len(ids)
+        if len(ids) < batch_size:
+            return deleted
+
+
+def requeue_dead_messages(db: Session, ids: Optional[List[int]] = None) -> int:
+    """Give dead-lettered messages (all, or just ``ids``) a fresh set of attempts; returns how many; commits"""
+    criteria = [OutboxMessage.status == DEAD]
+    if ids:
+        criteria.append(OutboxMessage.id.in_(ids))
+    requeued = db.execute(
+        update(OutboxMessage)
+        .where(*criteria)
+        .values(status=PENDING, attempts=0, available_at=datetime.utcnow(), processed_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return requeued
@@ -0,0 +1,36 @@
+"""Queries behind the feedback PDF report: its cache version and its rows, read in chunks."""
+from typing import Iterator, List
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.feedback import Feedback
+
+# Report columns, in the order render_feedback_report prints them
+REPORT_COLUMNS = (Feedback.created_at, Feedback.strengths, Feedback.areas_to_improve, Feedback.sentiment, Feedback.acknowledged)
+
+
+def report_version_query(employee_id: int):
+    """Latest ``updated_at`` and row count of the employee's feedback; together they change whenever the report would"""
+    return select(func.max(Feedback.updated_at), func.count()).where(Feedback.employee_id == employee_id)
+
+
+def get_report_version(db: Session, employee_id: int) -> tuple:
+    return tuple(db.execute(report_version_query(employee_id)).one())
+
+
+async def get_report_version_async(db: AsyncSession, employee_id: int) -> tuple:
+    return tuple((await db.execute(report_version_query(employee_id))).one())
+
+
+def iter_report_chunks(db: Session, employee_id: int, chunk_size: int) -> Iterator[List]:
+    """The employee's feedback, newest first as the report lists it, ``chunk_size`` rows per round trip and per yielded list"""
+    result = db.execute(
+        select(*REPORT_COLUMNS)
+        .where(Feedback.employee_id == employee_id)
+        .order_by(Feedback.created_at.desc(), Feedback.id.desc())
+        .execution_options(yield_per=chunk_size)
+    )
+    for partition in result.partitions():
+        yield partition
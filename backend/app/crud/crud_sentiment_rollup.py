@@ -0,0 +1,209 @@
+"""Incrementally maintained sentiment counts behind the trends dashboard.
+
+Every feedback write adjusts the day, week and month buckets it falls into
+inside the writer's own transaction, so the trends query reads one row per
+bucket and sentiment instead of aggregating the feedback table.
+``rebuild_sentiment_rollup`` recomputes the table from ``feedback``.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, delete, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..models.feedback import Feedback, FeedbackSentimentRollup, SentimentEnum
+from .statements import upsert_insert
+from .crud_hierarchy import subtree_ids
+
+GRANULARITIES = ("day", "week", "month")
+
+# Longest trend a single request may ask for, in buckets
+MAX_TREND_BUCKETS = 366
+
+# (manager_id, employee_id, created_at, sentiment, delta)
+SentimentChange = Tuple[int, int, datetime, object, int]
+
+
+def bucket_start(moment, granularity: str) -> date:
+    """First day of the bucket containing ``moment``; weeks start on Monday"""
+    day = moment.date() if isinstance(moment, datetime) else moment
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start: date, granularity: str) -> date:
+    if granularity == "week":
+        return start + timedelta(weeks=1)
+    if granularity == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def previous_bucket(start: date, granularity: str) -> date:
+    return bucket_start(start - timedelta(days=1), granularity)
+
+
+def bucket_label(start: date, granularity: str) -> str:
+    if granularity == "week":
+        year, week, _ = start.isocalendar()
+        return f"{year}-W{week:02d}"
+    if granularity == "month":
+        return start.strftime("%Y-%m")
+    return start.isoformat()
+
+
+# Columns identifying a rollup row
+ROLLUP_KEY = ("manager_id", "granularity", "bucket", "employee_id", "sentiment")
+
+
+def sentiment_rollup_rows(changes: Iterable[SentimentChange]) -> List[dict]:
+    """The net count change of every rollup row ``changes`` touch; rows whose changes cancel out are left out"""
+    counts = Counter()
+    for manager_id, employee_id, created_at, sentiment, delta in changes:
+        sentiment = SentimentEnum(getattr(sentiment, "value", sentiment))
+        for granularity in GRANULARITIES:
+            counts[(manager_id, granularity, bucket_start(created_at, granularity), employee_id, sentiment)] += delta
+    return [{**dict(zip(ROLLUP_KEY, key)), "count": delta} for key, delta in counts.items() if delta]
+
+
+def sentiment_rollup_upsert(dialect_name: str, rows: List[dict]):
+    """One INSERT ... ON CONFLICT DO UPDATE applying ``rows``; None where the dialect has no ON CONFLICT"""
+    statement = upsert_insert(dialect_name, FeedbackSentimentRollup.__table__)
+    if statement is None:
+        return None
+    statement = statement.values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=list(FeedbackSentimentRollup.__table__.primary_key.columns),
+        set_={"count": FeedbackSentimentRollup.count + statement.excluded.count},
+    )
+
+
+def sentiment_rollup_increment(row: dict):
+    """UPDATE adding ``row``'s count to the rollup row it belongs to, if that exists"""
+    table = FeedbackSentimentRollup.__table__
+    return (
+        update(table)
+        .where(*(table.c[column] == row[column] for column in ROLLUP_KEY))
+        .values(count=table.c.count + row["count"])
+    )
+
+
+def record_sentiment_changes(db: Session, changes: Iterable[SentimentChange]):
+    """Apply ``changes`` to the rollup; the caller commits them with the feedback write"""
+    rows = sentiment_rollup_rows(changes)
+    if not rows:
+        return
+    statement = sentiment_rollup_upsert(db.get_bind().dialect.name, rows)
+    if statement is not None:
+        db.execute(statement)
+        return
+    # Without ON CONFLICT: add to the rows that exist, then insert the others
+    missing = [row for row in rows if db.execute(sentiment_rollup_increment(row)).rowcount == 0]
+    if missing:
+        db.execute(insert(FeedbackSentimentRollup.__table__), missing)
+
+
+async def record_sentiment_changes_async(db: AsyncSession, changes: Iterable[SentimentChange]):
+    rows = sentiment_rollup_rows(changes)
+    if not rows:
+        return
+    statement = sentiment_rollup_upsert(db.get_bind().dialect.name, rows)
+    if statement is not None:
+        await db.execute(statement)
+        return
+    missing = [row for row in rows if (await db.execute(sentiment_rollup_increment(row))).rowcount == 0]
+    if missing:
+        await db.execute(insert(FeedbackSentimentRollup.__table__), missing)
+
+
+def sentiment_trends_query(manager_id: int, granularity: str, start: date, end: date, employee_id: Optional[int] = None,
+                           org: bool = False):
+    """Counts per bucket and sentiment; with ``org``, over every manager in ``manager_id``'s subtree"""
+    rollup = FeedbackSentimentRollup
+    query = (
+        select(rollup.bucket, rollup.sentiment, func.sum(rollup.count))
+        .where(
+            rollup.manager_id.in_(subtree_ids(manager_id)) if org else rollup.manager_id == manager_id,
+            rollup.granularity == granularity,
+            rollup.bucket >= bucket_start(start, granularity),
+            rollup.bucket <= bucket_start(end, granularity),
+        )
+        .group_by(rollup.bucket, rollup.sentiment)
+    )
+    if employee_id is not None:
+        query = query.where(rollup.employee_id == employee_id)
+    return query
+
+
+def shape_trends(rows, granularity: str, start: date, end: date) -> List[dict]:
+    """One entry per bucket from ``start`` to ``end``, empty buckets included"""
+    counts = {(bucket, sentiment): total for bucket, sentiment, total in rows}
+    trends = []
+    bucket, last = bucket_start(start, granularity), bucket_start(end, granularity)
+    while bucket <= last:
+        entry = {"period": bucket_label(bucket, granularity), "start": bucket}
+        for sentiment in SentimentEnum:
+            entry[sentiment.value] = int(counts.get((bucket, sentiment), 0))
+        trends.append(entry)
+        bucket = next_bucket(bucket, granularity)
+    return trends
+
+
+def count_buckets(granularity: str, start: date, end: date) -> int:
+    first, last = bucket_start(start, granularity), bucket_start(end, granularity)
+    if granularity == "month":
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    return (last - first).days // (7 if granularity == "week" else 1) + 1
+
+
+def get_sentiment_trends(db: Session, manager_id: int, granularity: str, start: date, end: date,
+                         employee_id: Optional[int] = None, org: bool = False) -> List[dict]:
+    rows = db.execute(sentiment_trends_query(manager_id, granularity, start, end, employee_id, org)).all()
+    return shape_trends(rows, granularity, start, end)
+
+
+async def get_sentiment_trends_async(db: AsyncSession, manager_id: int, granularity: str, start: date, end: date,
+                                     employee_id: Optional[int] = None, org: bool = False) -> List[dict]:
+    rows = (await db.execute(sentiment_trends_query(manager_id, granularity, start, end, employee_id, org))).all()
+    return shape_trends(rows, granularity, start, end)
+
+
+def bucket_expression(dialect_name: str, granularity: str, column):
+    """SQL for the first day of ``column``'s bucket, matching bucket_start"""
+    if dialect_name == "postgresql":
+        return func.date_trunc(granularity, column).cast(Date)
+    if granularity == "week":
+        return func.date(column, "weekday 0", "-6 days", type_=Date)
+    if granularity == "month":
+        return func.date(column, "start of month", type_=Date)
+    return func.date(column, type_=Date)
+
+
+def rebuild_sentiment_rollup(db: Session, manager_id: Optional[int] = None) -> int:
+    """Recompute the rollup (for one manager, or everyone) from feedback; returns the rows written"""
+    rollup = FeedbackSentimentRollup
+    dialect_name = db.get_bind().dialect.name
+    clear = delete(rollup)
+    if manager_id is not None:
+        clear = clear.where(rollup.manager_id == manager_id)
+    db.execute(clear)
+    written = 0
+    for granularity in GRANULARITIES:
+        bucket = bucket_expression(dialect_name, granularity, Feedback.created_at)
+        counts = (
+            select(Feedback.manager_id, literal(granularity), bucket, Feedback.employee_id, Feedback.sentiment, func.count())
+            .group_by(Feedback.manager_id, bucket, Feedback.employee_id, Feedback.sentiment)
+        )
+        if manager_id is not None:
+            counts = counts.where(Feedback.manager_id == manager_id)
+        result = db.execute(insert(rollup.__table__).from_select(
+            ["manager_id", "granularity", "bucket", "employee_id", "sentiment", "count"], counts,
+        ))
+        written += result.rowcount
+    db.commit()
+    return written
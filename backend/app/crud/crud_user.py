@@ -1,7 +1,20 @@
+from sqlalchemy import event, inspect, select
 from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
 from ..models.user import User, UserRole
-from ..schemas.user import UserCreate
-from ..core.security import get_password_hash, verify_password
+from ..schemas.user import UserCreate, UserRead
+from ..core.security import get_password_hash, verify_password, verify_password_async
+from ..core.cache import user_cache
+from .pagination import Page, apply_keyset
+from .crud_hierarchy import add_user_statements, move_subtree_statements
+from .statements import schema_columns
+from typing import List, Optional, Sequence
+
+@event.listens_for(User.role, "set")
+def _invalidate_cached_role(target, value, oldvalue, initiator):
+    """Drop the cached identity of any user whose role is changed"""
+    if inspect(target).persistent and value != oldvalue:
+        user_cache.invalidate(target.id)
 
 def get_user(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
@@ -12,11 +25,23 @@ def get_user_by_email(db: Session, email: str):
 def get_user_by_id(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(User).offset(skip).limit(limit).all()
+# User listings are built from plain rows shaped like UserRead (see statements.schema_columns), narrowed to a
+# sparse fieldset when one is asked for; fields without a column (created_at, updated_at) keep their None default
+USER_FIELDS = tuple(UserRead.model_fields)
+
+def user_items_query(fields: Sequence[str] = USER_FIELDS):
+    return select(*schema_columns(UserRead, User, fields))
+
+def user_items(rows: list, fields: Sequence[str]) -> List[dict]:
+    return [{name: row._mapping.get(name) for name in fields} for row in rows]
+
+def get_users(db: Session, page: Optional[Page] = None, fields: Sequence[str] = USER_FIELDS) -> List[dict]:
+    rows = db.execute(apply_keyset(user_items_query(fields), page, User.id, descending=False)).all()
+    return user_items(rows, fields)
 
-def create_user(db: Session, user: UserCreate):
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: UserCreate, hashed_password: str = None):
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = User(
         email=user.email,
         name=user.name,
@@ -25,8 +50,10 @@ def create_user(db: Session, user: UserCreate):
         manager_id=user.manager_id
     )
     db.add(db_user)
+    db.flush()
+    for statement in add_user_statements(db_user.id, db_user.manager_id):
+        db.execute(statement)
     db.commit()
-    db.refresh(db_user)
     return db_user
 
 def authenticate_user(db: Session, email: str, password: str):
@@ -37,10 +64,28 @@ def authenticate_user(db: Session, email: str, password: str):
         return False
     return user
 
+def get_user_by_email_detached(db: Session, email: str):
+    """Look up a user and end the read transaction, so no pooled connection is held while bcrypt runs"""
+    user = get_user_by_email(db, email)
+    if user:
+        db.expunge(user)
+    db.rollback()
+    return user
+
+async def authenticate_user_async(db: Session, email: str, password: str):
+    """Like authenticate_user, but runs bcrypt on the password hashing pool"""
+    user = await run_in_threadpool(get_user_by_email_detached, db, email)
+    if not user:
+        return False
+    if not await verify_password_async(password, user.hashed_password):
+        return False
+    return user
+
 # Team Management Functions
-def get_team_members(db: Session, manager_id: int):
+def get_team_members(db: Session, manager_id: int, fields: Sequence[str] = USER_FIELDS) -> List[dict]:
     """Get all team members for a specific manager"""
-    return db.query(User).filter(User.manager_id == manager_id).all()
+    rows = db.execute(user_items_query(fields).where(User.manager_id == manager_id)).all()
+    return user_items(rows, fields)
 
 def get_available_employees(db: Session):
     """Get all employees who are not assigned to any manager"""
@@ -58,15 +103,28 @@ def assign_employee_to_manager(db: Session, employee_id: int, manager_id: int):
     employee = get_user_by_id(db, employee_id)
     if employee:
         employee.manager_id = manager_id
+        for statement in move_subtree_statements(employee_id, manager_id):
+            db.execute(statement)
         db.commit()
-        db.refresh(employee)
+        user_cache.invalidate(employee_id)
     return employee
 
+def set_email_digest(db: Session, user_id: int, enabled: bool):
+    """Switch the user between an email per notification and one digest per window"""
+    user = get_user_by_id(db, user_id)
+    if user:
+        user.email_digest = enabled
+        db.commit()
+        user_cache.invalidate(user_id)
+    return user
+
 def remove_employee_from_manager(db: Session, employee_id: int):
     """Remove an employee from their current manager"""
     employee = get_user_by_id(db, employee_id)
     if employee:
         employee.manager_id = None
+        for statement in move_subtree_statements(employee_id, None):
+            db.execute(statement)
         db.commit()
-        db.refresh(employee)
+        user_cache.invalidate(employee_id)
     return employee
@@ -0,0 +1,86 @@
+"""Async counterparts of crud_user, used by the async route variants"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..models.user import User, UserRole
+from ..schemas.user import UserCreate
+from ..core.security import get_password_hash_async, verify_password_async
+from ..core.cache import user_cache
+from .pagination import Page, apply_keyset
+from .crud_hierarchy import add_user_statements, move_subtree_statements
+from .crud_user import USER_FIELDS, user_items, user_items_query
+from typing import List, Optional, Sequence
+
+async def get_user(db: AsyncSession, user_id: int):
+    return (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return (await db.execute(select(User).where(User.email == email))).scalar_one_or_none()
+
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    return await get_user(db, user_id)
+
+async def get_users(db: AsyncSession, page: Optional[Page] = None, fields: Sequence[str] = USER_FIELDS) -> List[dict]:
+    rows = (await db.execute(apply_keyset(user_items_query(fields), page, User.id, descending=False))).all()
+    return user_items(rows, fields)
+
+async def create_user(db: AsyncSession, user: UserCreate):
+    db_user = User(
+        email=user.email,
+        name=user.name,
+        hashed_password=await get_password_hash_async(user.password),
+        role=user.role,
+        manager_id=user.manager_id
+    )
+    db.add(db_user)
+    await db.flush()
+    for statement in add_user_statements(db_user.id, db_user.manager_id):
+        await db.execute(statement)
+    await db.commit()
+    return db_user
+
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = await get_user_by_email(db, email=email)
+    if not user:
+        return False
+    if not await verify_password_async(password, user.hashed_password):
+        return False
+    return user
+
+# Team Management Functions
+async def get_team_members(db: AsyncSession, manager_id: int, fields: Sequence[str] = USER_FIELDS) -> List[dict]:
+    """Get all team members for a specific manager"""
+    rows = (await db.execute(user_items_query(fields).where(User.manager_id == manager_id))).all()
+    return user_items(rows, fields)
+
+async def get_available_employees(db: AsyncSession):
+    """Get all employees who are not assigned to any manager"""
+    result = await db.execute(
+        select(User).where(User.role == UserRole.employee, User.manager_id.is_(None))
+    )
+    return result.scalars().all()
+
+async def get_managers(db: AsyncSession):
+    """Get all managers that can be requested for feedback"""
+    return (await db.execute(select(User).where(User.role == UserRole.manager))).scalars().all()
+
+async def assign_employee_to_manager(db: AsyncSession, employee_id: int, manager_id: int):
+    """Assign an employee to a manager"""
+    employee = await get_user_by_id(db, employee_id)
+    if employee:
+        employee.manager_id = manager_id
+        for statement in move_subtree_statements(employee_id, manager_id):
+            await db.execute(statement)
+        await db.commit()
+        user_cache.invalidate(employee_id)
+    return employee
+
+async def remove_employee_from_manager(db: AsyncSession, employee_id: int):
+    """Remove an employee from their current manager"""
+    employee = await get_user_by_id(db, employee_id)
+    if employee:
+        employee.manager_id = None
+        for statement in move_subtree_statements(employee_id, None):
+            await db.execute(statement)
+        await db.commit()
+        user_cache.invalidate(employee_id)
+    return employee
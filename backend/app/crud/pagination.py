@@ -0,0 +1,79 @@
+"""Keyset (cursor) pagination shared by the list queries.
+
+A cursor is the opaque, URL-safe encoding of the sort key of the last row a
+client has seen: ``(created_at, id)`` for time-ordered lists, ``(id,)`` for
+users. Each page is one indexed range scan, however deep the client pages.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import tuple_
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that are malformed or belong to a different listing"""
+
+
+@dataclass
+class Page:
+    limit: int
+    after: Optional[list] = None
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """Inverse of encode_cursor; raises InvalidCursor for anything it did not produce"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or not values or not isinstance(values[-1], int):
+            raise ValueError("Cursor must end with a row id")
+        if not all(isinstance(value, (int, str)) and not isinstance(value, bool) for value in values):
+            raise ValueError("Unexpected cursor value")
+        return [datetime.fromisoformat(value) if isinstance(value, str) else value for value in values]
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor("Invalid cursor") from exc
+
+
+def apply_keyset(query, page: Optional[Page], *columns, descending: bool = True):
+    """Order ``query`` by ``columns`` and, given a page, return only the rows after its cursor.
+
+    One extra row is fetched so split_page can tell whether another page exists.
+    """
+    query = query.order_by(*(column.desc() if descending else column.asc() for column in columns))
+    if page is None:
+        return query
+    if page.after is not None:
+        if len(page.after) != len(columns):
+            raise InvalidCursor("Cursor does not match this listing")
+        key = tuple_(*columns) if len(columns) > 1 else columns[0]
+        bound = tuple_(*page.after) if len(columns) > 1 else page.after[0]
+        query = query.filter(key < bound if descending else key > bound)
+    return query.limit(page.limit + 1)
+
+
+def created_at_key(row) -> Tuple[datetime, int]:
+    if isinstance(row, dict):
+        return row["created_at"], row["id"]
+    return row.created_at, row.id
+
+
+def id_key(row) -> Tuple[int]:
+    if isinstance(row, dict):
+        return (row["id"],)
+    return (row.id,)
+
+
+def split_page(rows: List, page: Optional[Page], key: Callable = created_at_key) -> Tuple[List, Optional[str]]:
+    """Trim the look-ahead row and return ``(items, next_cursor)``"""
+    if page is None or len(rows) <= page.limit:
+        return rows, None
+    items = rows[: page.limit]
+    return items, encode_cursor(key(items[-1]))
@@ -0,0 +1,63 @@
+"""Dialect-aware statements shared by the CRUD modules.
+
+``update_returning`` hands back the updated row: where the dialect supports
+``UPDATE ... RETURNING`` (PostgreSQL, SQLite 3.35+) with the UPDATE itself,
+otherwise via UPDATE followed by a SELECT. ``upsert_insert`` gives the
+INSERT construct that supports ``ON CONFLICT``. ``schema_columns`` selects
+list rows shaped like their response model, or like a sparse fieldset of it.
+The caller owns the transaction and commits.
+"""
+from typing import Optional, Sequence
+
+from sqlalchemy import inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+def upsert_insert(dialect_name: str, table):
+    """``INSERT`` with ``on_conflict_do_nothing``/``on_conflict_do_update``, or None if the dialect has neither"""
+    if dialect_name == "postgresql":
+        return postgresql.insert(table)
+    if dialect_name == "sqlite":
+        return sqlite.insert(table)
+    return None
+
+
+def schema_columns(schema, entity, fields: Optional[Sequence[str]] = None, **expressions) -> list:
+    """``entity``'s columns for ``schema``'s fields, named and ordered like them, so a row maps straight onto an item.
+
+    ``fields`` narrows the selection to a sparse fieldset (default: every field). ``expressions`` supplies fields
+    that are not plain columns; fields with neither (nested lists) are left to the caller.
+    """
+    mapped = inspect(entity).mapper.column_attrs
+    columns = []
+    for name in schema.model_fields if fields is None else fields:
+        if name in expressions:
+            columns.append(expressions[name].label(name))
+        elif name in mapped:
+            columns.append(getattr(entity, name))
+    return columns
+
+
+def update_returning(db: Session, model, criteria: tuple, values: dict, options: tuple = ()) -> Optional[object]:
+    """Apply ``values`` to the ``model`` row matching ``criteria``; None when no row matches"""
+    if not values:
+        return db.execute(select(model).where(*criteria).options(*options)).scalar_one_or_none()
+    statement = update(model).where(*criteria).values(**values)
+    if db.get_bind().dialect.update_returning:
+        return db.execute(statement.returning(model).options(*options)).scalar_one_or_none()
+    if not db.execute(statement).rowcount:
+        return None
+    return db.execute(select(model).where(*criteria).options(*options)).scalar_one()
+
+
+async def update_returning_async(db: AsyncSession, model, criteria: tuple, values: dict, options: tuple = ()) -> Optional[object]:
+    if not values:
+        return (await db.execute(select(model).where(*criteria).options(*options))).scalar_one_or_none()
+    statement = update(model).where(*criteria).values(**values)
+    if db.get_bind().dialect.update_returning:
+        return (await db.execute(statement.returning(model).options(*options))).scalar_one_or_none()
+    if not (await db.execute(statement)).rowcount:
+        return None
+    return (await db.execute(select(model).where(*criteria).options(*options))).scalar_one()
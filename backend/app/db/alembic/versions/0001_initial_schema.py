@@ -0,0 +1,170 @@
+"""initial schema
+
+Matches the tables previously created by ``Base.metadata.create_all``.
+Databases created that way should be stamped rather than upgraded::
+
+    alembic stamp 0001
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 19:39:48.190494
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ENUMS = {
+    'userrole': ('manager', 'employee'),
+    'sentimentenum': ('positive', 'neutral', 'negative'),
+    'feedbackrequeststatus': ('pending', 'completed', 'rejected'),
+}
+
+
+def enum(name: str) -> sa.Enum:
+    # PostgreSQL types are created once up front, since two tables share sentimentenum
+    values = ENUMS[name]
+    return sa.Enum(*values, name=name).with_variant(
+        postgresql.ENUM(*values, name=name, create_type=False), 'postgresql'
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        for name, values in ENUMS.items():
+            postgresql.ENUM(*values, name=name).create(bind, checkfirst=True)
+
+    op.create_table('tag',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_tag_id'), 'tag', ['id'], unique=False)
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('role', enum('userrole'), nullable=False),
+    sa.Column('manager_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['manager_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+
+    op.create_table('feedback',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('manager_id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('strengths', sa.String(), nullable=False),
+    sa.Column('areas_to_improve', sa.String(), nullable=False),
+    sa.Column('sentiment', enum('sentimentenum'), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('acknowledged', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['employee_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['manager_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_feedback_id'), 'feedback', ['id'], unique=False)
+
+    op.create_table('feedback_request',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('requester_id', sa.Integer(), nullable=False),
+    sa.Column('target_id', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(), nullable=True),
+    sa.Column('status', enum('feedbackrequeststatus'), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['requester_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['target_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_feedback_request_id'), 'feedback_request', ['id'], unique=False)
+
+    op.create_table('notification',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('read', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_notification_id'), 'notification', ['id'], unique=False)
+
+    op.create_table('peer_feedback',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('from_user_id', sa.Integer(), nullable=False),
+    sa.Column('to_user_id', sa.Integer(), nullable=False),
+    sa.Column('strengths', sa.String(), nullable=False),
+    sa.Column('areas_to_improve', sa.String(), nullable=False),
+    sa.Column('sentiment', enum('sentimentenum'), nullable=False),
+    sa.Column('is_anonymous', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['from_user_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['to_user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_peer_feedback_id'), 'peer_feedback', ['id'], unique=False)
+
+    op.create_table('feedback_comment',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('feedback_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['feedback_id'], ['feedback.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_feedback_comment_id'), 'feedback_comment', ['id'], unique=False)
+
+    op.create_table('feedback_tag',
+    sa.Column('feedback_id', sa.Integer(), nullable=False),
+    sa.Column('tag_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['feedback_id'], ['feedback.id'], ),
+    sa.ForeignKeyConstraint(['tag_id'], ['tag.id'], ),
+    sa.PrimaryKeyConstraint('feedback_id', 'tag_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('feedback_tag')
+    op.drop_index(op.f('ix_feedback_comment_id'), table_name='feedback_comment')
+    op.drop_table('feedback_comment')
+    op.drop_index(op.f('ix_peer_feedback_id'), table_name='peer_feedback')
+    op.drop_table('peer_feedback')
+    op.drop_index(op.f('ix_notification_id'), table_name='notification')
+    op.drop_table('notification')
+    op.drop_index(op.f('ix_feedback_request_id'), table_name='feedback_request')
+    op.drop_table('feedback_request')
+    op.drop_index(op.f('ix_feedback_id'), table_name='feedback')
+    op.drop_table('feedback')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_tag_id'), table_name='tag')
+    op.drop_table('tag')
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        for name in ENUMS:
+            postgresql.ENUM(name=name).drop(bind, checkfirst=True)
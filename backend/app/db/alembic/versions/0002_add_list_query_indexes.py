@@ -0,0 +1,55 @@
+"""add list query indexes
+
+Composite (filter column, created_at) indexes for every list endpoint, an
+index on users.manager_id, and a partial index over unread notifications.
+On PostgreSQL they are built CONCURRENTLY so live tables stay writable.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 19:40:25.520579
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_feedback_manager_id_created_at', 'feedback', ['manager_id', 'created_at']),
+    ('ix_feedback_employee_id_created_at', 'feedback', ['employee_id', 'created_at']),
+    ('ix_feedback_comment_feedback_id_created_at', 'feedback_comment', ['feedback_id', 'created_at']),
+    ('ix_feedback_request_requester_id_created_at', 'feedback_request', ['requester_id', 'created_at']),
+    ('ix_feedback_request_target_id_created_at', 'feedback_request', ['target_id', 'created_at']),
+    ('ix_notification_user_id_created_at', 'notification', ['user_id', 'created_at']),
+    ('ix_peer_feedback_from_user_id_created_at', 'peer_feedback', ['from_user_id', 'created_at']),
+    ('ix_peer_feedback_to_user_id_created_at', 'peer_feedback', ['to_user_id', 'created_at']),
+    ('ix_users_manager_id', 'users', ['manager_id']),
+]
+
+UNREAD_WHERE = sa.text('NOT read')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+        op.create_index(
+            'ix_notification_user_id_unread', 'notification', ['user_id'], unique=False,
+            postgresql_where=UNREAD_WHERE, sqlite_where=UNREAD_WHERE, postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_notification_user_id_unread', table_name='notification', postgresql_concurrently=True)
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
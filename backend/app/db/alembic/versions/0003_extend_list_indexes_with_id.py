@@ -0,0 +1,55 @@
+"""extend list indexes with id
+
+Keyset pagination orders every list by (created_at, id), so the composite
+list indexes gain id as a trailing column: each page is then a single
+index range scan with no sort. The new indexes are built CONCURRENTLY on
+PostgreSQL before the ones they replace are dropped.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 20:05:12.304118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIST_INDEXES = [
+    ('feedback', 'manager_id'),
+    ('feedback', 'employee_id'),
+    ('feedback_comment', 'feedback_id'),
+    ('feedback_request', 'requester_id'),
+    ('feedback_request', 'target_id'),
+    ('notification', 'user_id'),
+    ('peer_feedback', 'from_user_id'),
+    ('peer_feedback', 'to_user_id'),
+]
+
+
+def _name(table: str, column: str) -> str:
+    return f'ix_{table}_{column}_created_at'
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for table, column in LIST_INDEXES:
+            op.create_index(f'{_name(table, column)}_id', table, [column, 'created_at', 'id'],
+                            unique=False, postgresql_concurrently=True)
+            op.drop_index(_name(table, column), table_name=table, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table, column in reversed(LIST_INDEXES):
+            op.create_index(_name(table, column), table, [column, 'created_at'],
+                            unique=False, postgresql_concurrently=True)
+            op.drop_index(f'{_name(table, column)}_id', table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,64 @@
+"""add feedback sentiment rollup
+
+Per-manager, per-employee day/week/month sentiment counts behind the trends
+dashboard, kept current by the feedback write path. Existing feedback is
+backfilled here; ``python -m app.db.rebuild_sentiment_rollup`` redoes that
+later if ever needed.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 20:31:47.118904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SENTIMENTS = ('positive', 'neutral', 'negative')
+
+# First day of the bucket holding created_at; weeks start on Monday
+SQLITE_BUCKETS = {
+    'day': "date(created_at)",
+    'week': "date(created_at, 'weekday 0', '-6 days')",
+    'month': "date(created_at, 'start of month')",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('feedback_sentiment_rollup',
+    sa.Column('manager_id', sa.Integer(), nullable=False),
+    sa.Column('granularity', sa.String(length=5), nullable=False),
+    sa.Column('bucket', sa.Date(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('sentiment', sa.Enum(*SENTIMENTS, name='sentimentenum').with_variant(
+        postgresql.ENUM(*SENTIMENTS, name='sentimentenum', create_type=False), 'postgresql'
+    ), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['employee_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['manager_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('manager_id', 'granularity', 'bucket', 'employee_id', 'sentiment')
+    )
+
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    for granularity, sqlite_bucket in SQLITE_BUCKETS.items():
+        bucket = f"date_trunc('{granularity}', created_at)::date" if postgres else sqlite_bucket
+        op.execute(
+            "INSERT INTO feedback_sentiment_rollup (manager_id, granularity, bucket, employee_id, sentiment, count) "
+            f"SELECT manager_id, '{granularity}', {bucket}, employee_id, sentiment, count(*) FROM feedback "
+            f"GROUP BY manager_id, {bucket}, employee_id, sentiment"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('feedback_sentiment_rollup')
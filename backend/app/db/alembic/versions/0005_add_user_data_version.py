@@ -0,0 +1,32 @@
+"""add user data version
+
+Per-user counter bumped by every write to the user's feedback, tags or
+notifications; conditional GETs derive their ETags from it. The server
+default makes this a metadata-only change on PostgreSQL 11+.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 21:12:40.562731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'data_version')
@@ -0,0 +1,50 @@
+"""add user hierarchy
+
+Closure table over users.manager_id backing the org-wide dashboards: one
+row per (ancestor, descendant) pair, including each user paired with
+themselves. Backfilled here with a recursive CTE;
+``python -m app.db.rebuild_user_hierarchy`` redoes that later if needed.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 21:48:09.271553
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_hierarchy',
+    sa.Column('ancestor_id', sa.Integer(), nullable=False),
+    sa.Column('descendant_id', sa.Integer(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['ancestor_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['descendant_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index(op.f('ix_user_hierarchy_descendant_id'), 'user_hierarchy', ['descendant_id'], unique=False)
+    op.execute(
+        "INSERT INTO user_hierarchy (ancestor_id, descendant_id, depth) "
+        "WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS ("
+        "SELECT id, id, 0 FROM users "
+        "UNION ALL "
+        "SELECT tree.ancestor_id, users.id, tree.depth + 1 FROM tree JOIN users ON users.manager_id = tree.descendant_id"
+        ") SELECT ancestor_id, descendant_id, depth FROM tree"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_hierarchy_descendant_id'), table_name='user_hierarchy')
+    op.drop_table('user_hierarchy')
@@ -0,0 +1,52 @@
+"""add outbox
+
+Transactional outbox: emails are written here in the same transaction as the
+change that causes them and delivered afterwards by the outbox dispatcher
+(core/outbox.py), so they survive restarts and stay out of request latency.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 22:31:52.804417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PENDING_WHERE = sa.text("status = 'pending'")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('dedupe_key', sa.String(), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('status', sa.String(length=10), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('available_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('dedupe_key')
+    )
+    op.create_index(
+        'ix_outbox_pending_available_at_id', 'outbox', ['available_at', 'id'], unique=False,
+        postgresql_where=PENDING_WHERE, sqlite_where=PENDING_WHERE,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_outbox_pending_available_at_id', table_name='outbox')
+    op.drop_table('outbox')
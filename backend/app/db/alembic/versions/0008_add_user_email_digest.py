@@ -0,0 +1,32 @@
+"""add user email digest
+
+Per-user opt-in to email digests: notifications are emailed as one digest
+per EMAIL_DIGEST_WINDOW_MINUTES rather than one email each. The server
+default makes this a metadata-only change on PostgreSQL 11+.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 23:05:17.339861
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('email_digest', sa.Boolean(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'email_digest')
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Checkout wait samples kept per pool for the average and percentile figures
+WAIT_SAMPLE_SIZE = 2048
+
+
+class PoolMetrics:
+    """Connection pool counters fed by SQLAlchemy pool events and checkout timing"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=WAIT_SAMPLE_SIZE)
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.pings = 0
+        self.timeouts = 0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self._waits.append(seconds)
+            self.wait_max = max(self.wait_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def _incr(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def attach(self, pool, pre_ping: str = "always", pre_ping_idle_seconds: float = 30.0):
+        """Register the event listeners; ``pre_ping="idle"`` pings only connections idle for a while"""
+
+        @event.listens_for(pool, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            self._incr("connects")
+
+        @event.listens_for(pool, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            self._incr("checkouts")
+            if pre_ping != "idle":
+                return
+            idle_since = connection_record.info.get("checked_in_at")
+            if idle_since is None or time.monotonic() - idle_since < pre_ping_idle_seconds:
+                return
+            self._incr("pings")
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            except Exception:
+                # The pool discards this connection and retries the checkout with a fresh one
+                raise exc.DisconnectionError()
+            finally:
+                cursor.close()
+
+        @event.listens_for(pool, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            self._incr("checkins")
+            connection_record.info["checked_in_at"] = time.monotonic()
+
+        @event.listens_for(pool, "invalidate")
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            self._incr("invalidations")
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+            checkouts = self.checkouts
+            stats = {
+                "connects": self.connects,
+                "checkouts": checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "pre_pings": self.pings,
+                "checkout_timeouts": self.timeouts,
+                "checkout_wait_ms": {
+                    "avg": round(sum(waits) / len(waits) * 1000, 3) if waits else 0.0,
+                    "p50": round(waits[len(waits) // 2] * 1000, 3) if waits else 0.0,
+                    "p99": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000, 3) if waits else 0.0,
+                    "max": round(self.wait_max * 1000, 3),
+                },
+            }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+            })
+        return stats
+
+
+class TimedCheckoutMixin:
+    """Times ``Pool.connect()``, i.e. queueing for a slot plus any connect/ping it triggers"""
+
+    metrics: PoolMetrics = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+
+def instrumented_pool_class(base, metrics: PoolMetrics):
+    # The metrics live on the class so they survive Pool.recreate() after engine.dispose()
+    return type(f"Instrumented{base.__name__}", (TimedCheckoutMixin, base), {"metrics": metrics})
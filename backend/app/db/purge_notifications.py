@@ -0,0 +1,33 @@
+"""Purge read notifications older than the retention period, in small batches.
+
+Safe to run while the application is serving traffic; schedule it (cron, a
+Kubernetes CronJob, ...) to keep the notification table bounded::
+
+    python -m app.db.purge_notifications [--days 90] [--batch-size 500] [--pause 0.1]
+"""
+import argparse
+
+from ..core.config import NOTIFICATION_PURGE_BATCH_SIZE, NOTIFICATION_PURGE_PAUSE_SECONDS, NOTIFICATION_RETENTION_DAYS
+from ..crud.crud_notification_retention import purge_old_notifications
+from .session import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=NOTIFICATION_RETENTION_DAYS,
+                        help="keep read notifications younger than this many days")
+    parser.add_argument("--batch-size", type=int, default=NOTIFICATION_PURGE_BATCH_SIZE,
+                        help="rows deleted per transaction")
+    parser.add_argument("--pause", type=float, default=NOTIFICATION_PURGE_PAUSE_SECONDS,
+                        help="seconds to wait between batches")
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        deleted = purge_old_notifications(db, args.days, args.batch_size, args.pause)
+    finally:
+        db.close()
+    print(f"Deleted {deleted} read notifications older than {args.days} days")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+"""Rebuild feedback_sentiment_rollup from the feedback table.
+
+Run once after migrating an existing database, or whenever the rollup is
+suspected to have drifted::
+
+    python -m app.db.rebuild_sentiment_rollup
+    python -m app.db.rebuild_sentiment_rollup --manager-id 42
+"""
+import argparse
+
+from ..crud.crud_sentiment_rollup import rebuild_sentiment_rollup
+from ..models import user  # noqa: F401  (registers User for the Feedback relationships)
+from .session import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--manager-id", type=int, help="only rebuild this manager's rows")
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        written = rebuild_sentiment_rollup(db, manager_id=args.manager_id)
+    finally:
+        db.close()
+    print(f"Wrote {written} rollup rows")
+
+
+if __name__ == "__main__":
+    main()
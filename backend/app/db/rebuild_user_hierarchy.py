@@ -0,0 +1,24 @@
+"""Rebuild the user_hierarchy closure table from users.manager_id.
+
+Run whenever ``manager_id`` has been changed outside the application::
+
+    python -m app.db.rebuild_user_hierarchy
+"""
+import argparse
+
+from ..crud.crud_hierarchy import rebuild_user_hierarchy
+from .session import SessionLocal
+
+
+def main():
+    argparse.ArgumentParser(description=__doc__.splitlines()[0]).parse_args()
+    db = SessionLocal()
+    try:
+        written = rebuild_user_hierarchy(db)
+    finally:
+        db.close()
+    print(f"Wrote {written} hierarchy rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Requeue dead-lettered outbox messages for another round of delivery attempts.
+
+Run after fixing whatever made them fail (credentials, a rejected sender, ...);
+the dispatchers pick them up on their next poll::
+
+    python -m app.db.requeue_outbox [--id 12 --id 15]
+"""
+import argparse
+
+from ..crud.crud_outbox import requeue_dead_messages
+from .session import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--id", dest="ids", type=int, action="append",
+                        help="requeue only this message (repeatable); default: every dead-lettered message")
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        requeued = requeue_dead_messages(db, args.ids)
+    finally:
+        db.close()
+    print(f"Requeued {requeued} dead-lettered outbox messages")
+
+
+if __name__ == "__main__":
+    main()
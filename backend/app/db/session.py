@@ -1,11 +1,77 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 import os
 from dotenv import load_dotenv
+from .pool import PoolMetrics, instrumented_pool_class
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Connection pool tuning; the defaults match SQLAlchemy's own
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", -1))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+# "always" pings on every checkout, "idle" only after DB_POOL_PRE_PING_IDLE_SECONDS unused, "never" skips it
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "always")
+DB_POOL_PRE_PING_IDLE_SECONDS = float(os.getenv("DB_POOL_PRE_PING_IDLE_SECONDS", 30))
+
+if DB_POOL_PRE_PING not in ("always", "idle", "never"):
+    raise ValueError(f"Unknown DB_POOL_PRE_PING strategy: {DB_POOL_PRE_PING}")
+
+def pool_options(url: str, base_pool_class, metrics: PoolMetrics) -> dict:
+    """Engine keyword arguments for the configured pool"""
+    options = {"pool_pre_ping": DB_POOL_PRE_PING == "always"}
+    if make_url(url).get_backend_name() == "sqlite" and make_url(url).database in (None, "", ":memory:"):
+        # In-memory SQLite keeps its single-connection pool
+        return options
+    options.update(
+        poolclass=instrumented_pool_class(base_pool_class, metrics),
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    return options
+
+pool_metrics = PoolMetrics()
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL, QueuePool, pool_metrics))
+pool_metrics.attach(engine.pool, DB_POOL_PRE_PING, DB_POOL_PRE_PING_IDLE_SECONDS)
+# Objects keep their flushed state across commit: primary keys come back from the INSERT
+# and every other default is computed client-side, so re-reading rows would only add round trips
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# Async engine, used by the async route variants when ASYNC_DB_ENABLED is set
+ASYNC_DB_ENABLED = os.getenv("ASYNC_DB_ENABLED", "false").lower() in ("1", "true", "yes")
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+psycopg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def get_async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching async driver"""
+    sync_url = make_url(url)
+    backend = sync_url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}' databases")
+    return sync_url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+async_engine = None
+AsyncSessionLocal = None
+async_pool_metrics = None
+if ASYNC_DB_ENABLED:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or get_async_database_url(DATABASE_URL)
+    async_pool_metrics = PoolMetrics()
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, async_pool_metrics)
+    )
+    async_pool_metrics.attach(async_engine.sync_engine.pool, DB_POOL_PRE_PING, DB_POOL_PRE_PING_IDLE_SECONDS)
+    # Objects must stay usable after commit; async sessions cannot lazy-load expired attributes
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
@@ -1,14 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .api.routes import auth, users, feedback, dashboard
-from .models import user, feedback as feedback_model
-from .db.base import Base
-from .db.session import engine
+from .api.routes import auth, users, feedback, dashboard, internal, feedback_async, dashboard_async, notification_push
+from .models import user, feedback as feedback_model, outbox as outbox_model
+from .db.session import async_engine, ASYNC_DB_ENABLED
+from .core.security import password_hash_pool
+from .core.notification_bus import notification_bus
+from .core.mail import mail_worker
+from .core.outbox import outbox_dispatcher
+from .core.reports import report_renderer
+from .crud.pagination import InvalidCursor
 
-# Create all tables (for dev/demo; use Alembic in production)
-Base.metadata.create_all(bind=engine)
+# The schema is managed by Alembic migrations: run `alembic upgrade head` before starting
 
-app = FastAPI(title="Feedback System API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await notification_bus.start()
+    outbox_dispatcher.start()
+    yield
+    await notification_bus.stop()
+    # These join worker threads and processes, so they wait off the event loop
+    await run_in_threadpool(outbox_dispatcher.stop)
+    await run_in_threadpool(mail_worker.shutdown)
+    await run_in_threadpool(report_renderer.shutdown)
+    await run_in_threadpool(password_hash_pool.shutdown)
+    if async_engine is not None:
+        await async_engine.dispose()
+
+app = FastAPI(title="Feedback System API", lifespan=lifespan)
 
 class CustomProxyHeadersMiddleware:
     def __init__(self, app):
@@ -37,12 +58,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+@app.exception_handler(InvalidCursor)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursor):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+def without_overridden_routes(router, override):
+    """Drop routes from ``router`` that ``override`` serves under the same path and method"""
+    taken = {(route.path, method) for route in override.routes for method in route.methods}
+    router.routes = [
+        route for route in router.routes
+        if not any((route.path, method) in taken for method in route.methods)
+    ]
+    return router
+
 app.include_router(auth.router)
 app.include_router(users.router)
-app.include_router(feedback.router)
-app.include_router(dashboard.router)
+if ASYNC_DB_ENABLED:
+    # A/B switch: serve feedback, notification and dashboard endpoints from the async engine
+    app.include_router(feedback_async.router)
+    app.include_router(without_overridden_routes(feedback.router, feedback_async.router))
+    app.include_router(dashboard_async.router)
+else:
+    app.include_router(feedback.router)
+    app.include_router(dashboard.router)
+app.include_router(notification_push.router)
+app.include_router(internal.router)
 
 @app.get("/")
 def root():
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey, DateTime, Boolean, Table
+from sqlalchemy import Column, Integer, String, Enum, ForeignKey, Date, DateTime, Boolean, Table, Index, false
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -25,6 +25,11 @@ class Feedback(Base):
     manager = relationship("User", foreign_keys=[manager_id], backref="feedback_given")
     employee = relationship("User", foreign_keys=[employee_id], backref="feedback_received")
 
+    __table_args__ = (
+        Index("ix_feedback_manager_id_created_at_id", "manager_id", "created_at", "id"),
+        Index("ix_feedback_employee_id_created_at_id", "employee_id", "created_at", "id"),
+    )
+
 class FeedbackRequestStatus(enum.Enum):
     pending = "pending"
     completed = "completed"
@@ -44,6 +49,11 @@ class FeedbackRequest(Base):
     requester = relationship("User", foreign_keys=[requester_id], backref="feedback_requests_made")
     target = relationship("User", foreign_keys=[target_id], backref="feedback_requests_received")
 
+    __table_args__ = (
+        Index("ix_feedback_request_requester_id_created_at_id", "requester_id", "created_at", "id"),
+        Index("ix_feedback_request_target_id_created_at_id", "target_id", "created_at", "id"),
+    )
+
 class PeerFeedback(Base):
     __tablename__ = "peer_feedback"
 
@@ -60,6 +70,11 @@ class PeerFeedback(Base):
     from_user = relationship("User", foreign_keys=[from_user_id], backref="peer_feedback_given")
     to_user = relationship("User", foreign_keys=[to_user_id], backref="peer_feedback_received")
 
+    __table_args__ = (
+        Index("ix_peer_feedback_from_user_id_created_at_id", "from_user_id", "created_at", "id"),
+        Index("ix_peer_feedback_to_user_id_created_at_id", "to_user_id", "created_at", "id"),
+    )
+
 class FeedbackComment(Base):
     __tablename__ = "feedback_comment"
 
@@ -72,6 +87,10 @@ class FeedbackComment(Base):
     feedback = relationship("Feedback", backref="comments")
     user = relationship("User", backref="feedback_comments")
 
+    __table_args__ = (
+        Index("ix_feedback_comment_feedback_id_created_at_id", "feedback_id", "created_at", "id"),
+    )
+
 # Association table for many-to-many Feedback <-> Tag
 feedback_tag = Table(
     "feedback_tag",
@@ -99,3 +118,26 @@ class Notification(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", backref="notifications")
+
+    __table_args__ = (
+        Index("ix_notification_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Partial index: only unread rows, for unread badges and "mark all read"
+        Index(
+            "ix_notification_user_id_unread",
+            "user_id",
+            postgresql_where=(read == false()),
+            sqlite_where=(read == false()),
+        ),
+    )
+
+class FeedbackSentimentRollup(Base):
+    """Feedback counts per manager, employee, time bucket and sentiment (see crud/crud_sentiment_rollup.py)"""
+    __tablename__ = "feedback_sentiment_rollup"
+
+    # Key order serves the trends query: one manager, one granularity, a range of buckets
+    manager_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    granularity = Column(String(5), primary_key=True)  # 'day', 'week' or 'month'
+    bucket = Column(Date, primary_key=True)  # first day of the bucket
+    employee_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    sentiment = Column(Enum(SentimentEnum), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
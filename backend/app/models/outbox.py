@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Index
+from datetime import datetime
+from ..db.base import Base
+
+class OutboxMessage(Base):
+    """A side effect (for now, an email) written in the transaction that causes it and delivered by core/outbox.py"""
+    __tablename__ = "outbox"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(20), nullable=False)  # e.g., 'email'
+    # Names the event the message is for (e.g. 'feedback:42:email'); enqueueing it twice fails the transaction
+    dedupe_key = Column(String, unique=True, nullable=True)
+    payload = Column(JSON, nullable=False)
+    status = Column(String(10), nullable=False, default="pending")  # 'pending', 'sent' or 'dead'
+    attempts = Column(Integer, nullable=False, default=0)
+    # Next attempt; while a dispatcher holds the message, when its claim expires
+    available_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Partial index: only pending rows, in the order dispatchers claim them
+        Index(
+            "ix_outbox_pending_available_at_id",
+            "available_at",
+            "id",
+            postgresql_where=(status == "pending"),
+            sqlite_where=(status == "pending"),
+        ),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Enum, ForeignKey, Boolean
 from sqlalchemy.orm import relationship
 import enum
 from ..db.base import Base
@@ -15,6 +15,18 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     role = Column(Enum(UserRole), nullable=False)
-    manager_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    manager_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    # Bumped by every write to the user's feedback, tags or notifications (see crud/crud_data_version.py)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Email notifications as one digest per EMAIL_DIGEST_WINDOW_MINUTES (see crud/crud_email_digest.py)
+    email_digest = Column(Boolean, nullable=False, default=False, server_default="0")
 
     manager = relationship("User", remote_side=[id], backref="team_members")
+
+class UserHierarchy(Base):
+    """Closure of users.manager_id: one row per (ancestor, descendant) pair, self pairs at depth 0"""
+    __tablename__ = "user_hierarchy"
+
+    ancestor_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("users.id"), primary_key=True, index=True)
+    depth = Column(Integer, nullable=False)
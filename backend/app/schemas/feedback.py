@@ -1,13 +1,24 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from enum import Enum
 from datetime import datetime
+from ..core.config import FEEDBACK_BULK_MAX_ITEMS
 
 class SentimentEnum(str, Enum):
     positive = "positive"
     neutral = "neutral"
     negative = "negative"
 
+class TrendGranularity(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+    zip = "zip"
+
 class TagBase(BaseModel):
     name: str
 
@@ -52,6 +63,29 @@ class FeedbackReadWithEmployee(FeedbackRead):
     class Config:
         from_attributes = True
 
+class FeedbackTagsAssign(BaseModel):
+    feedback_ids: list[int] = Field(..., min_length=1, max_length=FEEDBACK_BULK_MAX_ITEMS)
+    tag_ids: list[int] = Field(default_factory=list, max_length=FEEDBACK_BULK_MAX_ITEMS)
+    replace: bool = False
+
+class FeedbackTagsRead(BaseModel):
+    feedback_id: int
+    tags: list[TagRead]
+
+class FeedbackBulkCreate(BaseModel):
+    items: list[FeedbackCreate] = Field(..., min_length=1, max_length=FEEDBACK_BULK_MAX_ITEMS)
+
+class FeedbackBulkItemResult(BaseModel):
+    index: int
+    employee_id: int
+    feedback: Optional[FeedbackRead] = None
+    error: Optional[str] = None
+
+class FeedbackBulkResult(BaseModel):
+    created: int
+    failed: int
+    results: list[FeedbackBulkItemResult]
+
 class FeedbackRequestStatus(str, Enum):
     pending = "pending"
     completed = "completed"
@@ -86,7 +120,7 @@ class PeerFeedbackCreate(PeerFeedbackBase):
 
 class PeerFeedbackRead(PeerFeedbackBase):
     id: int
-    from_user_id: int
+    from_user_id: Optional[int]  # None on anonymous feedback listed to its recipient
     created_at: datetime
     updated_at: datetime
 
@@ -123,3 +157,6 @@ class NotificationRead(NotificationBase):
 
     class Config:
         from_attributes = True
+
+class NotificationsMarkRead(BaseModel):
+    notification_ids: list[int] = Field(..., min_length=1, max_length=FEEDBACK_BULK_MAX_ITEMS)
@@ -21,6 +21,7 @@ class UserRead(UserBase):
     manager_id: Optional[int] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
+    email_digest: bool = False
 
     class Config:
         from_attributes = True
@@ -28,6 +29,9 @@ class UserRead(UserBase):
 class UserInDB(UserRead):
     hashed_password: str
 
+class EmailDigestUpdate(BaseModel):
+    enabled: bool
+
 class TeamMemberAdd(BaseModel):
     employee_id: int
 
@@ -0,0 +1,169 @@
+"""Analytics export benchmark: vectorized NumPy pass vs a row-by-row Python loop.
+
+Seeds one manager's team with a synthetic feedback history (a third of it
+tagged, with peer feedback alongside), then times
+``crud_analytics.get_feedback_analytics`` against the same figures computed by
+iterating the rows in Python, and exits non-zero if the two disagree::
+
+    python -m benchmarks.bench_analytics
+    python -m benchmarks.bench_analytics --rows 100000
+"""
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from .common import configure_environment, create_schema, report
+
+configure_environment()
+
+from sqlalchemy import select  # noqa: E402
+
+from app.core.cache import tag_cache  # noqa: E402
+from app.crud import crud_analytics  # noqa: E402
+from app.crud.crud_hierarchy import rebuild_user_hierarchy  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models.feedback import Feedback, PeerFeedback, SentimentEnum, Tag, feedback_tag  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+
+SEED_BATCH = 20000
+
+
+def seed(db, rows, team_size, tags):
+    manager = User(name="Manager", email="manager@example.com", hashed_password="x", role=UserRole.manager)
+    db.add(manager)
+    db.flush()
+    team = [User(name=f"Employee {i}", email=f"e{i}@example.com", hashed_password="x",
+                 role=UserRole.employee, manager_id=manager.id) for i in range(team_size)]
+    db.add_all(team)
+    db.add_all(Tag(name=f"tag-{i}") for i in range(tags))
+    db.flush()
+    team_ids = [member.id for member in team]
+    tag_ids = list(db.scalars(select(Tag.id)))
+    sentiments = list(SentimentEnum)
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1)
+    for offset in range(0, rows, SEED_BATCH):
+        feedback, peer = [], []
+        for i in range(offset, min(rows, offset + SEED_BATCH)):
+            created = start + timedelta(minutes=i)
+            acknowledged = rng.random() < 0.6
+            feedback.append({
+                "id": i + 1, "manager_id": manager.id, "employee_id": team_ids[i % team_size], "strengths": "S",
+                "areas_to_improve": "A", "sentiment": rng.choice(sentiments), "acknowledged": acknowledged,
+                "created_at": created,
+                "updated_at": created + timedelta(seconds=rng.randint(60, 14 * 86400)) if acknowledged else created,
+            })
+            if i % 4 == 0:
+                peer.append({
+                    "from_user_id": team_ids[i % team_size], "to_user_id": team_ids[(i + 1) % team_size],
+                    "strengths": "S", "areas_to_improve": "A", "sentiment": rng.choice(sentiments),
+                    "is_anonymous": False, "created_at": created,
+                })
+        db.execute(Feedback.__table__.insert(), feedback)
+        db.execute(PeerFeedback.__table__.insert(), peer)
+        db.execute(feedback_tag.insert(), [
+            {"feedback_id": row["id"], "tag_id": tag_ids[row["id"] % len(tag_ids)]}
+            for row in feedback if row["id"] % 3 == 0
+        ])
+    db.commit()
+    rebuild_user_hierarchy(db)
+    return manager.id
+
+
+def interpolated_percentile(ordered, pct):
+    """Linear interpolation between closest ranks, as numpy.percentile does by default"""
+    position = (len(ordered) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def row_by_row(db, manager_id):
+    """The same figures from a plain Python loop over the rows"""
+    sentiments, latencies, acknowledged, total = Counter(), [], 0, 0
+    query = select(Feedback.sentiment, Feedback.acknowledged, Feedback.created_at, Feedback.updated_at).where(
+        Feedback.manager_id == manager_id,
+    )
+    for sentiment, is_acknowledged, created_at, updated_at in db.execute(query):
+        total += 1
+        sentiments[sentiment.value] += 1
+        if is_acknowledged:
+            acknowledged += 1
+            if created_at and updated_at and updated_at >= created_at:
+                latencies.append((updated_at - created_at).total_seconds() / 3600)
+    latencies.sort()
+    team = select(User.id).where(User.manager_id == manager_id)
+    peer_sentiments = Counter(
+        sentiment.value for (sentiment,) in db.execute(select(PeerFeedback.sentiment).where(PeerFeedback.to_user_id.in_(team)))
+    )
+    tags = Counter()
+    tagged = select(feedback_tag.c.tag_id, Feedback.sentiment).join(Feedback, Feedback.id == feedback_tag.c.feedback_id)
+    for tag_id, sentiment in db.execute(tagged.where(Feedback.manager_id == manager_id)):
+        tags[tag_id, sentiment.value] += 1
+    return {
+        "total": total,
+        "sentiment": dict(sentiments),
+        "acknowledged": acknowledged,
+        "latency": {f"p{pct}": interpolated_percentile(latencies, pct) for pct in crud_analytics.LATENCY_PERCENTILES},
+        "peer_sentiment": dict(peer_sentiments),
+        "tags": dict(tags),
+    }
+
+
+def differences(vectorized, reference):
+    feedback = vectorized["feedback"]
+    checks = {
+        "total": (feedback["total"], reference["total"]),
+        "sentiment": ({key: value["count"] for key, value in feedback["sentiment"].items() if value["count"]},
+                      reference["sentiment"]),
+        "acknowledged": (feedback["acknowledged"]["count"], reference["acknowledged"]),
+        "peer_sentiment": ({key: value["count"] for key, value in vectorized["peer_feedback"]["sentiment"].items()
+                            if value["count"]}, reference["peer_sentiment"]),
+        "tags": ({(tag["tag_id"], sentiment.value): tag[sentiment.value] for tag in vectorized["tags"]
+                  for sentiment in SentimentEnum if tag[sentiment.value]}, reference["tags"]),
+    }
+    mismatched = [name for name, (ours, theirs) in checks.items() if ours != theirs]
+    for key, value in reference["latency"].items():
+        if abs(feedback["acknowledgement_latency_hours"][key] - value) > 0.01:
+            mismatched.append(f"latency {key}")
+    return mismatched
+
+
+def timed(call, repeat):
+    result, started = None, time.perf_counter()
+    for _ in range(repeat):
+        result = call()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+
+def main(rows, team_size, tags, repeat):
+    create_schema()
+    db = SessionLocal()
+    started = time.perf_counter()
+    manager_id = seed(db, rows, team_size, tags)
+    seeded_s = time.perf_counter() - started
+    tag_cache.clear()
+    vectorized, vectorized_ms = timed(lambda: crud_analytics.get_feedback_analytics(db, manager_id), repeat)
+    reference, reference_ms = timed(lambda: row_by_row(db, manager_id), repeat)
+    db.close()
+    mismatched = differences(vectorized, reference)
+    report(f"Analytics export ({engine.dialect.name}, {rows} feedback rows, seeded in {seeded_s:.1f} s)", [
+        ("vectorized (NumPy)", f"{vectorized_ms:.0f} ms"),
+        ("row by row (Python)", f"{reference_ms:.0f} ms"),
+        ("speed-up", f"{reference_ms / vectorized_ms:.1f}x"),
+        ("results", f"MISMATCH: {', '.join(mismatched)}" if mismatched else "match"),
+    ])
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--team-size", type=int, default=50)
+    parser.add_argument("--tags", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    sys.exit(main(args.rows, args.team_size, args.tags, args.repeat))
@@ -0,0 +1,180 @@
+"""List serialization microbenchmark: ORM objects + pydantic validation vs row tuples + orjson.
+
+Seeds 10k rows for each of three list endpoints (a manager's team feedback
+with tags, an employee's notifications, and the peer feedback they received,
+a fifth of it anonymous), then builds each response body two ways:
+
+* the old path: ORM entities, ``TypeAdapter.validate_python(from_attributes=True)``,
+  ``jsonable_encoder`` and the stdlib JSON encoder behind ``JSONResponse``
+* the new path: the CRUD functions' response-ready rows (selected by
+  ``schema_columns``) encoded by ``api.deps.dump_json`` (orjson)
+
+Reports the best of several runs for fetch + serialize and for serialization
+alone, and exits non-zero if any body differs::
+
+    python -m benchmarks.bench_list_serialization
+    python -m benchmarks.bench_list_serialization --rows 50000 --repeat 3
+"""
+import argparse
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import List
+
+from .common import configure_environment, create_schema, report
+
+configure_environment()
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app.api.deps import dump_json  # noqa: E402
+from app.crud import crud_feedback  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+from app.models.feedback import Feedback, Notification, PeerFeedback, SentimentEnum, Tag, feedback_tag  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.schemas.feedback import FeedbackReadWithEmployee, NotificationRead, PeerFeedbackRead  # noqa: E402
+
+SEED_BATCH = 10000
+
+
+def seed(db, rows):
+    manager = User(name="Manager", email="manager@example.com", hashed_password="x", role=UserRole.manager)
+    db.add(manager)
+    db.flush()
+    team = [User(name=f"Employee {i}", email=f"e{i}@example.com", hashed_password="x", role=UserRole.employee,
+                 manager_id=manager.id) for i in range(50)]
+    db.add_all(team)
+    db.add_all(Tag(name=f"tag-{i}") for i in range(10))
+    db.flush()
+    reader = team[0]
+    sentiments = list(SentimentEnum)
+    start = datetime(2024, 1, 1, 9, 30, 15, 250000)
+    text = "Clear written updates and steady delivery on the migration work."
+    for offset in range(0, rows, SEED_BATCH):
+        batch = range(offset, min(rows, offset + SEED_BATCH))
+        db.execute(Feedback.__table__.insert(), [
+            {"id": i + 1, "manager_id": manager.id, "employee_id": team[i % len(team)].id, "strengths": text,
+             "areas_to_improve": text, "sentiment": sentiments[i % 3], "acknowledged": i % 2 == 0,
+             "created_at": start + timedelta(seconds=i), "updated_at": start + timedelta(seconds=i, minutes=5)}
+            for i in batch
+        ])
+        db.execute(feedback_tag.insert(), [{"feedback_id": i + 1, "tag_id": i % 10 + 1} for i in batch if i % 3 == 0])
+        db.execute(Notification.__table__.insert(), [
+            {"user_id": reader.id, "message": "You have received new feedback from your manager.", "type": "feedback",
+             "read": i % 4 == 0, "created_at": start + timedelta(seconds=i)}
+            for i in batch
+        ])
+        db.execute(PeerFeedback.__table__.insert(), [
+            {"from_user_id": team[i % (len(team) - 1) + 1].id, "to_user_id": reader.id, "strengths": text,
+             "areas_to_improve": text, "sentiment": sentiments[i % 3], "is_anonymous": i % 5 == 0,
+             "created_at": start + timedelta(seconds=i), "updated_at": start + timedelta(seconds=i)}
+            for i in batch
+        ])
+    db.commit()
+    return manager.id, reader.id
+
+
+# The list queries as they were: ORM entities, handed to pydantic for validation
+
+
+def old_manager_feedback(db, manager_id):
+    rows = (
+        db.query(Feedback, User.name, User.email)
+        .outerjoin(User, User.id == Feedback.employee_id)
+        .filter(Feedback.manager_id == manager_id)
+        .order_by(Feedback.created_at.desc(), Feedback.id.desc())
+        .all()
+    )
+    tags_by_feedback = defaultdict(list)
+    for feedback_id, tag in (
+        db.query(feedback_tag.c.feedback_id, Tag).join(Tag, Tag.id == feedback_tag.c.tag_id)
+        .filter(feedback_tag.c.feedback_id.in_([feedback.id for feedback, _, _ in rows]))
+    ):
+        tags_by_feedback[feedback_id].append(tag)
+    return [
+        {"id": feedback.id, "manager_id": feedback.manager_id, "employee_id": feedback.employee_id,
+         "strengths": feedback.strengths, "areas_to_improve": feedback.areas_to_improve, "sentiment": feedback.sentiment,
+         "created_at": feedback.created_at, "updated_at": feedback.updated_at, "acknowledged": feedback.acknowledged,
+         "tags": tags_by_feedback[feedback.id], "employee_name": name or "Unknown Employee",
+         "employee_email": email or "unknown@example.com"}
+        for feedback, name, email in rows
+    ]
+
+
+def old_notifications(db, user_id):
+    return (
+        db.query(Notification).filter(Notification.user_id == user_id)
+        .order_by(Notification.created_at.desc(), Notification.id.desc()).all()
+    )
+
+
+def old_peer_feedback_received(db, user_id):
+    feedbacks = (
+        db.query(PeerFeedback).filter(PeerFeedback.to_user_id == user_id)
+        .order_by(PeerFeedback.created_at.desc(), PeerFeedback.id.desc()).all()
+    )
+    for feedback in feedbacks:
+        if feedback.is_anonymous:
+            feedback.from_user_id = None
+    return feedbacks
+
+
+def old_body(model, content) -> bytes:
+    return JSONResponse(jsonable_encoder(TypeAdapter(model).validate_python(content, from_attributes=True))).body
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main(rows, repeat):
+    create_schema()
+    with SessionLocal() as db:
+        manager_id, reader_id = seed(db, rows)
+    cases = [
+        ("team feedback", List[FeedbackReadWithEmployee], lambda db: old_manager_feedback(db, manager_id),
+         lambda db: crud_feedback.get_feedback_for_manager(db, manager_id)),
+        ("notifications", List[NotificationRead], lambda db: old_notifications(db, reader_id),
+         lambda db: crud_feedback.get_notifications_for_user(db, reader_id)),
+        ("peer feedback received", List[PeerFeedbackRead], lambda db: old_peer_feedback_received(db, reader_id),
+         lambda db: crud_feedback.get_peer_feedback_received(db, reader_id)),
+    ]
+    table, mismatches = [], 0
+    for name, model, old_fetch, new_fetch in cases:
+        # Each run gets a fresh session, as each request does
+        def old_path():
+            with SessionLocal() as db:
+                return old_body(model, old_fetch(db))
+
+        def new_path():
+            with SessionLocal() as db:
+                return dump_json(new_fetch(db))
+
+        old_seconds, old = best_of(repeat, old_path)
+        new_seconds, new = best_of(repeat, new_path)
+        with SessionLocal() as db:
+            old_rows, new_rows = old_fetch(db), new_fetch(db)
+            old_encode, _ = best_of(repeat, lambda: old_body(model, old_rows))
+            new_encode, _ = best_of(repeat, lambda: dump_json(new_rows))
+        mismatches += old != new
+        table.append((name, f"old {old_seconds * 1000:6.0f} ms (serialize {old_encode * 1000:5.0f} ms), "
+                            f"new {new_seconds * 1000:5.0f} ms (serialize {new_encode * 1000:4.0f} ms), "
+                            f"{old_seconds / new_seconds:4.1f}x, bodies {'match' if old == new else 'DIFFER'}"))
+    report(f"List response bodies ({rows} rows each, best of {repeat})", table)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(main(args.rows, args.repeat))
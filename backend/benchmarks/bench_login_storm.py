@@ -0,0 +1,88 @@
+"""Login storm benchmark for the password hashing pool.
+
+Saturates ``POST /api/auth/login`` with concurrent sign-ins while a second
+client polls ``GET /api/dashboard/manager/overview``, then reports login
+throughput, the number of 503 rejections and the dashboard latency
+percentiles. Compare executors and pool sizes via the environment::
+
+    PASSWORD_HASH_EXECUTOR=thread  python -m benchmarks.bench_login_storm
+    PASSWORD_HASH_EXECUTOR=process python -m benchmarks.bench_login_storm
+    PASSWORD_HASH_WORKERS=2 PASSWORD_HASH_MAX_QUEUE=4 python -m benchmarks.bench_login_storm
+
+Requires ``httpx``.
+"""
+import argparse
+import asyncio
+import time
+
+from .common import configure_environment, create_schema, percentile, report
+
+configure_environment()
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.core import security  # noqa: E402
+
+
+async def login_worker(client, deadline, results):
+    form = {"username": "storm@example.com", "password": "password123"}
+    while time.perf_counter() < deadline:
+        response = await client.post("/api/auth/login", data=form)
+        results[response.status_code] = results.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            await asyncio.sleep(0.01)
+
+
+async def dashboard_poller(client, headers, deadline, latencies):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.get("/api/dashboard/manager/overview", headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def run(concurrency, duration):
+    create_schema()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/api/auth/register", json={
+            "name": "Storm", "email": "storm@example.com", "password": "password123", "role": "manager",
+        })
+        token = (await client.post("/api/auth/login", data={
+            "username": "storm@example.com", "password": "password123",
+        })).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        # Baseline latency with no logins in flight
+        idle = []
+        await dashboard_poller(client, headers, time.perf_counter() + 1.0, idle)
+
+        results, latencies = {}, []
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            dashboard_poller(client, headers, deadline, latencies),
+            *(login_worker(client, deadline, results) for _ in range(concurrency)),
+        )
+
+    report("Login storm", [
+        ("executor", security.password_hash_pool.kind),
+        ("workers / max queue", f"{security.password_hash_pool.workers} / {security.password_hash_pool.max_queue}"),
+        ("concurrent logins", concurrency),
+        ("successful logins/s", f"{results.get(200, 0) / duration:.1f}"),
+        ("rejected (503)", results.get(503, 0)),
+        ("dashboard p50 idle (ms)", f"{percentile(idle, 50):.2f}"),
+        ("dashboard p50 storm (ms)", f"{percentile(latencies, 50):.2f}"),
+        ("dashboard p99 idle (ms)", f"{percentile(idle, 99):.2f}"),
+        ("dashboard p99 storm (ms)", f"{percentile(latencies, 99):.2f}"),
+    ])
+    security.password_hash_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.duration))
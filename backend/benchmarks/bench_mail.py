@@ -0,0 +1,125 @@
+"""Mail delivery benchmark: one SMTP connection per email vs the pooled mail worker.
+
+Starts a local aiosmtpd server as a stand-in for the mail provider, with an
+artificial delay on EHLO to model the TLS handshake and login a real server
+costs per connection, and optionally a 451 "try again" for every Nth message
+to exercise the retry path. Sends the same emails the old way (connect, send,
+quit per email) and through ``MailWorker``, then reports throughput and
+connections opened, and exits non-zero if any email went missing::
+
+    python -m benchmarks.bench_mail
+    python -m benchmarks.bench_mail --emails 2000 --handshake-ms 50 --fail-every 25
+
+Requires ``aiosmtpd``.
+"""
+import argparse
+import asyncio
+import smtplib
+import socket
+import sys
+import threading
+import time
+
+from .common import configure_environment, report
+
+configure_environment()
+
+from aiosmtpd.controller import Controller  # noqa: E402
+
+from app.core.mail import Email, MailWorker, SMTPSender, build_message  # noqa: E402
+
+FROM_EMAIL = "feedback@example.com"
+
+
+class StandInHandler:
+    def __init__(self, handshake_ms, fail_every):
+        self.handshake = handshake_ms / 1000
+        self.fail_every = fail_every
+        self.received = set()
+        self.attempts = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        with self._lock:
+            self.connections += 1
+        await asyncio.sleep(self.handshake)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            self.attempts += 1
+            if self.fail_every and self.attempts % self.fail_every == 0:
+                return "451 Try again later"
+            self.received.add(envelope.rcpt_tos[0])
+        return "250 OK"
+
+
+def send_one_connection_each(port, emails):
+    """What core/config.send_email used to do for every email"""
+    for email in emails:
+        with smtplib.SMTP("127.0.0.1", port) as server:
+            try:
+                server.sendmail(FROM_EMAIL, [email.to_email], build_message(email, FROM_EMAIL).as_string())
+            except smtplib.SMTPDataError:
+                pass
+
+
+def send_with_worker(port, emails, workers, batch_size):
+    worker = MailWorker(
+        workers=workers, max_queue=len(emails), batch_size=batch_size, backoff=0.01, enabled=True,
+        sender_factory=lambda: SMTPSender("127.0.0.1", port, user=None, starttls=False, from_email=FROM_EMAIL),
+    )
+    worker.submit(emails)
+    worker.shutdown(timeout=600)
+    return worker.stats()
+
+
+def run(handler, send):
+    handler.received.clear()
+    handler.connections = 0
+    started = time.perf_counter()
+    stats = send()
+    elapsed = time.perf_counter() - started
+    return len(handler.received), handler.connections, elapsed, stats
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main(count, handshake_ms, fail_every, workers, batch_size, baseline_limit):
+    handler = StandInHandler(handshake_ms, fail_every)
+    port = free_port()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        baseline_emails = [Email(f"baseline-{i}@example.com", "New Feedback Received", "<p>Hi</p>")
+                           for i in range(min(count, baseline_limit))]
+        worker_emails = [Email(f"worker-{i}@example.com", "New Feedback Received", "<p>Hi</p>") for i in range(count)]
+        rows = []
+        delivered, connections, elapsed, _ = run(handler, lambda: send_one_connection_each(port, baseline_emails))
+        rows.append(("one connection per email", f"{len(baseline_emails) / elapsed:7.0f} emails/s, {connections} connections, "
+                                                f"{delivered}/{len(baseline_emails)} delivered"))
+        delivered, connections, elapsed, stats = run(handler, lambda: send_with_worker(port, worker_emails, workers, batch_size))
+        rows.append((f"mail worker ({workers} connections)", f"{count / elapsed:7.0f} emails/s, {connections} connections, "
+                                                             f"{delivered}/{count} delivered, {stats['retried']} retried"))
+    finally:
+        controller.stop()
+    report(f"Mail delivery ({handshake_ms} ms handshake, 451 every {fail_every or 'never'})", rows)
+    return 0 if delivered == count else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=1000)
+    parser.add_argument("--handshake-ms", type=float, default=20)
+    parser.add_argument("--fail-every", type=int, default=0, help="answer 451 to every Nth message")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--baseline-limit", type=int, default=200, help="emails sent the old way, which is slow")
+    args = parser.parse_args()
+    sys.exit(main(args.emails, args.handshake_ms, args.fail_every, args.workers, args.batch_size, args.baseline_limit))
@@ -0,0 +1,92 @@
+"""Org rollup benchmark: latency of the org-wide dashboards vs hierarchy depth.
+
+Builds the same organisation (a director, a fixed number of managers and
+feedback rows) shaped as ever deeper reporting chains, then times the org
+overview and org sentiment trends for the director. Both are a single query
+over the user_hierarchy closure table, so the figures should stay flat as
+depth grows::
+
+    python -m benchmarks.bench_org_rollup
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta
+
+from .common import configure_environment, count_statements, create_schema, report
+
+configure_environment()
+
+from app.crud import crud_dashboard, crud_sentiment_rollup  # noqa: E402
+from app.crud.crud_hierarchy import rebuild_user_hierarchy  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models.feedback import Feedback, SentimentEnum  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+
+
+def seed(db, depth, managers, rows):
+    """A director over ``managers`` managers arranged as chains ``depth`` long, each with one employee"""
+    director = User(name="Director", email=f"director-{depth}@example.com", hashed_password="x", role=UserRole.manager)
+    db.add(director)
+    db.flush()
+    team = []
+    for chain in range(managers // depth):
+        parent = director
+        for level in range(depth):
+            manager = User(name=f"Manager {chain}.{level}", email=f"m-{depth}-{chain}-{level}@example.com",
+                           hashed_password="x", role=UserRole.manager, manager_id=parent.id)
+            db.add(manager)
+            db.flush()
+            employee = User(name=f"Employee {chain}.{level}", email=f"e-{depth}-{chain}-{level}@example.com",
+                            hashed_password="x", role=UserRole.employee, manager_id=manager.id)
+            db.add(employee)
+            db.flush()
+            team.append((manager.id, employee.id))
+            parent = manager
+    sentiments = list(SentimentEnum)
+    start = datetime(2024, 1, 1)
+    db.execute(Feedback.__table__.insert(), [
+        {
+            "manager_id": team[i % len(team)][0], "employee_id": team[i % len(team)][1], "strengths": "S",
+            "areas_to_improve": "A", "sentiment": sentiments[i % 3], "acknowledged": False,
+            "created_at": start + timedelta(hours=i), "updated_at": start + timedelta(hours=i),
+        }
+        for i in range(rows)
+    ])
+    db.commit()
+    return director.id
+
+
+def timed(call, repeat):
+    with count_statements(engine) as counter:
+        call()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    return (time.perf_counter() - started) / repeat * 1000, counter.count
+
+
+def main(depths, managers, rows, repeat):
+    create_schema()
+    db = SessionLocal()
+    directors = {depth: seed(db, depth, managers, rows) for depth in depths}
+    rebuild_user_hierarchy(db)
+    crud_sentiment_rollup.rebuild_sentiment_rollup(db)
+    results = []
+    for depth, director_id in directors.items():
+        overview_ms, overview_statements = timed(lambda: crud_dashboard.get_org_overview(db, director_id), repeat)
+        trends_ms, trends_statements = timed(lambda: crud_sentiment_rollup.get_sentiment_trends(
+            db, director_id, "month", date(2024, 1, 1), date(2024, 12, 31), org=True), repeat)
+        results.append((f"depth {depth}", f"overview {overview_ms:.2f} ms ({overview_statements} stmt), "
+                                          f"trends {trends_ms:.2f} ms ({trends_statements} stmt)"))
+    db.close()
+    report(f"Org rollups ({engine.dialect.name}, {managers} managers, {rows} feedback rows per org)", results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--managers", type=int, default=64)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.depths, args.managers, args.rows, args.repeat)
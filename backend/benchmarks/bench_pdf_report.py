@@ -0,0 +1,156 @@
+"""PDF report benchmark: rendering inline vs in the report process pool, and a cached download.
+
+Seeds one employee with a long feedback history, then times the report three
+ways: rendered the way the route used to (every row loaded as an ORM object,
+FPDF run on a request thread), rendered by ``ReportRenderer`` into an empty
+cache, and served again from the cache. While each render runs, a coroutine
+ticking every millisecond measures how long the event loop stalls, which is
+what every other request on the process would feel. Also reports the Python
+heap peak of each render, and exits non-zero if the reports differ in page
+count::
+
+    python -m benchmarks.bench_pdf_report
+    python -m benchmarks.bench_pdf_report --rows 5000
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from .common import configure_environment, create_schema, report
+
+configure_environment()
+
+from fpdf import FPDF  # noqa: E402
+
+from app.core.reports import ReportCache, ReportRenderer, render_feedback_report  # noqa: E402
+from app.crud import crud_report  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+from app.models.feedback import Feedback, SentimentEnum  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+
+SEED_BATCH = 5000
+
+
+def seed(db, rows):
+    manager = User(name="Manager", email="manager@example.com", hashed_password="x", role=UserRole.manager)
+    employee = User(name="Employee", email="employee@example.com", hashed_password="x", role=UserRole.employee)
+    db.add_all([manager, employee])
+    db.flush()
+    sentiments = list(SentimentEnum)
+    start = datetime(2024, 1, 1)
+    for offset in range(0, rows, SEED_BATCH):
+        db.execute(Feedback.__table__.insert(), [
+            {"manager_id": manager.id, "employee_id": employee.id, "strengths": f"Strength {i} " * 8,
+             "areas_to_improve": f"Area {i} " * 8, "sentiment": sentiments[i % 3], "acknowledged": i % 2 == 0,
+             "created_at": start + timedelta(minutes=i), "updated_at": start + timedelta(minutes=i)}
+            for i in range(offset, min(rows, offset + SEED_BATCH))
+        ])
+    db.commit()
+    return employee.id, employee.name
+
+
+def render_inline(employee_id, employee_name):
+    """What GET /api/feedback/employee/pdf used to do on the request thread"""
+    with SessionLocal() as db:
+        feedbacks = (
+            db.query(Feedback).filter(Feedback.employee_id == employee_id)
+            .order_by(Feedback.created_at.desc(), Feedback.id.desc()).all()
+        )
+        pdf = FPDF()
+        pdf.add_page()
+        pdf.set_font("helvetica", size=12)
+        pdf.cell(200, 10, text=f"Feedback Report for {employee_name}", new_x="LMARGIN", new_y="NEXT", align="C")
+        pdf.ln(10)
+        for fb in feedbacks:
+            pdf.multi_cell(0, 10, text=f"Date: {fb.created_at.strftime('%Y-%m-%d %H:%M')}\nStrengths: {fb.strengths}\nAreas to Improve: {fb.areas_to_improve}\nSentiment: {fb.sentiment.value}\nAcknowledged: {fb.acknowledged}\n---", align="L")
+            pdf.ln(2)
+        output = io.BytesIO()
+        pdf.output(output)
+        return output.getvalue()
+
+
+async def with_stall(work):
+    """Await ``work`` while measuring the event loop's longest gap between 1 ms ticks"""
+    longest = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal longest
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            longest = max(longest, now - last)
+            last = now
+
+    tick = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    result = await work
+    elapsed = time.perf_counter() - started
+    done.set()
+    await tick
+    return result, elapsed, longest
+
+
+def heap_peak(fn, *args):
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def pages(pdf: bytes) -> int:
+    return pdf.count(b"/Type /Page") - pdf.count(b"/Type /Pages")
+
+
+async def run(employee_id, employee_name, version, cache_dir):
+    renderer = ReportRenderer(ReportCache(directory=cache_dir))
+    try:
+        # Start the worker processes first, so the cold render below measures rendering rather than start-up
+        await asyncio.wrap_future(renderer._get_executor().submit(int))
+        inline, inline_s, inline_stall = await with_stall(asyncio.to_thread(render_inline, employee_id, employee_name))
+        handle, cold_s, cold_stall = await with_stall(renderer.report(employee_id, employee_name, version))
+        with handle:
+            cold = handle.read()
+        handle, cached_s, cached_stall = await with_stall(renderer.report(employee_id, employee_name, version))
+        with handle:
+            cached = handle.read()
+    finally:
+        renderer.shutdown()
+    return [
+        ("inline (request thread)", inline_s, inline_stall, inline),
+        ("process pool, cold cache", cold_s, cold_stall, cold),
+        ("process pool, cached", cached_s, cached_stall, cached),
+    ]
+
+
+def main(rows):
+    create_schema()
+    with SessionLocal() as db:
+        employee_id, employee_name = seed(db, rows)
+        version = crud_report.get_report_version(db, employee_id)
+    results = asyncio.run(run(employee_id, employee_name, version, tempfile.mkdtemp(prefix="feedback-reports-")))
+    table = [(name, f"{seconds * 1000:8.0f} ms, event loop stalled up to {stall * 1000:6.0f} ms, "
+                    f"{len(pdf) / 1024:6.0f} KiB, {pages(pdf)} pages")
+             for name, seconds, stall, pdf in results]
+    with tempfile.TemporaryDirectory() as scratch:
+        inline_peak = heap_peak(render_inline, employee_id, employee_name)
+        chunked_peak = heap_peak(render_feedback_report, employee_id, employee_name, os.path.join(scratch, "r.pdf"))
+    table.append(("Python heap peak", f"inline {inline_peak / 2**20:.1f} MiB, chunked worker render {chunked_peak / 2**20:.1f} MiB"))
+    report(f"Feedback PDF report ({rows} rows)", table)
+    return 0 if len({pages(pdf) for _, _, _, pdf in results}) == 1 else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+    sys.exit(main(args.rows))
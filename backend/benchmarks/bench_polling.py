@@ -0,0 +1,102 @@
+"""Dashboard polling benchmark: full render vs cached body vs 304.
+
+Seeds a manager with a feedback history, then polls the versioned GET
+endpoints three ways: with the response cache cleared (a full render), with
+the body cached, and revalidating with If-None-Match. Reports statements and
+mean latency per poll, and exits non-zero if a cached or 304 poll reads the
+feedback tables::
+
+    python -m benchmarks.bench_polling
+    ASYNC_DB_ENABLED=true python -m benchmarks.bench_polling
+
+Requires ``httpx``.
+"""
+import argparse
+import re
+import sys
+import time
+from contextlib import ExitStack
+
+from .common import configure_environment, count_statements, create_schema, report
+
+configure_environment()
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core import config  # noqa: E402
+from app.core.mail import mail_worker  # noqa: E402
+from app.core.cache import response_cache  # noqa: E402
+from app.db import session  # noqa: E402
+from app.main import app  # noqa: E402
+
+mail_worker.enabled = False
+
+ENGINES = [session.engine] + ([session.async_engine.sync_engine] if session.ASYNC_DB_ENABLED else [])
+
+FEEDBACK_TABLES = re.compile(r"\b(feedback|feedback_tag|notification)\b", re.IGNORECASE)
+
+
+def register(client, name, role):
+    response = client.post("/api/auth/register", json={
+        "name": name, "email": f"{name}@example.com", "password": "password123", "role": role,
+    })
+    response.raise_for_status()
+    token = client.post("/api/auth/login", data={
+        "username": f"{name}@example.com", "password": "password123",
+    }).json()["access_token"]
+    return response.json()["id"], {"Authorization": f"Bearer {token}"}
+
+
+def poll(client, path, headers, mode, repeat):
+    """Mean ms and the statements of the last poll; ``mode`` is "render", "cached" or "304" """
+    etag = client.get(path, headers=headers).headers["etag"]
+    samples, statements = [], []
+    for _ in range(repeat):
+        if mode == "render":
+            response_cache.clear()
+        request_headers = {**headers, "If-None-Match": etag} if mode == "304" else headers
+        with ExitStack() as stack:
+            counters = [stack.enter_context(count_statements(engine)) for engine in ENGINES]
+            started = time.perf_counter()
+            response = client.get(path, headers=request_headers)
+            samples.append((time.perf_counter() - started) * 1000)
+        if response.status_code != (304 if mode == "304" else 200):
+            raise RuntimeError(f"GET {path} ({mode}) -> {response.status_code}: {response.text}")
+        statements = [statement for counter in counters for statement in counter.statements]
+    return sum(samples) / len(samples), statements
+
+
+def main(rows, repeat):
+    create_schema()
+    client = TestClient(app)
+    _, manager = register(client, "manager", "manager")
+    employee_id, employee = register(client, "employee", "employee")
+    client.post("/api/users/team/add", json={"employee_id": employee_id}, headers=manager).raise_for_status()
+    item = {"employee_id": employee_id, "strengths": "Strengths", "areas_to_improve": "Areas", "sentiment": "positive"}
+    for start in range(0, rows, config.FEEDBACK_BULK_MAX_ITEMS):
+        batch = min(config.FEEDBACK_BULK_MAX_ITEMS, rows - start)
+        client.post("/api/feedback/bulk", json={"items": [item] * batch}, headers=manager).raise_for_status()
+
+    endpoints = [
+        ("/api/dashboard/manager/overview", manager),
+        ("/api/feedback/manager", manager),
+        ("/api/dashboard/employee/timeline", employee),
+    ]
+    report_rows, failures = [], 0
+    for path, headers in endpoints:
+        for mode in ("render", "cached", "304"):
+            mean, statements = poll(client, path, headers, mode, repeat)
+            ok = mode == "render" or not any(FEEDBACK_TABLES.search(statement) for statement in statements)
+            failures += not ok
+            report_rows.append((f"{'ok  ' if ok else 'FAIL'} {path} [{mode}]", f"{len(statements)} statements, {mean:.2f} ms"))
+
+    report(f"Polling ({'async' if session.ASYNC_DB_ENABLED else 'sync'}, {session.engine.dialect.name}, {rows} feedback rows)", report_rows)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    sys.exit(main(args.rows, args.repeat))
@@ -0,0 +1,147 @@
+"""Team export benchmark: streamed CSV/NDJSON vs building the whole file before sending it.
+
+Seeds one manager's team with a synthetic history (feedback, peer feedback
+and comments, 100k rows by default) and produces the export two ways:
+through the streaming writers behind GET /api/feedback/manager/export, and
+by loading every row of the same queries at once and writing the complete
+file in memory, as a naive endpoint would. Reports time to the first byte,
+total time, size, and the Python heap peak of each (measured in a second,
+traced pass). Exits non-zero if the two disagree::
+
+    python -m benchmarks.bench_team_export
+    python -m benchmarks.bench_team_export --rows 300000 --team-size 200
+"""
+import argparse
+import csv
+import io
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from .common import configure_environment, create_schema, report
+
+configure_environment()
+
+from app.core.exports import export_value, iter_csv, iter_ndjson  # noqa: E402
+from app.crud.crud_export import EXPORT_COLUMNS, export_queries  # noqa: E402
+from app.crud.crud_hierarchy import rebuild_user_hierarchy  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+from app.models.feedback import Feedback, FeedbackComment, PeerFeedback, SentimentEnum  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+
+SEED_BATCH = 20000
+
+
+def seed(db, rows, team_size):
+    """``rows`` records in all: 70% feedback, 20% peer feedback, 10% comments"""
+    manager = User(name="Manager", email="manager@example.com", hashed_password="x", role=UserRole.manager)
+    db.add(manager)
+    db.flush()
+    team = [User(name=f"Employee {i}", email=f"e{i}@example.com", hashed_password="x",
+                 role=UserRole.employee, manager_id=manager.id) for i in range(team_size)]
+    db.add_all(team)
+    db.flush()
+    team_ids = [member.id for member in team]
+    sentiments = list(SentimentEnum)
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1)
+    counts = {"feedback": rows * 7 // 10, "peer": rows * 2 // 10}
+    counts["comments"] = rows - counts["feedback"] - counts["peer"]
+    text = "Communicates clearly, keeps the team unblocked, and ships on time. " * 2
+    for offset in range(0, counts["feedback"], SEED_BATCH):
+        db.execute(Feedback.__table__.insert(), [
+            {"id": i + 1, "manager_id": manager.id, "employee_id": team_ids[i % team_size], "strengths": text,
+             "areas_to_improve": text, "sentiment": rng.choice(sentiments), "acknowledged": rng.random() < 0.6,
+             "created_at": start + timedelta(minutes=i), "updated_at": start + timedelta(minutes=i)}
+            for i in range(offset, min(counts["feedback"], offset + SEED_BATCH))
+        ])
+    for offset in range(0, counts["peer"], SEED_BATCH):
+        db.execute(PeerFeedback.__table__.insert(), [
+            {"from_user_id": team_ids[i % team_size], "to_user_id": team_ids[(i + 1) % team_size], "strengths": text,
+             "areas_to_improve": text, "sentiment": rng.choice(sentiments), "is_anonymous": i % 5 == 0,
+             "created_at": start + timedelta(minutes=i)}
+            for i in range(offset, min(counts["peer"], offset + SEED_BATCH))
+        ])
+    for offset in range(0, counts["comments"], SEED_BATCH):
+        db.execute(FeedbackComment.__table__.insert(), [
+            {"feedback_id": i % counts["feedback"] + 1, "user_id": team_ids[i % team_size], "content": text,
+             "created_at": start + timedelta(minutes=i)}
+            for i in range(offset, min(counts["comments"], offset + SEED_BATCH))
+        ])
+    db.commit()
+    rebuild_user_hierarchy(db)
+    return manager.id
+
+
+def build_csv(manager_id):
+    """Every row loaded, then the complete CSV written in memory"""
+    with SessionLocal() as db:
+        loaded = [(record_type, db.execute(query).mappings().all()) for record_type, query in export_queries(manager_id, False)]
+    output = io.StringIO()
+    writer = csv.DictWriter(output, EXPORT_COLUMNS, restval="")
+    writer.writeheader()
+    for record_type, rows in loaded:
+        for row in rows:
+            writer.writerow({"record_type": record_type, **{key: export_value(value) for key, value in row.items()}})
+    return [output.getvalue().encode()]
+
+
+def build_ndjson(manager_id):
+    with SessionLocal() as db:
+        loaded = [(record_type, db.execute(query).mappings().all()) for record_type, query in export_queries(manager_id, False)]
+    lines = [json.dumps({"record_type": record_type, **row}, default=export_value) + "\n"
+             for record_type, rows in loaded for row in rows]
+    return ["".join(lines).encode()]
+
+
+def timed(produce):
+    started = time.perf_counter()
+    first, size, digest = None, 0, []
+    for chunk in produce():
+        if first is None:
+            first = time.perf_counter() - started
+        size += len(chunk)
+        digest.append(chunk)
+    return first, time.perf_counter() - started, size, b"".join(digest)
+
+
+def traced_peak(produce):
+    tracemalloc.start()
+    try:
+        for _ in produce():
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(rows, team_size):
+    create_schema()
+    with SessionLocal() as db:
+        manager_id = seed(db, rows, team_size)
+    cases = [
+        ("CSV, streamed", lambda: iter_csv(manager_id)),
+        ("CSV, built in memory", lambda: build_csv(manager_id)),
+        ("NDJSON, streamed", lambda: iter_ndjson(manager_id)),
+        ("NDJSON, built in memory", lambda: build_ndjson(manager_id)),
+    ]
+    table, outputs = [], []
+    for name, produce in cases:
+        first, total, size, body = timed(produce)
+        peak = traced_peak(produce)
+        outputs.append(body)
+        table.append((name, f"first byte {first * 1000:7.0f} ms, total {total:6.2f} s, {size / 2**20:6.1f} MiB, "
+                            f"heap peak {peak / 2**20:7.1f} MiB"))
+    report(f"Team export ({rows} rows, {team_size} members)", table)
+    return 0 if outputs[0] == outputs[1] and outputs[2] == outputs[3] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--team-size", type=int, default=50)
+    args = parser.parse_args()
+    sys.exit(main(args.rows, args.team_size))
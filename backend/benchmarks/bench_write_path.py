@@ -0,0 +1,120 @@
+"""Write-path benchmark: statements, transactions and latency per endpoint.
+
+Drives every write endpoint through the ASGI app and reports, per request,
+how many SQL statements it issued (reads and writes separately), how many
+transactions it committed and its mean latency. Exits non-zero if an
+endpoint commits more than once per request::
+
+    python -m benchmarks.bench_write_path
+    ASYNC_DB_ENABLED=true python -m benchmarks.bench_write_path
+
+Requires ``httpx``.
+"""
+import argparse
+import sys
+import time
+from contextlib import ExitStack
+
+from .common import configure_environment, count_statements, create_schema, report
+
+configure_environment()
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.core.mail import mail_worker  # noqa: E402
+from app.db import session  # noqa: E402
+from app.main import app  # noqa: E402
+
+# No SMTP server here: emails stay in the outbox unsent
+mail_worker.enabled = False
+
+# Endpoints without an async variant keep using the sync engine in async mode
+ENGINES = [session.engine] + ([session.async_engine.sync_engine] if session.ASYNC_DB_ENABLED else [])
+
+
+def register(client, name, role):
+    response = client.post("/api/auth/register", json={
+        "name": name, "email": f"{name}@example.com", "password": "password123", "role": role,
+    })
+    response.raise_for_status()
+    token = client.post("/api/auth/login", data={
+        "username": f"{name}@example.com", "password": "password123",
+    }).json()["access_token"]
+    return response.json()["id"], {"Authorization": f"Bearer {token}"}
+
+
+def measure(client, method, path, headers, body=None):
+    with ExitStack() as stack:
+        counters = [stack.enter_context(count_statements(engine)) for engine in ENGINES]
+        started = time.perf_counter()
+        response = client.request(method, path, headers=headers, json=body)
+        elapsed = (time.perf_counter() - started) * 1000
+    if response.status_code != 200:
+        raise RuntimeError(f"{method} {path} -> {response.status_code}: {response.text}")
+    statements = [statement for counter in counters for statement in counter.statements]
+    writes = sum(1 for statement in statements if not statement.lstrip().upper().startswith("SELECT"))
+    transactions = sum(counter.transactions for counter in counters)
+    return response.json(), len(statements) - writes, writes, transactions, elapsed
+
+
+def main(repeat):
+    create_schema()
+    client = TestClient(app)
+    manager_id, manager = register(client, "manager", "manager")
+    employee_id, employee = register(client, "employee", "employee")
+    peer_id, peer = register(client, "peer", "employee")
+    client.post("/api/users/team/add", json={"employee_id": employee_id}, headers=manager).raise_for_status()
+    tag_ids = [client.post("/api/feedback/tags", json={"name": f"bench-{i}"}, headers=manager).json()["id"] for i in range(3)]
+    feedback = {"employee_id": employee_id, "strengths": "Strengths", "areas_to_improve": "Areas", "sentiment": "positive"}
+
+    # Each case returns (method, path, headers, body) for iteration ``i``
+    cases = {
+        "POST /feedback/": lambda i: ("POST", "/api/feedback/", manager, feedback),
+        "POST /feedback/bulk (20)": lambda i: ("POST", "/api/feedback/bulk", manager, {"items": [feedback] * 20}),
+        "PATCH /feedback/{id}": lambda i: ("PATCH", f"/api/feedback/{ids['feedback']}", manager, {"sentiment": "neutral"}),
+        "POST /feedback/{id}/acknowledge": lambda i: ("POST", f"/api/feedback/{ids['feedback']}/acknowledge", employee, None),
+        "POST /feedback/request": lambda i: ("POST", "/api/feedback/request", employee, {"target_id": manager_id}),
+        "PATCH /feedback/request/{id}/status": lambda i: (
+            "PATCH", f"/api/feedback/request/{ids['request']}/status?status=completed", manager, None),
+        "POST /feedback/peer": lambda i: ("POST", "/api/feedback/peer", employee, {
+            "to_user_id": peer_id, "strengths": "S", "areas_to_improve": "A", "sentiment": "positive", "is_anonymous": False}),
+        "POST /feedback/{id}/comments": lambda i: (
+            "POST", f"/api/feedback/{ids['feedback']}/comments", employee, {"content": "Thanks"}),
+        "POST /feedback/tags": lambda i: ("POST", "/api/feedback/tags", manager, {"name": f"tag-{i}"}),
+        "POST /feedback/{id}/tags/{tag}": lambda i: (
+            "POST", f"/api/feedback/{ids['feedback']}/tags/{tag_ids[0]}", manager, None),
+        "POST /feedback/tags/assign (20x3)": lambda i: (
+            "POST", "/api/feedback/tags/assign", manager, {"feedback_ids": ids["bulk"], "tag_ids": tag_ids, "replace": i % 2 == 1}),
+        "POST /notifications/{id}/read": lambda i: (
+            "POST", f"/api/feedback/notifications/{ids['notification']}/read", employee, None),
+    }
+    ids = {}
+    rows, failures = [], 0
+    for name, case in cases.items():
+        samples = []
+        for i in range(repeat):
+            result = measure(client, *case(i))
+            samples.append(result[1:])
+            if name == "POST /feedback/":
+                ids["feedback"] = result[0]["id"]
+                ids["notification"] = client.get("/api/feedback/notifications?limit=1", headers=employee).json()[0]["id"]
+            elif name == "POST /feedback/bulk (20)":
+                ids["bulk"] = [item["feedback"]["id"] for item in result[0]["results"]]
+            elif name == "POST /feedback/request":
+                ids["request"] = result[0]["id"]
+        reads, writes, transactions, _ = samples[-1]
+        mean = sum(sample[3] for sample in samples) / len(samples)
+        ok = all(sample[2] <= 1 for sample in samples)
+        failures += not ok
+        rows.append((f"{'ok  ' if ok else 'FAIL'} {name}",
+                     f"{reads} reads, {writes} writes, {transactions} transaction(s), {mean:.2f} ms"))
+
+    report(f"Write path ({'async' if session.ASYNC_DB_ENABLED else 'sync'}, {session.engine.dialect.name}, per request)", rows)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    sys.exit(main(args.repeat))
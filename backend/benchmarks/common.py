@@ -0,0 +1,76 @@
+"""Shared helpers for the benchmark scripts in this directory.
+
+Run scripts from the ``backend`` directory, e.g.::
+
+    python -m benchmarks.bench_login_storm
+
+Each script defaults to a throwaway SQLite database; set ``DATABASE_URL`` to
+benchmark against PostgreSQL instead.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+def configure_environment():
+    """Point the app at a scratch database unless one is configured. Call before importing ``app``."""
+    if not os.getenv("DATABASE_URL"):
+        path = os.path.join(tempfile.mkdtemp(prefix="feedback-bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+
+def create_schema():
+    from app.db.base import Base
+    from app.db.session import engine
+    from app.models import user, feedback, outbox  # noqa: F401  (register tables)
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = []
+        self.transactions = 0
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@contextmanager
+def count_statements(engine):
+    """Count the SQL statements and committed transactions issued on ``engine`` inside the block"""
+    from sqlalchemy import event
+
+    counter = StatementCounter()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    def commit(conn):
+        counter.transactions += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "commit", commit)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        event.remove(engine, "commit", commit)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(title, rows):
+    print(f"\n{title}")
+    width = max(len(name) for name, _ in rows)
+    for name, value in rows:
+        print(f"  {name.ljust(width)}  {value}")
@@ -0,0 +1,90 @@
+"""Check that every list query in crud_feedback is served by an index.
+
+Runs each list function against a freshly migrated database, captures the
+SQL it issues and EXPLAINs it. Exits non-zero if any statement scans a whole
+table or sorts in a temporary B-tree instead of reading an index in order::
+
+    python -m benchmarks.explain_list_queries
+
+On PostgreSQL sequential scans are disabled for the session first, so the
+planner picks an index whenever a usable one exists even on empty tables.
+"""
+import sys
+
+from .common import configure_environment
+
+configure_environment()
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from app.crud import crud_feedback, crud_user  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+
+LIST_QUERIES = {
+    "get_feedback_for_employee": lambda db: crud_feedback.get_feedback_for_employee(db, employee_id=1),
+    "get_feedback_for_manager": lambda db: crud_feedback.get_feedback_for_manager(db, manager_id=1),
+    "get_feedback_requests_made": lambda db: crud_feedback.get_feedback_requests_made(db, user_id=1),
+    "get_feedback_requests_received": lambda db: crud_feedback.get_feedback_requests_received(db, user_id=1),
+    "get_peer_feedback_given": lambda db: crud_feedback.get_peer_feedback_given(db, user_id=1),
+    "get_peer_feedback_received": lambda db: crud_feedback.get_peer_feedback_received(db, user_id=1),
+    "get_feedback_comments": lambda db: crud_feedback.get_feedback_comments(db, feedback_id=1),
+    "get_notifications_for_user": lambda db: crud_feedback.get_notifications_for_user(db, user_id=1),
+    "get_team_members": lambda db: crud_user.get_team_members(db, manager_id=1),
+}
+
+
+def capture_statements(fn):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    db = SessionLocal()
+    try:
+        fn(db)
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def explain(statement, parameters):
+    """Return the plan lines and whether they show a full scan or an explicit sort"""
+    with engine.connect() as connection:
+        if engine.dialect.name == "sqlite":
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            plan = [row[-1] for row in rows]
+            bad = any(
+                (line.startswith("SCAN ") and "INDEX" not in line) or "TEMP B-TREE" in line
+                for line in plan
+            )
+        else:
+            connection.exec_driver_sql("SET enable_seqscan = off")
+            rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()
+            plan = [row[0] for row in rows]
+            bad = any("Seq Scan" in line or line.lstrip("-> ").startswith("Sort") for line in plan)
+    return plan, bad
+
+
+def main():
+    config = Config("alembic.ini")
+    command.downgrade(config, "base")
+    command.upgrade(config, "head")
+
+    failures = 0
+    for name, fn in LIST_QUERIES.items():
+        for statement, parameters in capture_statements(fn):
+            plan, bad = explain(statement, parameters)
+            failures += bad
+            print(f"{'FAIL' if bad else 'ok  '} {name}")
+            for line in plan:
+                print(f"       {line}")
+    print(f"\n{failures} statement(s) without index support")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
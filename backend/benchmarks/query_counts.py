@@ -0,0 +1,113 @@
+"""Statement-count regression check for list endpoints, dashboards and bulk writes.
+
+Seeds a manager with a small and then a large team history and asserts that
+each listing issues the same, fixed number of SQL statements regardless of
+row count (i.e. no per-row lazy loads), that each dashboard is a single
+aggregate query, and that a bulk feedback submission for the whole team and
+the set-based notification operations are a fixed number of statements too::
+
+    python -m benchmarks.query_counts
+"""
+import sys
+from datetime import datetime, timedelta
+
+from .common import configure_environment, count_statements, create_schema
+
+configure_environment()
+
+from app.crud import crud_dashboard, crud_feedback  # noqa: E402
+from app.db.session import SessionLocal, engine  # noqa: E402
+from app.models.feedback import Feedback, Notification, SentimentEnum, Tag  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.schemas.feedback import FeedbackCreate  # noqa: E402
+
+# Expected statements per call: feedback + employee join, then one IN query for tags
+# Dashboards: one aggregate query each
+# Bulk creation: team lookup, feedback INSERT ... RETURNING, notification INSERT, outbox INSERT,
+# sentiment rollup upsert, data version bump
+# Notifications: one count; one UPDATE plus the data version bump
+EXPECTED = {
+    "get_feedback_for_manager": 2,
+    "get_manager_overview": 1,
+    "get_team_stats": 1,
+    "create_feedback_bulk": 6,
+    "count_unread_notifications": 1,
+    "mark_notifications_as_read": 2,
+}
+
+
+def seed(db, rows, employees=20):
+    manager = User(name="Manager", email=f"manager{rows}@example.com", hashed_password="x", role=UserRole.manager)
+    db.add(manager)
+    db.flush()
+    team = [
+        User(name=f"Employee {i}", email=f"e{rows}-{i}@example.com", hashed_password="x",
+             role=UserRole.employee, manager_id=manager.id)
+        for i in range(employees)
+    ]
+    tags = [Tag(name=f"tag-{rows}-{i}") for i in range(5)]
+    db.add_all(team + tags)
+    db.flush()
+    start = datetime(2024, 1, 1)
+    sentiments = list(SentimentEnum)
+    for i in range(rows):
+        db.add(Feedback(
+            manager_id=manager.id,
+            employee_id=team[i % employees].id,
+            strengths="Strengths",
+            areas_to_improve="Areas",
+            sentiment=sentiments[i % 3],
+            created_at=start + timedelta(minutes=i),
+            tags=tags[: i % 3],
+        ))
+        db.add(Notification(user_id=manager.id, message="New feedback", type="feedback", read=False))
+    db.commit()
+    return manager.id
+
+
+def bulk_items(db, manager_id):
+    """One feedback item per team member plus one for someone outside the team"""
+    team = [user_id for (user_id,) in db.query(User.id).filter(User.manager_id == manager_id)]
+    return [
+        FeedbackCreate(employee_id=employee_id, strengths="Strengths", areas_to_improve="Areas", sentiment="positive")
+        for employee_id in team + [manager_id]
+    ]
+
+
+def measure(name, call, manager_id):
+    db = SessionLocal()
+    try:
+        with count_statements(engine) as counter:
+            rows = call(db, manager_id)
+        return len(rows), counter.count
+    finally:
+        db.close()
+
+
+def main():
+    create_schema()
+    db = SessionLocal()
+    small, large = seed(db, 10), seed(db, 2000)
+    items = {manager_id: bulk_items(db, manager_id) for manager_id in (small, large)}
+    db.close()
+
+    failures = 0
+    calls = {
+        "get_feedback_for_manager": lambda db, manager_id: crud_feedback.get_feedback_for_manager(db, manager_id=manager_id),
+        "get_manager_overview": lambda db, manager_id: [crud_dashboard.get_manager_overview(db, manager_id)],
+        "get_team_stats": lambda db, manager_id: crud_dashboard.get_team_stats(db, manager_id),
+        "create_feedback_bulk": lambda db, manager_id: crud_feedback.create_feedback_bulk(db, manager_id, items[manager_id]),
+        "count_unread_notifications": lambda db, manager_id: [crud_feedback.count_unread_notifications(db, manager_id)],
+        "mark_notifications_as_read": lambda db, manager_id: [crud_feedback.mark_notifications_as_read(db, manager_id)],
+    }
+    for name, call in calls.items():
+        for manager_id in (small, large):
+            rows, statements = measure(name, call, manager_id)
+            ok = statements == EXPECTED[name]
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}: {rows} rows -> {statements} statements (expected {EXPECTED[name]})")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
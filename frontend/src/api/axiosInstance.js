@@ -37,4 +37,18 @@ instance.interceptors.response.use(
   }
 );
 
+// List endpoints answer one page at a time, with the cursor of the next page in the X-Next-Cursor header.
+// Follow it to the end, so callers still get the whole list in response.data.
+export const getAllPages = async (url, config = {}) => {
+  const response = await instance.get(url, config);
+  const items = [...response.data];
+  let cursor = response.headers['x-next-cursor'];
+  while (cursor) {
+    const page = await instance.get(url, { ...config, params: { ...config.params, cursor } });
+    items.push(...page.data);
+    cursor = page.headers['x-next-cursor'];
+  }
+  return { ...response, data: items };
+};
+
 export default instance;
\ No newline at end of file
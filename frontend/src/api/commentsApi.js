@@ -1,5 +1,5 @@
-import axios from './axiosInstance';
+import axios, { getAllPages } from './axiosInstance';
 
 // Comments APIs
-export const getFeedbackComments = (feedbackId) => axios.get(`/feedback/${feedbackId}/comments`);
+export const getFeedbackComments = (feedbackId) => getAllPages(`/feedback/${feedbackId}/comments`);
 export const createFeedbackComment = (feedbackId, content) => axios.post(`/feedback/${feedbackId}/comments`, { content }); 
\ No newline at end of file
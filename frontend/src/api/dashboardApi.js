@@ -1,10 +1,11 @@
-import axios from './axiosInstance';
+import axios, { getAllPages } from './axiosInstance';
 
 // Manager Dashboard APIs
 export const getManagerOverview = () => axios.get('/dashboard/manager/overview');
 export const getManagerSentimentTrends = () => axios.get('/dashboard/manager/sentiment_trends');
 export const getTeamMembers = () => axios.get('/users/team');
-export const getManagerFeedback = () => axios.get('/feedback/manager');
-export const getFeedbackRequests = () => axios.get('/feedback/requests/received');
+export const getManagerFeedback = () => getAllPages('/feedback/manager');
+export const getFeedbackRequests = () => getAllPages('/feedback/requests/received');
 export const updateRequestStatus = (requestId, status) => axios.patch(`/feedback/request/${requestId}/status?status=${status}`);
-export const getTeamMemberStats = (employeeId) => axios.get(`/dashboard/manager/team-member-stats/${employeeId}`); 
\ No newline at end of file
+export const getTeamMemberStats = (employeeId) => axios.get(`/dashboard/manager/team-member-stats/${employeeId}`);
+export const getTeamStats = () => axios.get('/dashboard/manager/team-stats'); 
\ No newline at end of file
@@ -1,8 +1,8 @@
-import axios from './axiosInstance';
+import axios, { getAllPages } from './axiosInstance';
 
 export const createFeedback = (data) => axios.post('/feedback', data);
-export const getEmployeeFeedback = () => axios.get('/feedback/employee');
-export const getManagerFeedback = () => axios.get('/feedback/manager');
+export const getEmployeeFeedback = () => getAllPages('/feedback/employee');
+export const getManagerFeedback = () => getAllPages('/feedback/manager');
 export const updateFeedback = (id, data) => axios.patch(`/feedback/${id}`, data);
 export const acknowledgeFeedback = (id) => axios.post(`/feedback/${id}/acknowledge`);
 export const exportEmployeeFeedbackPDF = () => axios.get('/feedback/employee/pdf', { responseType: 'blob' });
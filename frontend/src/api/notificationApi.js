@@ -1,5 +1,18 @@
-import axios from './axiosInstance';
+import axios, { getAllPages } from './axiosInstance';
 
-export const getNotifications = () => axios.get('/feedback/notifications');
+export const getNotifications = () => getAllPages('/feedback/notifications');
+export const getUnreadCount = () => axios.get('/feedback/notifications/unread-count');
 export const markNotificationRead = (id) => axios.post(`/feedback/notifications/${id}/read`);
+export const markAllNotificationsRead = () => axios.post('/feedback/notifications/read-all');
 export const clearAllNotifications = () => axios.delete('/feedback/notifications/clear-all');
+
+// WebSocket push of new notifications; pass the last id received to resume after a reconnect
+export const notificationSocketUrl = (token, lastId) => {
+  const url = new URL(`${axios.defaults.baseURL}/feedback/notifications/ws`, window.location.href);
+  url.protocol = url.protocol === 'https:' ? 'wss:' : 'ws:';
+  url.searchParams.set('token', token);
+  if (lastId != null) {
+    url.searchParams.set('last_id', lastId);
+  }
+  return url.toString();
+};
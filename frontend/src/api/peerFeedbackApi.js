@@ -1,5 +1,5 @@
-import axios from './axiosInstance';
+import axios, { getAllPages } from './axiosInstance';
 
 export const submitPeerFeedback = (data) => axios.post('/feedback/peer', data);
-export const getPeerFeedbackGiven = () => axios.get('/feedback/peer/given');
-export const getPeerFeedbackReceived = () => axios.get('/feedback/peer/received');
+export const getPeerFeedbackGiven = () => getAllPages('/feedback/peer/given');
+export const getPeerFeedbackReceived = () => getAllPages('/feedback/peer/received');
@@ -1,6 +1,6 @@
-import axios from './axiosInstance';
+import axios, { getAllPages } from './axiosInstance';
 
 export const requestFeedback = (data) => axios.post('/feedback/request', data);
-export const getRequestsMade = () => axios.get('/feedback/requests/made');
-export const getRequestsReceived = () => axios.get('/feedback/requests/received');
+export const getRequestsMade = () => getAllPages('/feedback/requests/made');
+export const getRequestsReceived = () => getAllPages('/feedback/requests/received');
 export const updateRequestStatus = (id, status) => axios.patch(`/feedback/request/${id}/status?status=${status}`);
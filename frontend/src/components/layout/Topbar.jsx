@@ -15,16 +15,28 @@ export default function Topbar( ) {
   const { 
     notifications, 
     fetchNotifications, 
+    fetchUnreadCount,
+    connectPush,
+    disconnectPush,
     markAsRead, 
+    markAllAsRead,
     getUnreadCount,
     clearAll
   } = useNotificationStore();
   const navigate = useNavigate();
 
-  // Fetch notifications on mount
+  // Unread count and push on mount; the list is fetched when the panel opens
   useEffect(() => {
-    fetchNotifications();
-  }, [fetchNotifications]);
+    fetchUnreadCount();
+    connectPush();
+    return () => disconnectPush();
+  }, [fetchUnreadCount, connectPush, disconnectPush]);
+
+  useEffect(() => {
+    if (notificationPanelOpen) {
+      fetchNotifications();
+    }
+  }, [notificationPanelOpen, fetchNotifications]);
 
   // Close dropdown/panel when clicking outside
   useEffect(() => {
@@ -68,11 +80,7 @@ export default function Topbar( ) {
   };
 
   const handleMarkAllAsRead = () => {
-    notifications.forEach(n => {
-      if (!n.is_read) {
-        markAsRead(n.id);
-      }
-    });
+    markAllAsRead();
   };
 
   const handleClearAll = () => {
@@ -39,7 +39,7 @@ export default function TeamMembersPage() {
     error: dashboardError,
     loadOverview,
     loadRecentFeedback,
-    loadTeamMemberStats,
+    loadTeamStats,
     clearError: clearDashboardError,
   } = useManagerDashboardStore();
 
@@ -62,14 +62,10 @@ export default function TeamMembersPage() {
 
   // Load team member stats when team members are loaded
   useEffect(() => {
-    if (teamMembers && teamMembers.length > 0) {
-      teamMembers.forEach(member => {
-        if (!teamMemberStats[member.id]) {
-          loadTeamMemberStats(member.id);
-        }
-      });
+    if (teamMembers && teamMembers.some(member => !teamMemberStats[member.id])) {
+      loadTeamStats();
     }
-  }, [teamMembers, loadTeamMemberStats, teamMemberStats]);
+  }, [teamMembers, loadTeamStats, teamMemberStats]);
 
   // Handle errors
   useEffect(() => {
@@ -96,9 +92,7 @@ export default function TeamMembersPage() {
         loadRecentFeedback(),
       ]);
       // Re-fetch stats for all members
-      if (teamMembers && teamMembers.length > 0) {
-        await Promise.all(teamMembers.map(m => loadTeamMemberStats(m.id)));
-      }
+      await loadTeamStats();
       toast.success('Team data refreshed!');
     } catch (error) {
       console.error('Error refreshing data:', error);
@@ -102,6 +102,25 @@ export const useManagerDashboardStore = create((set, get) => ({
     }
   },
 
+  // Load stats for every team member in one request
+  loadTeamStats: async () => {
+    set({ loading: { ...get().loading, memberStats: true }, error: null });
+    try {
+      const { data } = await dashboardApi.getTeamStats();
+      set({
+        teamMemberStats: Object.fromEntries(data.map((stats) => [stats.employee_id, stats])),
+        loading: { ...get().loading, memberStats: false },
+      });
+      return data;
+    } catch (error) {
+      set({
+        error: error.response?.data?.detail || 'Failed to load team stats',
+        loading: { ...get().loading, memberStats: false },
+      });
+      throw error;
+    }
+  },
+
   // Load recent feedback
   loadRecentFeedback: async () => {
     set({ loading: { ...get().loading, feedback: true }, error: null });
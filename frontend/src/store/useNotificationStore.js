@@ -1,8 +1,14 @@
 import { create } from 'zustand';
 import * as notificationApi from '../api/notificationApi';
 
+const PUSH_RECONNECT_MS = 3000;
+let socket = null;
+let reconnectTimer = null;
+
 export const useNotificationStore = create((set, get) => ({
   notifications: [],
+  unreadCount: 0,
+  lastPushedId: null,
   loading: false,
   error: null,
 
@@ -10,7 +16,7 @@ export const useNotificationStore = create((set, get) => ({
     set({ loading: true, error: null });
     try {
       const { data } = await notificationApi.getNotifications();
-      set({ notifications: data, loading: false });
+      set({ notifications: data, unreadCount: data.filter(n => !n.read).length, loading: false });
     } catch (error) {
       set({ 
         error: error.response?.data?.detail || 'Failed to fetch notifications', 
@@ -19,6 +25,18 @@ export const useNotificationStore = create((set, get) => ({
     }
   },
 
+  // The badge only needs the count, not the whole notification list
+  fetchUnreadCount: async () => {
+    try {
+      const { data } = await notificationApi.getUnreadCount();
+      set({ unreadCount: data.unread });
+    } catch (error) {
+      set({
+        error: error.response?.data?.detail || 'Failed to fetch unread count'
+      });
+    }
+  },
+
   markAsRead: async (id) => {
     try {
       await notificationApi.markNotificationRead(id);
@@ -27,6 +45,9 @@ export const useNotificationStore = create((set, get) => ({
         notifications: state.notifications.map((n) =>
           n.id === id ? { ...n, read: true } : n
         ),
+        unreadCount: state.notifications.some((n) => n.id === id && !n.read)
+          ? Math.max(state.unreadCount - 1, 0)
+          : state.unreadCount,
       }));
     } catch (error) {
       set({ 
@@ -35,10 +56,24 @@ export const useNotificationStore = create((set, get) => ({
     }
   },
 
+  markAllAsRead: async () => {
+    try {
+      await notificationApi.markAllNotificationsRead();
+      set((state) => ({
+        notifications: state.notifications.map((n) => ({ ...n, read: true })),
+        unreadCount: 0,
+      }));
+    } catch (error) {
+      set({
+        error: error.response?.data?.detail || 'Failed to mark notifications as read'
+      });
+    }
+  },
+
   clearAll: async () => {
     try {
       await notificationApi.clearAllNotifications();
-      set({ notifications: [] });
+      set({ notifications: [], unreadCount: 0 });
     } catch (error) {
       set({
         error: error.response?.data?.detail || 'Failed to clear notifications'
@@ -46,7 +81,42 @@ export const useNotificationStore = create((set, get) => ({
     }
   },
 
+  // Receive new notifications as they are created instead of polling
+  connectPush: () => {
+    const token = localStorage.getItem('access_token');
+    if (!token || socket) return;
+    const ws = new WebSocket(notificationApi.notificationSocketUrl(token, get().lastPushedId));
+    socket = ws;
+    ws.onmessage = (event) => {
+      const notification = JSON.parse(event.data);
+      set((state) => {
+        // After a reconnect the server may resend recent notifications; count each one once
+        if (state.notifications.some((n) => n.id === notification.id)) return {};
+        return {
+          notifications: [notification, ...state.notifications],
+          unreadCount: state.unreadCount + (notification.read ? 0 : 1),
+          lastPushedId: Math.max(state.lastPushedId ?? 0, notification.id),
+        };
+      });
+    };
+    ws.onclose = (event) => {
+      if (socket === ws) socket = null;
+      // 1000: closed by disconnectPush; 1008: token rejected
+      if (event.code !== 1000 && event.code !== 1008) {
+        reconnectTimer = setTimeout(() => get().connectPush(), PUSH_RECONNECT_MS);
+      }
+    };
+  },
+
+  disconnectPush: () => {
+    clearTimeout(reconnectTimer);
+    if (socket) {
+      socket.close(1000);
+      socket = null;
+    }
+  },
+
   getUnreadCount: () => {
-    return get().notifications.filter(n => !n.read).length;
+    return get().unreadCount;
   }
 })); 
\ No newline at end of file